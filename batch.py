@@ -0,0 +1,144 @@
+# Batch runner: simulate many programs across a process pool and stream
+# one JSON Lines record per program.
+#
+# Usage:
+#   python batch.py <dir|manifest> [--workers N] [--max-steps N] [--timeout S]
+#                   [--dump BASE:COUNT ...] [--blocks] [-o results.jsonl]
+#
+# A manifest is a text file with one program per line: either a path
+# (relative to the manifest) or a JSON object such as
+#   {"path": "loop.hex", "max_steps": 500000, "timeout": 2.0}
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from cpu import CPU, load_program
+
+PROGRAM_EXTS = (".hex", ".bin", ".elf")
+
+# steps simulated between wall-clock checks for the timeout
+CHUNK_STEPS = 20000
+
+
+def run_one(job: Dict) -> Dict:
+    """Simulate one program (runs inside a worker process)."""
+    t0 = time.perf_counter()
+    result = {"program": job["path"]}
+    try:
+        imem, dmem, entry = load_program(job["path"])
+        cpu = CPU(imem, dmem)
+        cpu.pc = entry
+        max_steps = job["max_steps"]
+        timeout = job.get("timeout")
+        deadline = None if timeout is None else t0 + timeout
+        reason = None
+        while cpu.running:
+            if cpu.step_count >= max_steps:
+                reason = "step_limit"
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                reason = "timeout"
+                break
+            cpu.run(min(max_steps, cpu.step_count + CHUNK_STEPS), blocks=job.get("blocks", False))
+        result["halt_reason"] = reason or cpu.halt_reason
+        result["steps"] = cpu.step_count
+        result["pc"] = cpu.pc
+        result["regs"] = list(cpu.regs.regs)
+        result["memory"] = {
+            "0x%08X" % base: [dmem.load_word(base + 4 * i) for i in range(count)]
+            for base, count in job.get("dump", [])
+        }
+    except Exception as e:  # report, don't kill the whole batch
+        result["halt_reason"] = "error"
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+    result["seconds"] = round(time.perf_counter() - t0, 6)
+    return result
+
+
+def collect_jobs(source: str, max_steps: int, timeout: Optional[float],
+                 dump: List[Tuple[int, int]], blocks: bool = False) -> List[Dict]:
+    """Expand a directory (recursively) or a manifest file into job dicts."""
+    defaults = {"max_steps": max_steps, "timeout": timeout, "dump": dump, "blocks": blocks}
+    jobs = []
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if name.endswith(PROGRAM_EXTS):
+                    jobs.append(dict(defaults, path=os.path.join(root, name)))
+        jobs.sort(key=lambda j: j["path"])
+        return jobs
+    here = os.path.dirname(os.path.abspath(source))
+    with open(source) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            entry = json.loads(line) if line.startswith("{") else {"path": line}
+            job = dict(defaults, **entry)
+            job["path"] = os.path.join(here, job["path"])
+            jobs.append(job)
+    return jobs
+
+
+def run_batch(jobs: List[Dict], workers: Optional[int] = None) -> Iterator[Dict]:
+    """Yield results in completion order. The pool's workers are reused
+    across programs, so interpreter startup is paid once per worker."""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_one, job) for job in jobs]
+        for fut in as_completed(futures):
+            yield fut.result()
+
+
+def _parse_dump(spec: str) -> Tuple[int, int]:
+    base, count = spec.split(":")
+    return int(base, 0), int(count, 0)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: python batch.py <dir|manifest> [--workers N] [--max-steps N] "
+              "[--timeout S] [--dump BASE:COUNT ...] [--blocks] [-o out.jsonl]")
+        sys.exit(1)
+    source = args[0]
+    workers = None
+    max_steps = 100000
+    timeout = None
+    dump = []
+    blocks = False
+    out_path = None
+    i = 1
+    while i < len(args):
+        a = args[i]
+        if a == "--workers":
+            workers = int(args[i + 1]); i += 2
+        elif a == "--max-steps":
+            max_steps = int(args[i + 1]); i += 2
+        elif a == "--timeout":
+            timeout = float(args[i + 1]); i += 2
+        elif a == "--dump":
+            dump.append(_parse_dump(args[i + 1])); i += 2
+        elif a == "--blocks":
+            blocks = True; i += 1
+        elif a == "-o":
+            out_path = args[i + 1]; i += 2
+        else:
+            print("Unknown option:", a); sys.exit(2)
+
+    jobs = collect_jobs(source, max_steps, timeout, dump, blocks)
+    out = open(out_path, "w") if out_path else sys.stdout
+    try:
+        for result in run_batch(jobs, workers):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+# Set-associative cache simulator for cpu.CPU. Caches only keep tags and
+# replacement state (data always lives in InstrMemory / DataMemory), so
+# turning them on never changes architectural results.
+#
+#   hier = CacheHierarchy(l1d=dict(size=8192, assoc=2), l2=dict(size=65536))
+#   hier.attach(cpu)
+#   cpu.run()
+#   hier.report()
+#
+# Tags, dirty bits and replacement state sit in flat array / bytearray
+# buffers indexed by set * assoc + way, with a line -> slot dict as an index
+# over the tags for the hit path. Each set also remembers the line it
+# touched last: hitting that line again changes no replacement state, so
+# the memory wrappers count such hits inline without calling access().
+# Instruction fetches are only seen in step mode: compiled blocks
+# (run(blocks=True)) do not fetch per instruction, and attach() warns when
+# such a CPU is run that way.
+
+import random
+import warnings
+from array import array
+from typing import Dict, List, Optional
+
+POLICIES = ("lru", "plru", "random")
+
+
+def _log2(n: int, what: str) -> int:
+    if n < 1 or n & (n - 1):
+        raise ValueError(what + " must be a power of two: " + str(n))
+    return n.bit_length() - 1
+
+
+class Cache:
+    """One cache level.
+
+    size and line_size are in bytes; assoc ways per set. policy is "lru",
+    "plru" (tree pseudo-LRU) or "random". Write-back caches allocate on a
+    write miss; write-through caches forward every write to next_level and,
+    unless write_allocate=True, do not allocate. next_level is another
+    Cache, or None for main memory.
+
+    Misses and evictions are also counted per PC and per 2**region_shift
+    byte address region in per_pc / per_region ([hits, misses, evictions]);
+    per-key hits cost a dict update on every access and are only kept with
+    track_hits=True.
+    """
+
+    def __init__(self, size: int = 16384, assoc: int = 4, line_size: int = 32,
+                 policy: str = "lru", write_back: bool = True,
+                 write_allocate: Optional[bool] = None, next_level: Optional["Cache"] = None,
+                 name: str = "cache", region_shift: int = 16, track_hits: bool = False,
+                 seed: int = 0):
+        if policy not in POLICIES:
+            raise ValueError("Unknown replacement policy: " + str(policy))
+        self.line_shift = _log2(line_size, "line size")
+        _log2(assoc, "associativity")
+        if size < line_size * assoc:
+            raise ValueError("cache smaller than one set: " + str(size))
+        self.sets = size // (line_size * assoc)
+        self.set_mask = (1 << _log2(self.sets, "set count")) - 1
+        self.size = size
+        self.assoc = assoc
+        self.line_size = line_size
+        self.policy = policy
+        self.write_back = write_back
+        self.write_allocate = write_back if write_allocate is None else write_allocate
+        self.next_level = next_level
+        self.name = name
+        self.region_shift = region_shift
+        self.track_hits = track_hits
+
+        n = self.sets * assoc
+        self.tags = array("q", [-1]) * n       # line address, -1 = invalid
+        self.dirty = bytearray(n)
+        self.stamp = array("Q", [0]) * n        # lru: last-use tick per way
+        self.tree = array("Q", [0]) * self.sets  # plru: assoc-1 tree bits per set
+        self.resident: Dict[int, int] = {}       # line -> slot, an index over tags
+        self._lru = policy == "lru"
+        self.rng = random.Random(seed)
+        self.tick = 0
+        # per set: the line touched last and its slot (the MRU fast path)
+        self.mru_line = [-1] * self.sets
+        self.mru_slot = [0] * self.sets
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writebacks = 0
+        self.per_pc: Dict[int, List[int]] = {}
+        self.per_region: Dict[int, List[int]] = {}
+
+    # ---- access ----
+
+    def access(self, addr: int, write: bool = False, pc: int = 0) -> bool:
+        """Look up addr; fill / evict as the policies say. Returns hit."""
+        line = addr >> self.line_shift
+        s = line & self.set_mask
+        if self.mru_line[s] == line:
+            # still resident and already the most recently used way of its set
+            self.hits += 1
+            if write:
+                self._write_hit(self.mru_slot[s], addr, pc)
+            return True
+        way = self.resident.get(line)
+        if way is not None:
+            self.hits += 1
+            if self.track_hits:
+                self._count(pc, addr, 0)
+            if self._lru:
+                self.tick += 1
+                self.stamp[way] = self.tick
+            else:
+                self._touch(way, way - way % self.assoc)
+            if write:
+                self._write_hit(way, addr, pc)
+            if not self.track_hits:
+                self.mru_line[s], self.mru_slot[s] = line, way
+            return True
+
+        base = s * self.assoc
+        tags = self.tags
+        self.misses += 1
+        self._count(pc, addr, 1)
+        if write and not self.write_allocate:
+            if self.next_level is not None:
+                self.next_level.access(addr, True, pc)
+            return False
+        way = self._victim(base)
+        old = tags[way]
+        if old >= 0:
+            del self.resident[old]
+            self.evictions += 1
+            self._count(pc, old << self.line_shift, 2)
+            if self.dirty[way]:
+                self.writebacks += 1
+                if self.next_level is not None:
+                    self.next_level.access(old << self.line_shift, True, pc)
+        if self.next_level is not None:
+            self.next_level.access(addr, False, pc)
+        tags[way] = line
+        self.resident[line] = way
+        self.dirty[way] = 0
+        if self._lru:
+            self.tick += 1
+            self.stamp[way] = self.tick
+        else:
+            self._touch(way, base)
+        if write:
+            self._write_hit(way, addr, pc)
+        # with per-key hit counts every access must reach access(), so the
+        # MRU shortcut (here and in the memory wrappers) stays disabled
+        if not self.track_hits:
+            self.mru_line[s], self.mru_slot[s] = line, way
+        return False
+
+    def _write_hit(self, way: int, addr: int, pc: int):
+        if self.write_back:
+            self.dirty[way] = 1
+        elif self.next_level is not None:
+            self.next_level.access(addr, True, pc)
+
+    def _count(self, pc: int, addr: int, slot: int):
+        c = self.per_pc.get(pc)
+        if c is None:
+            c = self.per_pc[pc] = [0, 0, 0]
+        c[slot] += 1
+        region = addr >> self.region_shift
+        c = self.per_region.get(region)
+        if c is None:
+            c = self.per_region[region] = [0, 0, 0]
+        c[slot] += 1
+
+    # ---- replacement ----
+
+    def _touch(self, way: int, base: int):
+        if self.policy == "lru":
+            self.tick += 1
+            self.stamp[way] = self.tick
+        elif self.policy == "plru":
+            # point every node on the path away from the way just used
+            s = base // self.assoc
+            bits = self.tree[s]
+            w = way - base
+            node = 1
+            level = self.assoc >> 1
+            while level:
+                half = 1 if w & level else 0
+                if half:
+                    bits &= ~(1 << node)
+                else:
+                    bits |= 1 << node
+                node = 2 * node + half
+                level >>= 1
+            self.tree[s] = bits
+
+    def _victim(self, base: int) -> int:
+        ways = self.tags[base:base + self.assoc]
+        if -1 in ways:
+            return base + ways.index(-1)
+        if self._lru:
+            stamp = self.stamp[base:base + self.assoc]
+            return base + stamp.index(min(stamp))
+        if self.policy == "plru":
+            bits = self.tree[base // self.assoc]
+            node = 1
+            w = 0
+            level = self.assoc >> 1
+            while level:
+                half = (bits >> node) & 1
+                w |= level if half else 0
+                node = 2 * node + half
+                level >>= 1
+            return base + w
+        return base + self.rng.randrange(self.assoc)
+
+    # ---- results ----
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"name": self.name, "accesses": total, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions,
+                "writebacks": self.writebacks,
+                "miss_rate": self.misses / total if total else 0.0}
+
+    def top_pcs(self, n: int = 10):
+        """(pc, hits, misses, evictions) for the n PCs with most misses."""
+        top = sorted(self.per_pc.items(), key=lambda kv: (-kv[1][1], kv[0]))[:n]
+        return [(pc, h, m, e) for pc, (h, m, e) in top]
+
+
+class CachedInstrMemory:
+    """InstrMemory whose fetches go through an instruction cache."""
+
+    def __init__(self, imem, cache: Cache):
+        self.imem = imem
+        self.cache = cache
+        self._decoded = imem.decoded
+        self._fetch_decoded = imem.fetch_decoded
+        self._base = imem.base
+        self._shift = cache.line_shift
+        self._mask = cache.set_mask
+        self._mru = cache.mru_line
+        self._warned = False
+
+    def on_block_mode(self):
+        """Called by CPU.run_blocks: compiled blocks bypass fetch_decoded."""
+        if not self._warned:
+            self._warned = True
+            warnings.warn(self.cache.name + " statistics are incomplete: run(blocks=True) "
+                          "does not fetch per instruction; use blocks=False",
+                          RuntimeWarning, stacklevel=4)
+
+    def fetch(self, pc: int) -> int:
+        self.cache.access(pc, False, pc)
+        return self.imem.fetch(pc)
+
+    def fetch_decoded(self, pc: int):
+        # hot path: an MRU line hit and an already predecoded word, without
+        # calling into either object
+        line = pc >> self._shift
+        if self._mru[line & self._mask] == line:
+            self.cache.hits += 1
+        else:
+            self.cache.access(pc, False, pc)
+        d = self._decoded.get((pc - self._base) >> 2)
+        if d is None:
+            return self._fetch_decoded(pc)
+        return d
+
+    def __getattr__(self, name):
+        return getattr(self.imem, name)
+
+
+class CachedDataMemory:
+    """DataMemory whose loads and stores go through a data cache. Accesses
+    are attributed to cpu.pc, which handlers only advance afterwards and
+    compiled blocks set to each load / store's PC."""
+
+    def __init__(self, dmem, cache: Cache, cpu):
+        self.dmem = dmem
+        self.cache = cache
+        self.cpu = cpu
+        self._shift = cache.line_shift
+        self._mask = cache.set_mask
+        self._mru = cache.mru_line
+        self._load_word = dmem.load_word
+        self._store_word = dmem.store_word
+
+    def _access(self, addr: int, size: int, write: bool):
+        addr &= 0xFFFFFFFF
+        cache = self.cache
+        shift = self._shift
+        line = addr >> shift
+        s = line & self._mask
+        if self._mru[s] == line and (addr + size - 1) >> shift == line \
+                and (not write or cache.write_back):
+            cache.hits += 1  # inlined MRU hit
+            if write:
+                cache.dirty[cache.mru_slot[s]] = 1
+            return
+        pc = self.cpu.pc
+        cache.access(addr, write, pc)
+        last = addr + size - 1
+        if last >> shift != line:
+            cache.access(last & 0xFFFFFFFF, write, pc)
+
+    def load_byte(self, addr: int) -> int:
+        self._access(addr, 1, False)
+        return self.dmem.load_byte(addr)
+
+    def load_half(self, addr: int) -> int:
+        self._access(addr, 2, False)
+        return self.dmem.load_half(addr)
+
+    def load_word(self, addr: int) -> int:
+        # the hottest accesses repeat _access's MRU hit inline
+        a = addr & 0xFFFFFFFF
+        line = a >> self._shift
+        if self._mru[line & self._mask] == line == (a + 3) >> self._shift:
+            self.cache.hits += 1
+        else:
+            self._access(a, 4, False)
+        return self._load_word(addr)
+
+    def store_byte(self, addr: int, value: int):
+        self._access(addr, 1, True)
+        self.dmem.store_byte(addr, value)
+
+    def store_half(self, addr: int, value: int):
+        self._access(addr, 2, True)
+        self.dmem.store_half(addr, value)
+
+    def store_word(self, addr: int, value: int):
+        a = addr & 0xFFFFFFFF
+        line = a >> self._shift
+        s = line & self._mask
+        cache = self.cache
+        if self._mru[s] == line == (a + 3) >> self._shift and cache.write_back:
+            cache.hits += 1
+            cache.dirty[cache.mru_slot[s]] = 1
+        else:
+            self._access(a, 4, True)
+        self._store_word(addr, value)
+
+    def __getattr__(self, name):
+        return getattr(self.dmem, name)
+
+
+class CacheHierarchy:
+    """L1I + L1D with an optional unified L2 behind both.
+
+    Each level is given as a dict of Cache keyword arguments (or None to
+    leave it out).
+    """
+
+    def __init__(self, l1i: Optional[dict] = None, l1d: Optional[dict] = None,
+                 l2: Optional[dict] = None):
+        self.l2 = None
+        if l2 is not None:
+            cfg = dict(size=131072, assoc=8, line_size=64)
+            cfg.update(l2)
+            self.l2 = Cache(name="L2", **cfg)
+        self.l1i = Cache(name="L1I", next_level=self.l2, **dict(l1i or {}))
+        self.l1d = Cache(name="L1D", next_level=self.l2, **dict(l1d or {}))
+        self.cpu = None
+
+    def attach(self, cpu):
+        """Route cpu's instruction fetches and data accesses through the
+        caches (wrapping its memories in place)."""
+        self.cpu = cpu
+        cpu.imem = CachedInstrMemory(cpu.imem, self.l1i)
+        cpu.dmem = CachedDataMemory(cpu.dmem, self.l1d, cpu)
+
+    def detach(self):
+        cpu = self.cpu
+        if cpu is not None:
+            cpu.imem = cpu.imem.imem
+            cpu.dmem = cpu.dmem.dmem
+            self.cpu = None
+
+    def levels(self) -> List[Cache]:
+        return [c for c in (self.l1i, self.l1d, self.l2) if c is not None]
+
+    def report(self, top: int = 10) -> dict:
+        out = {}
+        for c in self.levels():
+            rep = c.stats()
+            rep["top_pcs"] = [{"pc": pc, "hits": h, "misses": m, "evictions": e}
+                              for pc, h, m, e in c.top_pcs(top)]
+            rep["regions"] = {r << c.region_shift: {"hits": h, "misses": m, "evictions": e}
+                              for r, (h, m, e) in sorted(c.per_region.items())}
+            out[c.name] = rep
+        return out
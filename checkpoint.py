@@ -0,0 +1,287 @@
+# Architectural checkpoints for cpu.CPU: snapshot, restore, save / load and
+# periodic checkpointing during a run.
+#
+# A Checkpoint holds the integer and float registers, fcsr, pc, step and
+# cycle counters, the instruction words (stores may have rewritten them)
+# and every non-zero data page as an immutable bytes object. Snapshots taken
+# against a previous one share the bytes of every page that did not change,
+# so a series of checkpoints costs one copy of memory plus the pages each
+# interval dirtied.
+#
+#   ck = Checkpointer(cpu, every=100000)
+#   ck.run(10_000_000)                    # runs at full speed between snapshots
+#   ck.fast_forward(other_cpu, 5_123_456) # restore the nearest one, step on
+
+import struct
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from cpu import PAGE_SHIFT, PAGE_SIZE
+
+MAGIC = b"RVCK"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBIQQII")   # magic, version, running, halt, pc,
+                                        # step_count, extra_cycles, fcsr, code words
+HALT_REASONS = (None, "halt", "illegal")
+_ZERO_PAGE = bytes(PAGE_SIZE)
+
+
+class Checkpoint:
+    """Architectural state of a CPU at one step. Pages map page number to
+    PAGE_SIZE bytes; absent pages read as zero."""
+
+    __slots__ = ("pc", "step_count", "extra_cycles", "running", "halt_reason",
+                 "regs", "fregs", "fcsr", "code", "pages")
+
+    def __init__(self, pc: int, step_count: int, extra_cycles: int, running: bool,
+                 halt_reason: Optional[str], regs: Tuple[int, ...], fregs: Tuple[int, ...],
+                 fcsr: int, code: bytes, pages: Dict[int, bytes]):
+        self.pc = pc
+        self.step_count = step_count
+        self.extra_cycles = extra_cycles
+        self.running = running
+        self.halt_reason = halt_reason
+        self.regs = regs
+        self.fregs = fregs
+        self.fcsr = fcsr
+        self.code = code
+        self.pages = pages
+
+    def same_state(self, other: "Checkpoint") -> bool:
+        """Equal architectural state (counters aside)."""
+        if (self.pc, self.regs, self.fregs, self.fcsr, self.running) != \
+                (other.pc, other.regs, other.fregs, other.fcsr, other.running):
+            return False
+        if self.code is not other.code and self.code != other.code:
+            return False
+        if self.pages.keys() != other.pages.keys():
+            return False
+        return all(p is other.pages[pn] or p == other.pages[pn] for pn, p in self.pages.items())
+
+    # ---- binary form ----
+
+    def to_bytes(self, level: int = 6) -> bytes:
+        """zlib-compressed binary image (HEADER, registers, code, pages)."""
+        parts = [HEADER.pack(MAGIC, VERSION, 1 if self.running else 0,
+                             HALT_REASONS.index(self.halt_reason), self.pc,
+                             self.step_count, self.extra_cycles, self.fcsr,
+                             len(self.code) // 4),
+                 array("I", self.regs).tobytes(), array("Q", self.fregs).tobytes(),
+                 self.code, struct.pack("<I", len(self.pages))]
+        for pn in sorted(self.pages):
+            parts.append(struct.pack("<I", pn))
+            parts.append(self.pages[pn])
+        return zlib.compress(b"".join(parts), level)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "Checkpoint":
+        try:
+            raw = memoryview(zlib.decompress(blob))
+        except zlib.error as e:
+            raise ValueError("corrupt checkpoint: " + str(e))
+        magic, version, running, halt, pc, steps, extra, fcsr, nwords = HEADER.unpack_from(raw, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a version %d checkpoint" % VERSION)
+        pos = HEADER.size
+        regs = tuple(_unpack_array("I", raw[pos:pos + 128]))
+        pos += 128
+        fregs = tuple(_unpack_array("Q", raw[pos:pos + 256]))
+        pos += 256
+        code = bytes(raw[pos:pos + 4 * nwords])
+        pos += 4 * nwords
+        (npages,) = struct.unpack_from("<I", raw, pos)
+        pos += 4
+        pages = {}
+        for _ in range(npages):
+            (pn,) = struct.unpack_from("<I", raw, pos)
+            pages[pn] = bytes(raw[pos + 4:pos + 4 + PAGE_SIZE])
+            pos += 4 + PAGE_SIZE
+        return cls(pc, steps, extra, bool(running), HALT_REASONS[halt], regs, fregs,
+                   fcsr, code, pages)
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path: str) -> "Checkpoint":
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def _unpack_array(typecode: str, data) -> array:
+    a = array(typecode)
+    a.frombytes(data)
+    return a
+
+
+def _page_numbers(dmem) -> List[int]:
+    pns = set(dmem.pages)
+    for base, view in dmem.backing:
+        if len(view):
+            pns.update(range(base >> PAGE_SHIFT, ((base + len(view) - 1) >> PAGE_SHIFT) + 1))
+    return sorted(pns)
+
+
+def _code_bytes(words) -> bytes:
+    if isinstance(words, (memoryview, array)):
+        return words.tobytes()
+    return array("I", words).tobytes()
+
+
+def snapshot(cpu, base: Optional[Checkpoint] = None) -> Checkpoint:
+    """Capture cpu's state. Pages (and code) equal to those in base reuse
+    base's bytes objects instead of new copies."""
+    dmem = cpu.dmem
+    old = base.pages if base is not None else {}
+    pages = {}
+    for pn in _page_numbers(dmem):
+        view = dmem.read_region(pn << PAGE_SHIFT, PAGE_SIZE)
+        prev = old.get(pn)
+        if prev is not None and view == prev:
+            pages[pn] = prev
+        elif view != _ZERO_PAGE:
+            pages[pn] = bytes(view)
+    code = _code_bytes(cpu.imem.words)
+    if base is not None and code == base.code:
+        code = base.code
+    return Checkpoint(cpu.pc, cpu.step_count, cpu.extra_cycles, cpu.running,
+                      cpu.halt_reason, tuple(cpu.regs.regs), tuple(cpu.fregs.regs),
+                      cpu.fcsr, code, pages)
+
+
+def restore(cpu, ck: Checkpoint):
+    """Put cpu (this one or a fresh CPU over the same program, possibly with
+    another backend or latencies) into the checkpointed state."""
+    cpu.regs.regs[:] = ck.regs          # in place: run loops hold the list
+    cpu.fregs.regs[:] = ck.fregs
+    cpu.fcsr = ck.fcsr
+    cpu.pc = ck.pc
+    cpu.step_count = ck.step_count
+    cpu.extra_cycles = ck.extra_cycles
+    cpu.running = ck.running
+    cpu.halt_reason = ck.halt_reason
+    dmem = getattr(cpu.dmem, "dmem", cpu.dmem)   # under a CachedDataMemory
+    dmem.backing = []                   # every mapped page is in the checkpoint
+    dmem.pages = {pn: bytearray(p) for pn, p in ck.pages.items()}
+    imem = getattr(cpu.imem, "imem", cpu.imem)
+    if _code_bytes(imem.words) != ck.code:
+        # undo self-modifying stores the way InstrMemory.store reports them
+        for idx, w in enumerate(_unpack_array("I", ck.code)):
+            if imem.words[idx] != w:
+                imem.words[idx] = w
+                imem.decoded.pop(idx, None)
+                for listener in imem.write_listeners:
+                    listener(imem.base + 4 * idx)
+
+class Checkpointer:
+    """Runs a CPU, snapshotting it every `every` steps (and at the start).
+
+    keep bounds how many checkpoints are held; the oldest are dropped
+    first. Between snapshots the CPU runs through its normal run() loop,
+    blocks included, so there is no per-step cost.
+    """
+
+    def __init__(self, cpu, every: int = 100000, keep: Optional[int] = None):
+        if every < 1:
+            raise ValueError("checkpoint interval must be >= 1")
+        self.cpu = cpu
+        self.every = every
+        self.keep = keep
+        self.checkpoints: List[Checkpoint] = []
+
+    def take(self) -> Checkpoint:
+        base = self.checkpoints[-1] if self.checkpoints else None
+        ck = snapshot(self.cpu, base)
+        self.checkpoints.append(ck)
+        if self.keep is not None and len(self.checkpoints) > self.keep:
+            del self.checkpoints[0]
+        return ck
+
+    def run(self, max_steps: int = 100000, blocks: bool = False):
+        cpu = self.cpu
+        if not self.checkpoints or self.checkpoints[-1].step_count != cpu.step_count:
+            self.take()
+        while cpu.running and cpu.step_count < max_steps:
+            nxt = (cpu.step_count // self.every + 1) * self.every
+            cpu.run(min(nxt, max_steps), blocks=blocks)
+            if cpu.step_count == nxt:
+                self.take()
+
+    def nearest(self, step: int) -> Checkpoint:
+        """Latest checkpoint at or before step."""
+        best = None
+        for ck in self.checkpoints:
+            if ck.step_count <= step:
+                best = ck
+        if best is None:
+            raise ValueError("no checkpoint at or before step " + str(step))
+        return best
+
+    def fast_forward(self, cpu, step: int):
+        """Bring cpu to exactly step: restore the nearest checkpoint, then
+        execute the remainder."""
+        restore(cpu, self.nearest(step))
+        cpu.run(step)
+
+
+def _store_pages(cpu):
+    """Pages the instruction at cpu.pc will write, if it is a store."""
+    d = cpu.imem.fetch_decoded(cpu.pc)
+    if d.opcode not in (0x23, 0x27):
+        return ()
+    addr = (cpu.regs.regs[d.rs1] + d.imm) & 0xFFFFFFFF
+    last = (addr + (1 << (d.funct3 & 3)) - 1) & 0xFFFFFFFF
+    return {addr >> PAGE_SHIFT, last >> PAGE_SHIFT}
+
+
+def _same_step_state(cpu_a, cpu_b, pages) -> bool:
+    if (cpu_a.pc, cpu_a.running, cpu_a.fcsr) != (cpu_b.pc, cpu_b.running, cpu_b.fcsr):
+        return False
+    if cpu_a.regs.regs != cpu_b.regs.regs or cpu_a.fregs.regs != cpu_b.fregs.regs:
+        return False
+    return all(cpu_a.dmem.read_region(pn << PAGE_SHIFT, PAGE_SIZE)
+               == cpu_b.dmem.read_region(pn << PAGE_SHIFT, PAGE_SIZE) for pn in pages)
+
+
+def first_divergence(cpu_a, ck_a: Checkpointer, cpu_b, ck_b: Checkpointer,
+                     max_steps: Optional[int] = None) -> Optional[int]:
+    """Step count of the first instruction after which two runs' states
+    differ, or None. Bisects the two checkpoint series (taken at the same
+    steps), then replays the interval singly on cpu_a and cpu_b, which are
+    left at the divergence for inspection.
+
+    When every checkpoint pair agrees the replay covers the rest of the
+    runs: up to the furthest step either CPU reached (or max_steps).
+    Replayed steps compare registers, pc and the pages each store writes;
+    memory agreed at the checkpoint, so no other page can differ.
+    """
+    pairs = [(a, b) for a, b in zip(ck_a.checkpoints, ck_b.checkpoints)
+             if a.step_count == b.step_count]
+    if not pairs or not pairs[0][0].same_state(pairs[0][1]):
+        return pairs[0][0].step_count if pairs else None
+    lo, hi = 0, len(pairs)          # pairs[lo] agrees; search the first that does not
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if pairs[mid][0].same_state(pairs[mid][1]):
+            lo = mid
+        else:
+            hi = mid
+    if hi < len(pairs):
+        limit = pairs[hi][0].step_count
+    else:
+        limit = max(cpu_a.step_count, cpu_b.step_count)
+    if max_steps is not None:
+        limit = min(limit, max_steps)
+    restore(cpu_a, pairs[lo][0])
+    restore(cpu_b, pairs[lo][1])
+    while (cpu_a.running or cpu_b.running) and max(cpu_a.step_count, cpu_b.step_count) < limit:
+        pages = set()
+        for cpu in (cpu_a, cpu_b):
+            if cpu.running:
+                pages.update(_store_pages(cpu))
+                cpu.step()
+        if not _same_step_state(cpu_a, cpu_b, pages):
+            return cpu_a.step_count
+    return None
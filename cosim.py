@@ -0,0 +1,594 @@
+# Lockstep differential co-simulation of cpu.CPU against a golden reference.
+#
+# After every retired instruction the CPU's effects (pc, instruction word,
+# registers written, stores, whether it stopped) are compared with the
+# reference's, and the run stops at the first difference:
+#
+#   sim = CoSim(cpu, RefInterpreter.from_cpu(cpu))
+#   div = sim.run(10 ** 7)
+#   if div is not None:
+#       print(div)
+#
+# References:
+#   RefInterpreter - a small RV32IM interpreter written independently of
+#                    cpu.py (plain ints, its own decoder and memory). It has
+#                    no FPU: F/D and CSR instructions adopt the CPU's results.
+#   CommitLog      - a spike --log-commits file.
+#
+# With sample_every=N the CPU runs N steps at full speed, the reference
+# catches up, and their registers, pc and memory writes are compared. A
+# mismatch rewinds both to the start of the interval (checkpoint.restore on
+# the CPU) and replays it in lockstep to find the exact instruction.
+
+import re
+from array import array
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+
+from checkpoint import restore, snapshot
+from cputrace import CLASSES, _rd_kind, instruction_class
+
+_M32 = 0xFFFFFFFF
+_STORE = CLASSES.index("store")
+
+# One retired instruction: regs is ((name, value), ...) without x0, stores
+# is ((addr, size, value), ...), halted is True / False (None: unknown).
+Commit = namedtuple("Commit", "pc inst regs stores halted")
+
+
+def cpu_commit(cpu, d, pc: int, a: int, b: int) -> Commit:
+    """The Commit of the instruction cpu just retired (see run_observed)."""
+    regs = ()
+    kind = _rd_kind(d)
+    if kind == 1 and d.rd:
+        regs = (("x%d" % d.rd, cpu.regs.regs[d.rd]),)
+    elif kind == 2:
+        regs = (("f%d" % d.rd, cpu.fregs.regs[d.rd]),)
+    stores = ()
+    if instruction_class(d) == _STORE:
+        size = 1 << (d.funct3 & 3)
+        src = b if d.opcode == 0x23 else cpu.fregs.regs[d.rs2]
+        stores = (((a + d.imm) & _M32, size, src & ((1 << 8 * size) - 1)),)
+    return Commit(pc, d.inst, regs, stores, not cpu.running)
+
+
+def diff_commits(got: Commit, exp: Commit) -> List[Tuple[str, object, object]]:
+    """[(what, cpu value, reference value)] for every field that differs."""
+    diffs = []
+    if got.pc != exp.pc:
+        diffs.append(("pc", got.pc, exp.pc))
+    if got.inst != exp.inst:
+        diffs.append(("inst", got.inst, exp.inst))
+    g, e = dict(got.regs), dict(exp.regs)
+    for name in sorted(set(g) | set(e)):
+        if g.get(name) != e.get(name):
+            diffs.append((name, g.get(name), e.get(name)))
+    if sorted(got.stores) != sorted(exp.stores):
+        diffs.append(("stores", got.stores, exp.stores))
+    if exp.halted is not None and got.halted != exp.halted:
+        diffs.append(("halted", got.halted, exp.halted))
+    return diffs
+
+
+def _hex(v) -> str:
+    if isinstance(v, int) and not isinstance(v, bool):
+        return "0x%08X" % v
+    if isinstance(v, tuple):
+        return "[" + ", ".join("%s/%d=%s" % (_hex(a), n, _hex(x)) for a, n, x in v) + "]"
+    return str(v)
+
+
+class Divergence:
+    """First mismatch: the step count after the offending instruction, its
+    pc / word (None when found by a state comparison) and the diffs."""
+
+    def __init__(self, step: int, pc: int, inst: Optional[int],
+                 diffs: List[Tuple[str, object, object]],
+                 expected: Optional[Commit] = None, actual: Optional[Commit] = None):
+        self.step = step
+        self.pc = pc
+        self.inst = inst
+        self.diffs = diffs
+        self.expected = expected
+        self.actual = actual
+
+    def report(self) -> dict:
+        return {"step": self.step, "pc": self.pc, "inst": self.inst,
+                "diffs": [{"what": w, "cpu": c, "ref": r} for w, c, r in self.diffs]}
+
+    def __str__(self) -> str:
+        where = "pc 0x%08X" % self.pc
+        if self.inst is not None:
+            where += " (0x%08X)" % self.inst
+        lines = ["divergence at step %d, %s" % (self.step, where)]
+        for what, c, r in self.diffs[:16]:
+            lines.append("  %-10s cpu %s  ref %s" % (what, _hex(c), _hex(r)))
+        if len(self.diffs) > 16:
+            lines.append("  ... %d more" % (len(self.diffs) - 16))
+        return "\n".join(lines)
+
+
+# ---------------- reference interpreter ----------------
+
+def _sx(v: int, bits: int) -> int:
+    return v - (1 << bits) if (v >> (bits - 1)) & 1 else v
+
+
+def _signed(v: int) -> int:
+    return v - (1 << 32) if v & 0x80000000 else v
+
+
+class RefInterpreter:
+    """Minimal RV32IM interpreter with cpu.CPU's machine conventions: words
+    0 and 0x0000006F halt, fetches outside the image halt, stores into the
+    image also rewrite it when unified_memory is set (as in the CPU), and
+    ecall / ebreak / bad encodings stop with the pc advanced.
+
+    stores maps each byte address written since the last save() to its
+    value. save() / load() rewind to the last save point through an undo
+    log of the pages written since.
+    """
+
+    def __init__(self, words, base: int = 0, pc: int = 0, regs=None,
+                 pages: Optional[Dict[int, bytes]] = None, unified_memory: bool = False):
+        self.code = list(words)
+        self.base = base
+        self.unified_memory = unified_memory
+        self.pc = pc
+        self.regs = list(regs) if regs is not None else [0] * 32
+        self.fregs = [0] * 32
+        self.mem: Dict[int, bytearray] = {pn: bytearray(p) for pn, p in (pages or {}).items()}
+        self.halted = False
+        self.adopted = 0        # instructions whose effects came from the CPU
+        self.stores: Dict[int, int] = {}
+        self._undo: Dict[int, Optional[bytes]] = {}
+
+    @classmethod
+    def from_cpu(cls, cpu) -> "RefInterpreter":
+        """A reference starting from cpu's current state."""
+        ck = snapshot(cpu)
+        words = array("I")
+        words.frombytes(ck.code)
+        ref = cls(words, getattr(cpu.imem, "base", 0), ck.pc, ck.regs, ck.pages,
+                  cpu.unified_memory)
+        ref.fregs = list(ck.fregs)
+        ref.halted = not ck.running
+        return ref
+
+    # ---- memory ----
+
+    def _load(self, addr: int, n: int) -> int:
+        v = 0
+        for i in range(n):
+            a = (addr + i) & _M32
+            page = self.mem.get(a >> 12)
+            if page is not None:
+                v |= page[a & 0xFFF] << (8 * i)
+        return v
+
+    def _store(self, addr: int, n: int, value: int):
+        for i in range(n):
+            a = (addr + i) & _M32
+            byte = (value >> (8 * i)) & 0xFF
+            pn = a >> 12
+            page = self.mem.get(pn)
+            if pn not in self._undo:
+                self._undo[pn] = bytes(page) if page is not None else None
+            if page is None:
+                page = self.mem[pn] = bytearray(4096)
+            page[a & 0xFFF] = byte
+            self.stores[a] = byte
+            idx = (a - self.base) >> 2
+            if self.unified_memory and a >= self.base and idx < len(self.code):
+                sh = 8 * ((a - self.base) & 3)
+                self.code[idx] = (self.code[idx] & ~(0xFF << sh)) | (byte << sh)
+
+    # ---- execution ----
+
+    def _fetch(self, pc: int) -> int:
+        idx = (pc - self.base) >> 2
+        if pc < self.base or idx >= len(self.code):
+            return 0
+        return self.code[idx]
+
+    def _execute(self, pc: int, inst: int):
+        """(next pc, rd, value, stores, halted), or None for an instruction
+        this interpreter does not implement."""
+        x = self.regs
+        op = inst & 0x7F
+        rd = (inst >> 7) & 0x1F
+        f3 = (inst >> 12) & 7
+        a = x[(inst >> 15) & 0x1F]
+        b = x[(inst >> 20) & 0x1F]
+        f7 = inst >> 25
+        imm = _sx(inst >> 20, 12)
+        nxt = (pc + 4) & _M32
+        illegal = (nxt, 0, 0, (), True)
+        if inst == 0 or inst == 0x6F:
+            return pc, 0, 0, (), True
+        if op == 0x37:
+            return nxt, rd, inst & 0xFFFFF000, (), False
+        if op == 0x17:
+            return nxt, rd, (pc + (inst & 0xFFFFF000)) & _M32, (), False
+        if op == 0x6F:
+            off = _sx(((inst >> 31) << 20) | (((inst >> 12) & 0xFF) << 12)
+                      | (((inst >> 20) & 1) << 11) | (((inst >> 21) & 0x3FF) << 1), 21)
+            return (pc + off) & _M32, rd, nxt, (), False
+        if op == 0x67:
+            return ((a + imm) & ~1) & _M32, rd, nxt, (), False
+        if op == 0x63:
+            off = _sx(((inst >> 31) << 12) | (((inst >> 7) & 1) << 11)
+                      | (((inst >> 25) & 0x3F) << 5) | (((inst >> 8) & 0xF) << 1), 13)
+            if f3 == 0:
+                taken = a == b
+            elif f3 == 1:
+                taken = a != b
+            elif f3 == 4:
+                taken = _signed(a) < _signed(b)
+            elif f3 == 5:
+                taken = _signed(a) >= _signed(b)
+            elif f3 == 6:
+                taken = a < b
+            elif f3 == 7:
+                taken = a >= b
+            else:
+                return illegal
+            return ((pc + off) & _M32 if taken else nxt), 0, 0, (), False
+        if op == 0x03:
+            size = {0: 1, 1: 2, 2: 4, 4: 1, 5: 2}.get(f3)
+            if size is None:
+                return illegal
+            v = self._load(a + imm, size)
+            if f3 < 2:
+                v = _sx(v, 8 * size) & _M32
+            return nxt, rd, v, (), False
+        if op == 0x23:
+            if f3 > 2:
+                return illegal
+            size = 1 << f3
+            s_imm = _sx(((inst >> 25) << 5) | ((inst >> 7) & 0x1F), 12)
+            return nxt, 0, 0, (((a + s_imm) & _M32, size, b & ((1 << 8 * size) - 1)),), False
+        if op == 0x13:
+            sh = (inst >> 20) & 0x1F
+            kind = f7 & 0x7E       # bit 25 is shamt[5] on RV64; RV32 ignores it
+            if f3 == 0:
+                v = a + imm
+            elif f3 == 2:
+                v = int(_signed(a) < imm)
+            elif f3 == 3:
+                v = int(a < (imm & _M32))
+            elif f3 == 4:
+                v = a ^ imm
+            elif f3 == 6:
+                v = a | imm
+            elif f3 == 7:
+                v = a & imm
+            elif f3 == 1 and kind == 0:
+                v = a << sh
+            elif f3 == 5 and kind == 0:
+                v = a >> sh
+            elif f3 == 5 and kind == 0x20:
+                v = _signed(a) >> sh
+            else:
+                return illegal
+            return nxt, rd, v & _M32, (), False
+        if op == 0x33:
+            v = self._alu(f3, f7, a, b)
+            if v is None:
+                return illegal
+            return nxt, rd, v & _M32, (), False
+        if op == 0x0F:  # fence
+            return nxt, 0, 0, (), False
+        if op == 0x73 and f3 in (0, 4):
+            return illegal
+        return None
+
+    @staticmethod
+    def _alu(f3: int, f7: int, a: int, b: int) -> Optional[int]:
+        if f7 == 0x01:
+            sa, sb = _signed(a), _signed(b)
+            if f3 == 0:
+                return a * b
+            if f3 == 1:
+                return (sa * sb) >> 32
+            if f3 == 2:
+                return (sa * b) >> 32
+            if f3 == 3:
+                return (a * b) >> 32
+            if f3 == 4:
+                if b == 0:
+                    return _M32
+                q = abs(sa) // abs(sb)
+                return -q if (sa < 0) != (sb < 0) else q
+            if f3 == 5:
+                return a // b if b else _M32
+            if f3 == 6:
+                if b == 0:
+                    return a
+                r = abs(sa) % abs(sb)
+                return -r if sa < 0 else r
+            return a % b if b else a
+        if f7 == 0x20:
+            if f3 == 0:
+                return a - b
+            if f3 == 5:
+                return _signed(a) >> (b & 0x1F)
+            return None
+        if f7:
+            return None
+        return (a + b, a << (b & 0x1F), int(_signed(a) < _signed(b)), int(a < b),
+                a ^ b, a >> (b & 0x1F), a | b, a & b)[f3]
+
+    def step(self, actual: Optional[Commit] = None, next_pc: Optional[int] = None) -> Optional[Commit]:
+        """Execute one instruction and return its Commit (None once halted).
+        An instruction it cannot execute takes the CPU's actual commit and
+        next_pc; without them the step returns None and changes nothing."""
+        if self.halted:
+            return None
+        pc = self.pc
+        inst = self._fetch(pc)
+        res = self._execute(pc, inst)
+        if res is None:
+            if actual is None:
+                return None
+            self.adopt(actual, next_pc)
+            return actual
+        nxt, rd, value, stores, halted = res
+        regs = ()
+        if rd:
+            self.regs[rd] = value
+            regs = (("x%d" % rd, value),)
+        for addr, size, v in stores:
+            self._store(addr, size, v)
+        self.pc = nxt
+        self.halted = halted
+        return Commit(pc, inst, regs, stores, halted)
+
+    def adopt(self, commit: Commit, next_pc: int):
+        """Apply another model's effects for the current instruction."""
+        for name, value in commit.regs:
+            (self.regs if name[0] == "x" else self.fregs)[int(name[1:])] = value
+        for addr, size, value in commit.stores:
+            self._store(addr, size, value)
+        self.pc = next_pc
+        self.halted = bool(commit.halted)
+        self.adopted += 1
+
+    def advance(self, n: int) -> bool:
+        """Execute n instructions; False if one could not be executed (or
+        the program halted first)."""
+        for _ in range(n):
+            if self.step() is None:
+                return False
+        return True
+
+    def save(self):
+        self._undo = {}
+        self.stores = {}
+        return (self.pc, list(self.regs), list(self.fregs), list(self.code), self.halted,
+                self.adopted)
+
+    def load(self, state):
+        """Rewind to the state returned by the last save()."""
+        for pn, old in self._undo.items():
+            if old is None:
+                self.mem.pop(pn, None)
+            else:
+                self.mem[pn] = bytearray(old)
+        self._undo = {}
+        self.stores = {}
+        pc, regs, fregs, code, halted, adopted = state
+        self.pc, self.halted, self.adopted = pc, halted, adopted
+        self.regs[:] = regs
+        self.fregs[:] = fregs
+        self.code[:] = code
+
+
+# ---------------- spike commit log ----------------
+
+_COMMIT_LINE = re.compile(r"core\s+\d+:\s+\d\s+0x([0-9a-fA-F]+)\s+\(0x([0-9a-fA-F]+)\)(.*)")
+_REG = re.compile(r"([xf])(\d+)$")
+
+
+def parse_commit_line(line: str) -> Optional[Commit]:
+    """Commit for a spike --log-commits line, e.g.
+    'core   0: 3 0x80000010 (0x00b52023) mem 0x80001000 0x0000002a';
+    None for any other line. x values are truncated to 32 bits."""
+    m = _COMMIT_LINE.match(line.strip())
+    if m is None:
+        return None
+    toks = m.group(3).split()
+    regs, stores = [], []
+    i = 0
+    while i < len(toks):
+        t = toks[i]
+        r = _REG.match(t)
+        if t == "mem" and i + 1 < len(toks):
+            addr = int(toks[i + 1], 16) & _M32
+            if i + 2 < len(toks) and toks[i + 2].startswith("0x"):
+                digits = toks[i + 2][2:]
+                stores.append((addr, len(digits) // 2, int(digits, 16)))
+                i += 3
+            else:
+                i += 2          # a load: the value is in the register write
+        elif r is not None and i + 1 < len(toks):
+            value = int(toks[i + 1], 16)
+            if r.group(1) == "x":
+                if r.group(2) != "0":
+                    regs.append(("x" + r.group(2), value & _M32))
+            else:
+                regs.append(("f" + r.group(2), value))
+            i += 2
+        else:
+            i += 2 if i + 1 < len(toks) and toks[i + 1].startswith("0x") else 1  # CSRs
+    return Commit(int(m.group(1), 16) & _M32, int(m.group(2), 16), tuple(regs),
+                  tuple(stores), None)
+
+
+class CommitLog:
+    """Reference that replays a spike --log-commits file. It keeps shadow x
+    registers (starting from regs, or zeros) and the bytes of logged stores
+    so sampled comparisons can check state."""
+
+    def __init__(self, path: str, regs=None):
+        self._fh = open(path, "rb")
+        self.regs = list(regs) if regs is not None else [0] * 32
+        self.fregs = [0] * 32
+        self.stores: Dict[int, int] = {}
+        self.adopted = 0
+        self._next: Optional[Commit] = None
+        self._next_at = 0       # file offset of the line _next came from
+
+    def close(self):
+        self._fh.close()
+
+    def _peek(self) -> Optional[Commit]:
+        while self._next is None:
+            at = self._fh.tell()
+            line = self._fh.readline()
+            if not line:
+                return None
+            self._next = parse_commit_line(line.decode("utf-8", "replace"))
+            self._next_at = at
+        return self._next
+
+    @property
+    def pc(self) -> Optional[int]:
+        c = self._peek()
+        return c.pc if c is not None else None
+
+    def step(self, actual: Optional[Commit] = None, next_pc: Optional[int] = None) -> Optional[Commit]:
+        c = self._peek()
+        if c is None:
+            return None
+        self._next = None
+        for name, value in c.regs:
+            (self.regs if name[0] == "x" else self.fregs)[int(name[1:])] = value
+        for addr, size, value in c.stores:
+            for i in range(size):
+                self.stores[(addr + i) & _M32] = (value >> (8 * i)) & 0xFF
+        return c
+
+    def advance(self, n: int) -> bool:
+        for _ in range(n):
+            if self.step() is None:
+                return False
+        return True
+
+    def save(self):
+        self.stores = {}
+        self._peek()
+        at = self._next_at if self._next is not None else self._fh.tell()
+        return at, list(self.regs), list(self.fregs)
+
+    def load(self, state):
+        at, regs, fregs = state
+        self._fh.seek(at)
+        self._next = None
+        self.stores = {}
+        self.regs[:] = regs
+        self.fregs[:] = fregs
+
+
+# ---------------- harness ----------------
+
+class _Stop(Exception):
+    pass
+
+
+class CoSim:
+    """Runs cpu against reference (a RefInterpreter or CommitLog).
+
+    sample_every=1 compares every instruction. Larger values compare x
+    registers, pc and memory written every sample_every steps and replay
+    a failing interval in lockstep; blocks is passed to CPU.run for the
+    full-speed stretches. Intervals with instructions a RefInterpreter
+    adopts are always replayed, so sampling pays off on integer code.
+    Float registers are only compared in lockstep.
+    """
+
+    def __init__(self, cpu, reference, sample_every: int = 1, blocks: bool = False):
+        if sample_every < 1:
+            raise ValueError("sample interval must be >= 1")
+        self.cpu = cpu
+        self.ref = reference
+        self.sample_every = sample_every
+        self.blocks = blocks
+        self.checked = 0        # instructions compared one by one
+        self.samples = 0        # sampled state comparisons that agreed
+        self.exhausted = False  # the reference ran out before the CPU stopped
+
+    def run(self, max_steps: int = 100000) -> Optional[Divergence]:
+        """Run to halt or max_steps; the first Divergence, or None. The CPU
+        is left just after the diverging instruction."""
+        if self.sample_every == 1:
+            return self._lockstep(max_steps)
+        cpu, ref = self.cpu, self.ref
+        while cpu.running and cpu.step_count < max_steps:
+            start = cpu.step_count
+            target = min(start + self.sample_every, max_steps)
+            ck = snapshot(cpu)
+            saved = ref.save()
+            cpu.run(target, blocks=self.blocks)
+            ok = ref.advance(cpu.step_count - start)
+            if ok and not self._state_diffs(ck):
+                self.samples += 1
+                continue
+            # replay the interval one instruction at a time; this is also how
+            # instructions the reference has to adopt are handled
+            restore(cpu, ck)
+            ref.load(saved)
+            div = self._lockstep(target)
+            if div is not None or self.exhausted:
+                return div
+            diffs = self._state_diffs(ck)
+            if diffs:
+                # no single instruction's effects differ, yet the state does
+                return Divergence(cpu.step_count, cpu.pc, None, diffs)
+            self.samples += 1
+        return None
+
+    def _lockstep(self, max_steps: int) -> Optional[Divergence]:
+        try:
+            self.cpu.run_observed(max_steps, [self])
+        except _Stop as stop:
+            return stop.args[0]
+        return None
+
+    def retire(self, cpu, d, pc: int, a: int, b: int):
+        got = cpu_commit(cpu, d, pc, a, b)
+        exp = self.ref.step(got, cpu.pc)
+        if exp is None:
+            self.exhausted = True
+            raise _Stop(None)
+        diffs = diff_commits(got, exp)
+        if diffs:
+            raise _Stop(Divergence(cpu.step_count, pc, d.inst, diffs, exp, got))
+        self.checked += 1
+
+    def _state_diffs(self, before) -> List[Tuple[str, object, object]]:
+        cpu, ref = self.cpu, self.ref
+        diffs = []
+        ref_pc = ref.pc
+        if ref_pc is not None and ref_pc != cpu.pc:
+            diffs.append(("pc", cpu.pc, ref_pc))
+        for i in range(1, 32):
+            if cpu.regs.regs[i] != ref.regs[i]:
+                diffs.append(("x%d" % i, cpu.regs.regs[i], ref.regs[i]))
+        after = snapshot(cpu, before)
+        zero = bytes(4096)
+        for addr, byte in sorted(ref.stores.items()):
+            page = after.pages.get(addr >> 12, zero)
+            if page[addr & 0xFFF] != byte:
+                diffs.append(("mem[0x%08X]" % addr, page[addr & 0xFFF], byte))
+        # bytes the CPU changed that the reference did not write
+        for pn in sorted(set(after.pages) | set(before.pages)):
+            new = after.pages.get(pn, zero)
+            old = before.pages.get(pn, zero)
+            if new is old or new == old:
+                continue
+            for off in range(4096):
+                addr = (pn << 12) | off
+                if new[off] != old[off] and addr not in ref.stores:
+                    diffs.append(("mem[0x%08X]" % addr, new[off], old[off]))
+        return diffs
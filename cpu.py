@@ -1,7 +1,15 @@
 # Simple RV32I CPU simulator in Python
 # Single-cycle style, runs prog.hex files.
 
-from typing import List
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.numeric_core import fpu, mdu
+from src.numeric_core.bitvector import BitVector
 
 
 # ---------------- helpers ----------------
@@ -17,6 +25,11 @@ def sign_extend(x: int, bits: int) -> int:
     return mask32(x)
 
 
+def to_signed(x: int) -> int:
+    x = mask32(x)
+    return x - (1 << 32) if x & 0x80000000 else x
+
+
 # -------------- instruction decode --------------
 
 def decode_fields(inst: int):
@@ -63,6 +76,22 @@ def imm_j(inst: int) -> int:
     return sign_extend(imm, 21)
 
 
+class Decoded:
+    """Predecoded instruction: fields, sign-extended immediate and handler."""
+    __slots__ = ("inst", "opcode", "rd", "funct3", "rs1", "rs2", "funct7", "imm", "handler")
+
+    def __init__(self, inst, opcode, rd, funct3, rs1, rs2, funct7, imm, handler):
+        self.inst = inst
+        self.opcode = opcode
+        self.rd = rd
+        self.funct3 = funct3
+        self.rs1 = rs1
+        self.rs2 = rs2
+        self.funct7 = funct7
+        self.imm = imm
+        self.handler = handler
+
+
 # ---------------- register file ----------------
 
 class RegFile:
@@ -84,61 +113,1164 @@ class RegFile:
             print(f"x{i:02d} = 0x{self.read(i):08X}")
 
 
+CANONICAL_NAN_S = 0x7FC00000
+_BOX = 0xFFFFFFFF00000000
+
+
+class FRegFile:
+    """f0..f31 as 64-bit patterns. Singles are NaN-boxed: written with the
+    upper 32 bits set, and read back as the canonical NaN when they are not."""
+
+    def __init__(self):
+        self.regs: List[int] = [0] * 32
+
+    def read_s(self, idx: int) -> int:
+        v = self.regs[idx]
+        if v & _BOX != _BOX:
+            return CANONICAL_NAN_S
+        return v & 0xFFFFFFFF
+
+    def write_s(self, idx: int, value: int):
+        self.regs[idx] = _BOX | (value & 0xFFFFFFFF)
+
+    def read_d(self, idx: int) -> int:
+        return self.regs[idx]
+
+    def write_d(self, idx: int, value: int):
+        self.regs[idx] = value & 0xFFFFFFFFFFFFFFFF
+
+    def dump(self):
+        for i in range(32):
+            print(f"f{i:02d} = 0x{self.regs[i]:016X}")
+
+
 # ---------------- memory models ----------------
 
 class InstrMemory:
-    def __init__(self, words: List[int]):
+    def __init__(self, words: List[int], base: int = 0):
+        # words may be a list, an array('I') or a memoryview cast to 'I'
+        # (e.g. over an mmap'd image, see load_bin_file/load_elf_file)
         self.words = words
+        self.base = base
+        # predecoded records by word index, filled lazily on first fetch
+        self.decoded: Dict[int, "Decoded"] = {}
+        # callbacks(addr) run after a store rewrites an instruction word
+        self.write_listeners: List[Callable[[int], None]] = []
 
     def fetch(self, pc: int) -> int:
-        idx = pc // 4
+        idx = (pc - self.base) // 4
         if idx < 0 or idx >= len(self.words):
             return 0
         return self.words[idx]
 
+    def fetch_decoded(self, pc: int) -> "Decoded":
+        idx = (pc - self.base) // 4
+        if idx < 0 or idx >= len(self.words):
+            return HALT_RECORD
+        d = self.decoded.get(idx)
+        if d is None:
+            d = predecode(self.words[idx])
+            self.decoded[idx] = d
+        return d
+
+    def contains(self, addr: int) -> bool:
+        return 0 <= (addr - self.base) // 4 < len(self.words)
+
+    def store(self, addr: int, value: int, size: int):
+        """Self-modifying code: merge a little-endian store of size bytes into
+        the instruction words and drop their predecoded records."""
+        touched = []
+        for i in range(size):
+            a = (addr + i) & 0xFFFFFFFF
+            if not self.contains(a):
+                continue
+            idx = (a - self.base) // 4
+            sh = 8 * (a % 4)
+            byte = (value >> (8 * i)) & 0xFF
+            self.words[idx] = (self.words[idx] & ~(0xFF << sh)) | (byte << sh)
+            if idx not in touched:
+                touched.append(idx)
+        for idx in touched:
+            self.decoded.pop(idx, None)
+            for listener in self.write_listeners:
+                listener(self.base + 4 * idx)
+
+    def store_word(self, addr: int, value: int):
+        self.store(addr, mask32(value), 4)
+
+
+PAGE_SHIFT = 12
+PAGE_SIZE = 1 << PAGE_SHIFT
+PAGE_MASK = PAGE_SIZE - 1
+
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+
 
 class DataMemory:
+    """Sparse little-endian memory made of lazily allocated bytearray pages.
+
+    Reads from a page that was never written return 0 without allocating it.
+    Misaligned halfword/word accesses are supported, including ones that
+    straddle a page boundary. Buffers registered with map_region back pages
+    that are materialised only when first touched.
+    """
+
     def __init__(self):
-        self.mem = {}  # address -> 32-bit word
+        self.pages: Dict[int, bytearray] = {}  # page number -> PAGE_SIZE bytes
+        self.backing: List[Tuple[int, memoryview]] = []  # (base, bytes)
+
+    def map_region(self, base: int, data):
+        """Back [base, base+len(data)) with data without copying it now.
+
+        A page fully covered by a writable buffer (such as an ACCESS_COPY
+        mmap) becomes a view of it; other pages are copied on first touch.
+        """
+        self.backing.append((base & 0xFFFFFFFF, memoryview(data).cast("B")))
+
+    def _fault(self, pn: int):
+        """Materialise page pn from the mapped regions; None if unbacked."""
+        if not self.backing:
+            return None
+        lo = pn << PAGE_SHIFT
+        hi = lo + PAGE_SIZE
+        hits = [(b, v) for b, v in self.backing if b < hi and b + len(v) > lo]
+        if not hits:
+            return None
+        b, v = hits[0]
+        if len(hits) == 1 and not v.readonly and b <= lo and hi <= b + len(v):
+            page = v[lo - b:hi - b]
+        else:
+            page = bytearray(PAGE_SIZE)
+            for b, v in hits:
+                start = max(lo, b)
+                end = min(hi, b + len(v))
+                page[start - lo:end - lo] = v[start - b:end - b]
+        self.pages[pn] = page
+        return page
+
+    def _page(self, addr: int) -> bytearray:
+        pn = addr >> PAGE_SHIFT
+        page = self.pages.get(pn)
+        if page is None:
+            page = self._fault(pn)
+            if page is None:
+                page = self.pages[pn] = bytearray(PAGE_SIZE)
+        return page
+
+    # ---- loads (zero-extended) ----
+
+    def load_byte(self, addr: int) -> int:
+        addr = addr & 0xFFFFFFFF
+        page = self.pages.get(addr >> PAGE_SHIFT)
+        if page is None:
+            page = self._fault(addr >> PAGE_SHIFT)
+            if page is None:
+                return 0
+        return page[addr & PAGE_MASK]
+
+    def load_half(self, addr: int) -> int:
+        addr = addr & 0xFFFFFFFF
+        off = addr & PAGE_MASK
+        if off > PAGE_SIZE - 2:
+            return self._load_bytes(addr, 2)
+        page = self.pages.get(addr >> PAGE_SHIFT)
+        if page is None:
+            page = self._fault(addr >> PAGE_SHIFT)
+            if page is None:
+                return 0
+        return _U16.unpack_from(page, off)[0]
 
     def load_word(self, addr: int) -> int:
         addr = addr & 0xFFFFFFFF
-        if addr % 4 != 0:
-            # simple: treat unaligned as zero
-            return 0
-        return self.mem.get(addr, 0)
+        off = addr & PAGE_MASK
+        if off > PAGE_SIZE - 4:
+            return self._load_bytes(addr, 4)
+        page = self.pages.get(addr >> PAGE_SHIFT)
+        if page is None:
+            page = self._fault(addr >> PAGE_SHIFT)
+            if page is None:
+                return 0
+        return _U32.unpack_from(page, off)[0]
+
+    def _load_bytes(self, addr: int, size: int) -> int:
+        v = 0
+        for i in range(size):
+            v |= self.load_byte(addr + i) << (8 * i)
+        return v
+
+    # ---- stores (low bits of value) ----
+
+    def store_byte(self, addr: int, value: int):
+        addr = addr & 0xFFFFFFFF
+        self._page(addr)[addr & PAGE_MASK] = value & 0xFF
+
+    def store_half(self, addr: int, value: int):
+        addr = addr & 0xFFFFFFFF
+        off = addr & PAGE_MASK
+        if off > PAGE_SIZE - 2:
+            self._store_bytes(addr, value, 2)
+            return
+        _U16.pack_into(self._page(addr), off, value & 0xFFFF)
 
     def store_word(self, addr: int, value: int):
         addr = addr & 0xFFFFFFFF
-        if addr % 4 != 0:
+        off = addr & PAGE_MASK
+        if off > PAGE_SIZE - 4:
+            self._store_bytes(addr, value, 4)
             return
-        self.mem[addr] = mask32(value)
+        _U32.pack_into(self._page(addr), off, mask32(value))
+
+    def _store_bytes(self, addr: int, value: int, size: int):
+        for i in range(size):
+            self.store_byte(addr + i, value >> (8 * i))
+
+    # ---- bulk access ----
+
+    def load_region(self, base: int, data):
+        """Copy a bytes-like object into memory starting at base.
+
+        Each page receives one slice assignment straight from a memoryview of
+        data; no intermediate bytes objects are built.
+        """
+        src = memoryview(data).cast("B")
+        pos = 0
+        addr = base & 0xFFFFFFFF
+        while pos < len(src):
+            off = addr & PAGE_MASK
+            k = min(PAGE_SIZE - off, len(src) - pos)
+            self._page(addr)[off:off + k] = src[pos:pos + k]
+            pos += k
+            addr = (addr + k) & 0xFFFFFFFF
+
+    def read_region(self, base: int, length: int) -> memoryview:
+        """Return length bytes starting at base.
+
+        A range inside one allocated page is a live, zero-copy view of that
+        page; anything else is assembled into a new buffer.
+        """
+        base = base & 0xFFFFFFFF
+        off = base & PAGE_MASK
+        page = self.pages.get(base >> PAGE_SHIFT) or self._fault(base >> PAGE_SHIFT)
+        if page is not None and off + length <= PAGE_SIZE:
+            return memoryview(page)[off:off + length]
+        out = bytearray(length)
+        pos = 0
+        addr = base
+        while pos < length:
+            off = addr & PAGE_MASK
+            k = min(PAGE_SIZE - off, length - pos)
+            page = self.pages.get(addr >> PAGE_SHIFT) or self._fault(addr >> PAGE_SHIFT)
+            if page is not None:
+                out[pos:pos + k] = memoryview(page)[off:off + k]
+            pos += k
+            addr = (addr + k) & 0xFFFFFFFF
+        return memoryview(out)
 
     def dump_region(self, base: int, count: int):
         for i in range(count):
             addr = base + 4 * i
-            v = self.mem.get(addr, 0)
+            v = self.load_word(addr)
             print(f"[0x{addr:08X}] = 0x{v:08X}")
 
 
+# ---------------- instruction handlers ----------------
+# Each handler executes one instruction from its Decoded record and sets
+# cpu.pc. x0 is kept at zero by never writing it (rd == 0 is skipped).
+
+def _exec_halt(cpu, d):
+    # halt on 0 or on jal x0,0 (0x0000006F from sample)
+    cpu.running = False
+    cpu.halt_reason = "halt"
+
+
+def _exec_illegal(cpu, d):
+    # unknown opcode -> stop
+    cpu.running = False
+    cpu.halt_reason = "illegal"
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_nop(cpu, d):
+    # known opcode, unimplemented funct -> no architectural effect
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_zero(cpu, d):
+    # R-type funct3=0 with an unknown funct7 writes 0 (legacy behaviour)
+    if d.rd:
+        cpu.regs.regs[d.rd] = 0
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_add(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = (r[d.rs1] + r[d.rs2]) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_sub(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = (r[d.rs1] - r[d.rs2]) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_and(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = r[d.rs1] & r[d.rs2]
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_or(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = r[d.rs1] | r[d.rs2]
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_xor(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = r[d.rs1] ^ r[d.rs2]
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_sll(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = (r[d.rs1] << (r[d.rs2] & 0x1F)) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_srl(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = r[d.rs1] >> (r[d.rs2] & 0x1F)
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_sra(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        v = r[d.rs1]
+        if v & 0x80000000:
+            v -= 0x100000000
+        r[d.rd] = (v >> (r[d.rs2] & 0x1F)) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_addi(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = (r[d.rs1] + d.imm) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_andi(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = r[d.rs1] & d.imm
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_ori(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = r[d.rs1] | d.imm
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_xori(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = r[d.rs1] ^ d.imm
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_slli(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = (r[d.rs1] << (d.imm & 0x1F)) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_srli(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        r[d.rd] = r[d.rs1] >> (d.imm & 0x1F)
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_srai(cpu, d):
+    r = cpu.regs.regs
+    if d.rd:
+        v = r[d.rs1]
+        if v & 0x80000000:
+            v -= 0x100000000
+        r[d.rd] = (v >> (d.imm & 0x1F)) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_lb(cpu, d):
+    v = cpu.dmem.load_byte(cpu.regs.regs[d.rs1] + d.imm)
+    if d.rd:
+        cpu.regs.regs[d.rd] = ((v ^ 0x80) - 0x80) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_lh(cpu, d):
+    v = cpu.dmem.load_half(cpu.regs.regs[d.rs1] + d.imm)
+    if d.rd:
+        cpu.regs.regs[d.rd] = ((v ^ 0x8000) - 0x8000) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_lw(cpu, d):
+    v = cpu.dmem.load_word(cpu.regs.regs[d.rs1] + d.imm)
+    if d.rd:
+        cpu.regs.regs[d.rd] = v
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_lbu(cpu, d):
+    v = cpu.dmem.load_byte(cpu.regs.regs[d.rs1] + d.imm)
+    if d.rd:
+        cpu.regs.regs[d.rd] = v
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_lhu(cpu, d):
+    v = cpu.dmem.load_half(cpu.regs.regs[d.rs1] + d.imm)
+    if d.rd:
+        cpu.regs.regs[d.rd] = v
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_sb(cpu, d):
+    addr = (cpu.regs.regs[d.rs1] + d.imm) & 0xFFFFFFFF
+    value = cpu.regs.regs[d.rs2]
+    cpu.dmem.store_byte(addr, value)
+    if cpu.unified_memory and cpu.imem.contains(addr):
+        cpu.imem.store(addr, value, 1)
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_sh(cpu, d):
+    addr = (cpu.regs.regs[d.rs1] + d.imm) & 0xFFFFFFFF
+    value = cpu.regs.regs[d.rs2]
+    cpu.dmem.store_half(addr, value)
+    if cpu.unified_memory and cpu.imem.contains(addr):
+        cpu.imem.store(addr, value, 2)
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_sw(cpu, d):
+    addr = (cpu.regs.regs[d.rs1] + d.imm) & 0xFFFFFFFF
+    value = cpu.regs.regs[d.rs2]
+    cpu.dmem.store_word(addr, value)
+    if cpu.unified_memory and cpu.imem.contains(addr):
+        cpu.imem.store(addr, value, 4)
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_beq(cpu, d):
+    r = cpu.regs.regs
+    if r[d.rs1] == r[d.rs2]:
+        cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+    else:
+        cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_bne(cpu, d):
+    r = cpu.regs.regs
+    if r[d.rs1] != r[d.rs2]:
+        cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+    else:
+        cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_jal(cpu, d):
+    if d.rd:
+        cpu.regs.regs[d.rd] = (cpu.pc + 4) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + d.imm) & 0xFFFFFFFF
+
+
+def _exec_jalr(cpu, d):
+    target = (cpu.regs.regs[d.rs1] + d.imm) & 0xFFFFFFFE
+    if d.rd:
+        cpu.regs.regs[d.rd] = (cpu.pc + 4) & 0xFFFFFFFF
+    cpu.pc = target
+
+
+def _exec_lui(cpu, d):
+    if d.rd:
+        cpu.regs.regs[d.rd] = d.imm
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_auipc(cpu, d):
+    if d.rd:
+        cpu.regs.regs[d.rd] = (cpu.pc + d.imm) & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+# ---------------- RV32M ----------------
+# mul/mulh/mulhsu/mulhu and div/divu/rem/remu run on numeric_core.mdu
+# (mul_wide and div_rem). Every instruction costs one cycle except these,
+# which cost cpu.mul_latency / cpu.div_latency: an int, or a callable
+# (funct3, rs1 value, rs2 value) -> cycles for value-dependent timing.
+
+MDU_OPS = ("mul_wide", "div_rem")
+
+MUL_LATENCY = 3
+DIV_LATENCY = 34
+
+
+def early_out_mul_latency(funct3: int, a: int, b: int) -> int:
+    """Multiplier retiring 8 bits of rs2 per cycle, stopping once the rest
+    of rs2 is all sign (or zero) bits; mulh* need the full product."""
+    if funct3:
+        return 5
+    v = b - 0x100000000 if b & 0x80000000 else b
+    n = (v if v >= 0 else ~v).bit_length() + 1
+    return 1 + (n + 7) // 8
+
+
+def early_out_div_latency(funct3: int, a: int, b: int) -> int:
+    """Radix-2 divider that skips the leading quotient bits known to be
+    zero: 2 cycles of setup plus one per remaining quotient bit."""
+    if b == 0:
+        return 2
+    if not funct3 & 1:  # div / rem: signed magnitudes
+        a = abs(a - 0x100000000 if a & 0x80000000 else a)
+        b = abs(b - 0x100000000 if b & 0x80000000 else b)
+    return 2 + max(0, a.bit_length() - b.bit_length() + 1)
+
+
+def _m_mul(high, signed1, signed2):
+    def handler(cpu, d):
+        r = cpu.regs.regs
+        a, b = r[d.rs1], r[d.rs2]
+        lo, hi, _, _ = cpu.mdu_ops["mul_wide"](BitVector(32, a), BitVector(32, b),
+                                               signed1, signed2)
+        if d.rd:
+            r[d.rd] = (hi if high else lo).value
+        lat = cpu.mul_latency
+        cpu.extra_cycles += (lat(d.funct3, a, b) if callable(lat) else lat) - 1
+        cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+    return handler
+
+
+def _m_div(remainder, signed):
+    def handler(cpu, d):
+        r = cpu.regs.regs
+        a, b = r[d.rs1], r[d.rs2]
+        q, rem, _, _ = cpu.mdu_ops["div_rem"](BitVector(32, a), BitVector(32, b), signed)
+        if d.rd:
+            r[d.rd] = (rem if remainder else q).value
+        lat = cpu.div_latency
+        cpu.extra_cycles += (lat(d.funct3, a, b) if callable(lat) else lat) - 1
+        cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+    return handler
+
+
+_exec_mul = _m_mul(False, True, True)
+_exec_mulh = _m_mul(True, True, True)
+_exec_mulhsu = _m_mul(True, True, False)
+_exec_mulhu = _m_mul(True, False, False)
+_exec_div = _m_div(False, True)
+_exec_divu = _m_div(False, False)
+_exec_rem = _m_div(True, True)
+_exec_remu = _m_div(True, False)
+
+
+# ---------------- RV32F / RV32D ----------------
+# Arithmetic runs on numeric_core.fpu with 32/64-bit BitVector operands; the
+# flag dicts it returns are OR-ed into fcsr.fflags. funct3 is the rounding
+# mode, 7 (DYN) meaning fcsr.frm; the reserved encodings 5 and 6 stop the
+# CPU as illegal.
+
+CSR_FFLAGS = 0x001
+CSR_FRM = 0x002
+CSR_FCSR = 0x003
+
+ROUNDING_MODES = ("RNE", "RTZ", "RDN", "RUP", "RMM")
+
+# fpu flag name -> fflags bit (NV DZ OF UF NX)
+FFLAG_BITS = (("invalid", 0x10), ("div_by_zero", 0x08), ("overflow", 0x04),
+              ("underflow", 0x02), ("inexact", 0x01))
+
+FPU_OPS = tuple(op + suffix
+                for op in ("fadd", "fsub", "fmul", "fdiv", "fsqrt",
+                           "fmadd", "fmsub", "fnmsub", "fnmadd")
+                for suffix in ("_f32", "_f64"))
+
+NUMERIC_BACKENDS = (None, "reference", "fast")
+
+
+def numeric_ops(module, names, backend=None) -> Dict[str, Callable]:
+    """name -> callable for module's public ops.
+
+    backend None calls the public functions, which follow
+    numeric_core.backend.set_backend and the result cache; "reference" or
+    "fast" binds that implementation directly for this CPU only.
+    """
+    if backend not in NUMERIC_BACKENDS:
+        raise ValueError("Unknown backend: " + str(backend))
+    ops = {}
+    for name in names:
+        fn = getattr(module, name)
+        if backend is not None:
+            fn = getattr(fn.uncached, backend)
+        ops[name] = fn
+    return ops
+
+
+def _rounding_mode(cpu, d) -> Optional[str]:
+    rm = d.funct3
+    if rm == 7:
+        rm = (cpu.fcsr >> 5) & 7
+    return ROUNDING_MODES[rm] if rm < 5 else None
+
+
+def _accrue(cpu, flags):
+    for name, bit in FFLAG_BITS:
+        if flags.get(name):
+            cpu.fcsr |= bit
+
+
+def _fp_arith(op, nargs, double):
+    name = op + ("_f64" if double else "_f32")
+    width = 64 if double else 32
+
+    def handler(cpu, d):
+        rm = _rounding_mode(cpu, d)
+        if rm is None or (nargs == 1 and d.rs2):
+            # reserved rounding mode, or a unary op (fsqrt) with rs2 != 0
+            _exec_illegal(cpu, d)
+            return
+        f = cpu.fregs
+        read = f.read_d if double else f.read_s
+        args = [BitVector(width, read(d.rs1))]
+        if nargs > 1:
+            args.append(BitVector(width, read(d.rs2)))
+        if nargs > 2:
+            args.append(BitVector(width, read(d.funct7 >> 2)))
+        r, flags = cpu.fpu_ops[name](*args, round_mode=rm)
+        _accrue(cpu, flags)
+        if double:
+            f.write_d(d.rd, r.value)
+        else:
+            f.write_s(d.rd, r.value)
+        cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+    handler.__name__ = "_exec_" + name
+    return handler
+
+
+def _fp_fused(op):
+    # R4-type: rs3 in funct7[6:2], fmt in funct7[1:0] (0 = S, 1 = D)
+    single = _fp_arith(op, 3, False)
+    double = _fp_arith(op, 3, True)
+
+    def handler(cpu, d):
+        fmt = d.funct7 & 3
+        if fmt == 0:
+            single(cpu, d)
+        elif fmt == 1:
+            double(cpu, d)
+        else:
+            _exec_illegal(cpu, d)
+
+    handler.__name__ = "_exec_" + op
+    return handler
+
+
+def _exec_flw(cpu, d):
+    cpu.fregs.write_s(d.rd, cpu.dmem.load_word(cpu.regs.regs[d.rs1] + d.imm))
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_fld(cpu, d):
+    addr = cpu.regs.regs[d.rs1] + d.imm
+    lo = cpu.dmem.load_word(addr)
+    hi = cpu.dmem.load_word(addr + 4)
+    cpu.fregs.write_d(d.rd, (hi << 32) | lo)
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_fsw(cpu, d):
+    # the raw low word, NaN-boxed or not
+    addr = (cpu.regs.regs[d.rs1] + d.imm) & 0xFFFFFFFF
+    value = cpu.fregs.regs[d.rs2] & 0xFFFFFFFF
+    cpu.dmem.store_word(addr, value)
+    if cpu.unified_memory and cpu.imem.contains(addr):
+        cpu.imem.store(addr, value, 4)
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_fsd(cpu, d):
+    addr = (cpu.regs.regs[d.rs1] + d.imm) & 0xFFFFFFFF
+    value = cpu.fregs.regs[d.rs2]
+    for a, word in ((addr, value & 0xFFFFFFFF), ((addr + 4) & 0xFFFFFFFF, value >> 32)):
+        cpu.dmem.store_word(a, word)
+        if cpu.unified_memory and cpu.imem.contains(a):
+            cpu.imem.store(a, word, 4)
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _fp_sign_inject(double):
+    sign = 1 << (63 if double else 31)
+
+    def handler(cpu, d):
+        f = cpu.fregs
+        read = f.read_d if double else f.read_s
+        a, b = read(d.rs1), read(d.rs2)
+        if d.funct3 == 0:    # fsgnj
+            s = b & sign
+        elif d.funct3 == 1:  # fsgnjn
+            s = ~b & sign
+        elif d.funct3 == 2:  # fsgnjx
+            s = (a ^ b) & sign
+        else:
+            _exec_illegal(cpu, d)
+            return
+        r = (a & ~sign) | s
+        if double:
+            f.write_d(d.rd, r)
+        else:
+            f.write_s(d.rd, r)
+        cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+    handler.__name__ = "_exec_fsgnj_" + ("d" if double else "s")
+    return handler
+
+
+def _exec_fmv_x_w(cpu, d):
+    if d.rd:
+        cpu.regs.regs[d.rd] = cpu.fregs.regs[d.rs1] & 0xFFFFFFFF
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_fmv_w_x(cpu, d):
+    cpu.fregs.write_s(d.rd, cpu.regs.regs[d.rs1])
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+def _exec_csr(cpu, d):
+    # csrrw/csrrs/csrrc and their immediate forms, on the float CSRs only
+    csr = d.imm & 0xFFF
+    if csr == CSR_FFLAGS:
+        old = cpu.fcsr & 0x1F
+    elif csr == CSR_FRM:
+        old = cpu.fcsr >> 5
+    elif csr == CSR_FCSR:
+        old = cpu.fcsr
+    else:
+        _exec_illegal(cpu, d)
+        return
+    src = d.rs1 if d.funct3 & 4 else cpu.regs.regs[d.rs1]
+    op = d.funct3 & 3
+    if op == 1 or d.rs1:
+        new = src if op == 1 else (old | src if op == 2 else old & ~src)
+        if csr == CSR_FFLAGS:
+            cpu.fcsr = (cpu.fcsr & 0xE0) | (new & 0x1F)
+        elif csr == CSR_FRM:
+            cpu.fcsr = (cpu.fcsr & 0x1F) | ((new & 7) << 5)
+        else:
+            cpu.fcsr = new & 0xFF
+    if d.rd:
+        cpu.regs.regs[d.rd] = old
+    cpu.pc = (cpu.pc + 4) & 0xFFFFFFFF
+
+
+# (opcode, funct3, funct7) -> handler. None is a wildcard for fields the
+# format does not use; lookups try the most specific key first.
+DISPATCH = {
+    (0x33, 0x0, 0x00): _exec_add,
+    (0x33, 0x0, 0x20): _exec_sub,
+    (0x33, 0x0, None): _exec_zero,
+    (0x33, 0x7, None): _exec_and,
+    (0x33, 0x6, None): _exec_or,
+    (0x33, 0x4, None): _exec_xor,
+    (0x33, 0x1, None): _exec_sll,
+    (0x33, 0x5, 0x00): _exec_srl,
+    (0x33, 0x5, 0x20): _exec_sra,
+    (0x33, 0x0, 0x01): _exec_mul,
+    (0x33, 0x1, 0x01): _exec_mulh,
+    (0x33, 0x2, 0x01): _exec_mulhsu,
+    (0x33, 0x3, 0x01): _exec_mulhu,
+    (0x33, 0x4, 0x01): _exec_div,
+    (0x33, 0x5, 0x01): _exec_divu,
+    (0x33, 0x6, 0x01): _exec_rem,
+    (0x33, 0x7, 0x01): _exec_remu,
+    (0x13, 0x0, None): _exec_addi,
+    (0x13, 0x7, None): _exec_andi,
+    (0x13, 0x6, None): _exec_ori,
+    (0x13, 0x4, None): _exec_xori,
+    (0x13, 0x1, None): _exec_slli,
+    # funct7 bit 0 is shamt[5] on RV64; RV32 decodes on funct7 & 0x7E
+    (0x13, 0x5, 0x00): _exec_srli,
+    (0x13, 0x5, 0x01): _exec_srli,
+    (0x13, 0x5, 0x20): _exec_srai,
+    (0x13, 0x5, 0x21): _exec_srai,
+    (0x03, 0x0, None): _exec_lb,
+    (0x03, 0x1, None): _exec_lh,
+    (0x03, 0x2, None): _exec_lw,
+    (0x03, 0x4, None): _exec_lbu,
+    (0x03, 0x5, None): _exec_lhu,
+    (0x23, 0x0, None): _exec_sb,
+    (0x23, 0x1, None): _exec_sh,
+    (0x23, 0x2, None): _exec_sw,
+    (0x63, 0x0, None): _exec_beq,
+    (0x63, 0x1, None): _exec_bne,
+    (0x6F, None, None): _exec_jal,
+    (0x67, None, None): _exec_jalr,
+    (0x37, None, None): _exec_lui,
+    (0x17, None, None): _exec_auipc,
+    (0x07, 0x2, None): _exec_flw,
+    (0x07, 0x3, None): _exec_fld,
+    (0x27, 0x2, None): _exec_fsw,
+    (0x27, 0x3, None): _exec_fsd,
+    (0x53, None, 0x00): _fp_arith("fadd", 2, False),
+    (0x53, None, 0x01): _fp_arith("fadd", 2, True),
+    (0x53, None, 0x04): _fp_arith("fsub", 2, False),
+    (0x53, None, 0x05): _fp_arith("fsub", 2, True),
+    (0x53, None, 0x08): _fp_arith("fmul", 2, False),
+    (0x53, None, 0x09): _fp_arith("fmul", 2, True),
+    (0x53, None, 0x0C): _fp_arith("fdiv", 2, False),
+    (0x53, None, 0x0D): _fp_arith("fdiv", 2, True),
+    (0x53, None, 0x2C): _fp_arith("fsqrt", 1, False),
+    (0x53, None, 0x2D): _fp_arith("fsqrt", 1, True),
+    (0x53, None, 0x10): _fp_sign_inject(False),
+    (0x53, None, 0x11): _fp_sign_inject(True),
+    (0x53, 0x0, 0x70): _exec_fmv_x_w,
+    (0x53, 0x0, 0x78): _exec_fmv_w_x,
+    (0x43, None, None): _fp_fused("fmadd"),
+    (0x47, None, None): _fp_fused("fmsub"),
+    (0x4B, None, None): _fp_fused("fnmsub"),
+    (0x4F, None, None): _fp_fused("fnmadd"),
+    (0x73, 0x0, None): _exec_illegal,  # ecall / ebreak are not supported
+    (0x73, 0x4, None): _exec_illegal,
+    (0x73, None, None): _exec_csr,
+}
+
+# opcode -> immediate decoder (None for formats without an immediate)
+IMM_DECODERS = {
+    0x33: None,
+    0x13: imm_i,
+    0x03: imm_i,
+    0x23: imm_s,
+    0x63: imm_b,
+    0x6F: imm_j,
+    0x67: imm_i,
+    0x37: imm_u,
+    0x17: imm_u,
+    0x07: imm_i,
+    0x27: imm_s,
+    0x53: None,
+    0x43: None,
+    0x47: None,
+    0x4B: None,
+    0x4F: None,
+    0x73: imm_i,
+}
+
+
+# F/D opcodes: encodings without a handler here (fcvt, fmin/fmax, compares,
+# fclass, other widths) are unimplemented instructions, not no-ops
+FP_OPCODES = frozenset((0x07, 0x27, 0x53, 0x43, 0x47, 0x4B, 0x4F))
+
+
+def lookup_handler(opcode: int, funct3: int, funct7: int):
+    if opcode not in IMM_DECODERS:
+        return _exec_illegal
+    for key in ((opcode, funct3, funct7), (opcode, funct3, None),
+                (opcode, None, funct7), (opcode, None, None)):
+        h = DISPATCH.get(key)
+        if h is not None:
+            return h
+    if opcode in FP_OPCODES:
+        return _exec_illegal
+    return _exec_nop
+
+
+def predecode(inst: int) -> Decoded:
+    """Decode an instruction word once into a Decoded record."""
+    if inst == 0 or inst == 0x0000006F:
+        return Decoded(inst, 0, 0, 0, 0, 0, 0, 0, _exec_halt)
+    opcode, rd, funct3, rs1, rs2, funct7 = decode_fields(inst)
+    imm_fn = IMM_DECODERS.get(opcode)
+    imm = imm_fn(inst) if imm_fn is not None else 0
+    return Decoded(inst, opcode, rd, funct3, rs1, rs2, funct7, imm,
+                   lookup_handler(opcode, funct3, funct7))
+
+
+HALT_RECORD = predecode(0)
+
+
+# ---------------- basic-block translation ----------------
+# Straight-line runs of instructions are turned into Python source, compiled
+# once with compile() and cached by start PC. A block function takes the
+# register list and the CPU and returns (next_pc, instructions_retired).
+# Loads and stores set cpu.pc to their own PC first, so a CachedDataMemory
+# charges them to that instruction and a fault reports it.
+
+MAX_BLOCK_LEN = 64
+
+_M = "0xFFFFFFFF"
+
+# handler -> source template for the register write (rd != 0 only)
+_BLOCK_ALU = {
+    _exec_zero: "0",
+    _exec_add: "(r[{rs1}] + r[{rs2}]) & " + _M,
+    _exec_sub: "(r[{rs1}] - r[{rs2}]) & " + _M,
+    _exec_and: "r[{rs1}] & r[{rs2}]",
+    _exec_or: "r[{rs1}] | r[{rs2}]",
+    _exec_xor: "r[{rs1}] ^ r[{rs2}]",
+    _exec_sll: "(r[{rs1}] << (r[{rs2}] & 0x1F)) & " + _M,
+    _exec_srl: "r[{rs1}] >> (r[{rs2}] & 0x1F)",
+    _exec_sra: "(((r[{rs1}] ^ 0x80000000) - 0x80000000) >> (r[{rs2}] & 0x1F)) & " + _M,
+    _exec_addi: "(r[{rs1}] + {imm}) & " + _M,
+    _exec_andi: "r[{rs1}] & {imm}",
+    _exec_ori: "r[{rs1}] | {imm}",
+    _exec_xori: "r[{rs1}] ^ {imm}",
+    _exec_slli: "(r[{rs1}] << {sh}) & " + _M,
+    _exec_srli: "r[{rs1}] >> {sh}",
+    _exec_srai: "(((r[{rs1}] ^ 0x80000000) - 0x80000000) >> {sh}) & " + _M,
+    _exec_lui: "{imm}",
+    _exec_auipc: "{pc_imm}",
+}
+
+# handler -> load expression ({a} is the unmasked address expression)
+_BLOCK_LOADS = {
+    _exec_lb: "((cpu.dmem.load_byte({a}) ^ 0x80) - 0x80) & " + _M,
+    _exec_lh: "((cpu.dmem.load_half({a}) ^ 0x8000) - 0x8000) & " + _M,
+    _exec_lw: "cpu.dmem.load_word({a})",
+    _exec_lbu: "cpu.dmem.load_byte({a})",
+    _exec_lhu: "cpu.dmem.load_half({a})",
+}
+
+# handler -> (DataMemory method, access size)
+_BLOCK_STORES = {
+    _exec_sb: ("store_byte", 1),
+    _exec_sh: ("store_half", 2),
+    _exec_sw: ("store_word", 4),
+}
+
+_BLOCK_END = (_exec_beq, _exec_bne, _exec_jal, _exec_jalr)
+
+_BLOCK_OK = set(_BLOCK_ALU) | set(_BLOCK_LOADS) | set(_BLOCK_STORES) | set(_BLOCK_END)
+
+
+def _block_lines(d: Decoded, pc: int, n: int, unified: bool = False) -> List[str]:
+    """Source lines for one instruction at pc; n is its 1-based block index.
+    With unified, stores also check for a write into code."""
+    f = dict(rd=d.rd, rs1=d.rs1, rs2=d.rs2, imm=d.imm, sh=d.imm & 0x1F,
+             pc_imm=(pc + d.imm) & 0xFFFFFFFF)
+    h = d.handler
+    if h in _BLOCK_ALU:
+        if not d.rd:
+            return []
+        return [("r[{rd}] = " + _BLOCK_ALU[h]).format(**f)]
+    if h in _BLOCK_LOADS:
+        load = _BLOCK_LOADS[h].format(a="r[{rs1}] + {imm}".format(**f))
+        return ["cpu.pc = %d" % pc, "r[%d] = %s" % (d.rd, load) if d.rd else load]
+    if h in _BLOCK_STORES:
+        method, size = _BLOCK_STORES[h]
+        lines = [
+            "cpu.pc = %d" % pc,
+            "a = (r[{rs1}] + {imm}) & {m}".format(m=_M, **f),
+            "cpu.dmem.{0}(a, r[{rs2}])".format(method, **f),
+        ]
+        if not unified:
+            return lines
+        # a store into code ends the block so stale translations never run
+        return lines + [
+            "if cpu.imem.contains(a):",
+            "    cpu.imem.store(a, r[{rs2}], {0})".format(size, **f),
+            "    return %d, %d" % ((pc + 4) & 0xFFFFFFFF, n),
+        ]
+    fall = (pc + 4) & 0xFFFFFFFF
+    target = (pc + d.imm) & 0xFFFFFFFF
+    if h is _exec_beq or h is _exec_bne:
+        cmp = "==" if h is _exec_beq else "!="
+        return ["return (%d if r[%d] %s r[%d] else %d), %d"
+                % (target, d.rs1, cmp, d.rs2, fall, n)]
+    if h is _exec_jal:
+        lines = ["r[%d] = %d" % (d.rd, fall)] if d.rd else []
+        return lines + ["return %d, %d" % (target, n)]
+    if h is _exec_jalr:
+        lines = ["t = (r[%d] + %d) & 0xFFFFFFFE" % (d.rs1, d.imm)]
+        if d.rd:
+            lines.append("r[%d] = %d" % (d.rd, fall))
+        return lines + ["return t, %d" % n]
+    raise KeyError(h)
+
+
+def translate_block(imem: InstrMemory, start: int, unified: bool = False):
+    """Compile the basic block at start. Returns (fn, length, last_pc);
+    fn is None when the first instruction cannot be translated. unified
+    compiles stores for CPU(unified_memory=True)."""
+    lines = []
+    pc = start
+    n = 0
+    ended = False
+    while n < MAX_BLOCK_LEN:
+        if not imem.contains(pc):
+            break
+        d = imem.fetch_decoded(pc)
+        h = d.handler
+        if h not in _BLOCK_OK:
+            break
+        n += 1
+        lines.extend(_block_lines(d, pc, n, unified))
+        if h in _BLOCK_END:
+            ended = True
+            break
+        pc += 4
+    if n == 0:
+        return None, 0, start
+    if not ended:
+        lines.append("return %d, %d" % (pc & 0xFFFFFFFF, n))
+    src = "def block(r, cpu):\n" + "".join("    " + ln + "\n" for ln in lines)
+    ns = {}
+    exec(compile(src, "<block 0x%08X>" % start, "exec"), ns)
+    return ns["block"], n, start + 4 * (n - 1)
+
+
+class BlockCache:
+    """Compiled blocks keyed by start PC, invalidated on stores into code."""
+
+    def __init__(self, imem: InstrMemory, unified: bool = False):
+        self.imem = imem
+        self.unified = unified
+        self.blocks: Dict[int, Tuple] = {}
+        imem.write_listeners.append(self.invalidate)
+
+    def get(self, pc: int):
+        blk = self.blocks.get(pc)
+        if blk is None:
+            blk = translate_block(self.imem, pc, self.unified)
+            self.blocks[pc] = blk
+        return blk
+
+    def invalidate(self, addr: int):
+        stale = [pc for pc, (_, n, last) in self.blocks.items() if pc <= addr <= last]
+        for pc in stale:
+            del self.blocks[pc]
+
+
 # ---------------- CPU core ----------------
 
 class CPU:
-    def __init__(self, imem: InstrMemory, dmem: DataMemory):
+    def __init__(self, imem: InstrMemory, dmem: DataMemory, backend: Optional[str] = None,
+                 mul_latency=MUL_LATENCY, div_latency=DIV_LATENCY, unified_memory: bool = False):
         self.imem = imem
         self.dmem = dmem
+        # False: separate instruction and data memories (stores never reach
+        # imem). True: stores into the instruction image also rewrite it,
+        # dropping the predecoded records and blocks they cover
+        self.unified_memory = unified_memory
         self.regs = RegFile()
+        self.fregs = FRegFile()
+        self.fcsr = 0  # frm in bits 7:5, fflags in bits 4:0
+        self.fpu_ops = numeric_ops(fpu, FPU_OPS, backend)
+        self.mdu_ops = numeric_ops(mdu, MDU_OPS, backend)
+        self.mul_latency = mul_latency
+        self.div_latency = div_latency
+        self.extra_cycles = 0  # cycles beyond one per retired instruction
         self.pc = 0
         self.running = True
         self.step_count = 0
+        self.halt_reason: Optional[str] = None  # "halt" or "illegal" once stopped
+        self.block_cache: Optional[BlockCache] = None
+
+    @property
+    def cycles(self) -> int:
+        return self.step_count + self.extra_cycles
+
+    @property
+    def fflags(self) -> int:
+        return self.fcsr & 0x1F
+
+    @property
+    def frm(self) -> int:
+        return self.fcsr >> 5
 
     def step(self):
+        d = self.imem.fetch_decoded(self.pc)
+        self.step_count += 1
+        d.handler(self, d)
+
+    def run(self, max_steps: int = 100000, blocks: bool = False, pipeline=None, trace=None,
+            profiler=None):
+        """Execute until halt or max_steps. A pipeline.PipelineModel times
+        every instruction, a cputrace.TraceWriter records it and a
+        cpuprofile.Profiler counts it; with any of them, blocks is ignored."""
+        observers = [o for o in (pipeline, trace, profiler) if o is not None]
+        if observers:
+            self.run_observed(max_steps, observers)
+            return
+        if blocks:
+            self.run_blocks(max_steps)
+            return
+        fetch = self.imem.fetch_decoded
+        while self.running and self.step_count < max_steps:
+            d = fetch(self.pc)
+            self.step_count += 1
+            d.handler(self, d)
+
+    def run_observed(self, max_steps: int, observers):
+        """Step loop calling observer.retire(cpu, d, pc, a, b) after every
+        instruction; a / b are its rs1 / rs2 values before it executed."""
+        fetch = self.imem.fetch_decoded
+        regs = self.regs.regs
+        while self.running and self.step_count < max_steps:
+            pc = self.pc
+            d = fetch(pc)
+            a, b = regs[d.rs1], regs[d.rs2]
+            self.step_count += 1
+            d.handler(self, d)
+            for obs in observers:
+                obs.retire(self, d, pc, a, b)
+
+    def run_blocks(self, max_steps: int = 100000):
+        """Execute through compiled basic blocks, stepping singly where a
+        block cannot be translated or would overrun max_steps."""
+        on_block_mode = getattr(self.imem, "on_block_mode", None)
+        if on_block_mode is not None:
+            on_block_mode()     # e.g. a cache.CachedInstrMemory that would miss fetches
+        if self.block_cache is None:
+            self.block_cache = BlockCache(self.imem, self.unified_memory)
+        get = self.block_cache.get
+        r = self.regs.regs
+        while self.running and self.step_count < max_steps:
+            fn, n, _ = get(self.pc)
+            if fn is None or self.step_count + n > max_steps:
+                self.step()
+                continue
+            self.pc, done = fn(r, self)
+            self.step_count += done
+
+    def step_reference(self):
+        """Decode-every-step if/elif interpreter.
+
+        Kept as the baseline for tools/bench_cpu.py and as an oracle for
+        differential tests; architectural results match step().
+        """
         inst = self.imem.fetch(self.pc)
         self.step_count += 1
 
         # halt on 0 or on jal x0,0 (0x0000006F from sample)
         if inst == 0 or inst == 0x0000006F:
             self.running = False
+            self.halt_reason = "halt"
             return
 
         opcode, rd, funct3, rs1, rs2, funct7 = decode_fields(inst)
@@ -171,7 +1303,7 @@ class CPU:
                 if funct7 == 0x00:  # srl
                     self.regs.write(rd, (rs1_val & 0xFFFFFFFF) >> shamt)
                 elif funct7 == 0x20:  # sra
-                    v = sign_extend(rs1_val & 0xFFFFFFFF, 32)
+                    v = to_signed(rs1_val)
                     self.regs.write(rd, v >> shamt)
         elif opcode == 0x13:  # I-type ALU (addi and, or, xor, shifts if needed)
             imm = imm_i(inst)
@@ -188,22 +1320,37 @@ class CPU:
                 self.regs.write(rd, mask32(rs1_val << shamt))
             elif funct3 == 0x5:
                 shamt = imm & 0x1F
-                if (imm >> 10) & 0x3F == 0x00:  # srlI
+                if funct7 & 0x7E == 0x00:  # srli
                     self.regs.write(rd, (rs1_val & 0xFFFFFFFF) >> shamt)
-                elif (imm >> 10) & 0x3F == 0x10:  # sraI
-                    v = sign_extend(rs1_val & 0xFFFFFFFF, 32)
+                elif funct7 & 0x7E == 0x20:  # srai
+                    v = to_signed(rs1_val)
                     self.regs.write(rd, v >> shamt)
         elif opcode == 0x03:  # loads
             imm = imm_i(inst)
             addr = rs1_val + imm
-            if funct3 == 0x2:  # lw
+            if funct3 == 0x0:  # lb
+                self.regs.write(rd, sign_extend(self.dmem.load_byte(addr), 8))
+            elif funct3 == 0x1:  # lh
+                self.regs.write(rd, sign_extend(self.dmem.load_half(addr), 16))
+            elif funct3 == 0x2:  # lw
                 v = self.dmem.load_word(addr)
                 self.regs.write(rd, v)
+            elif funct3 == 0x4:  # lbu
+                self.regs.write(rd, self.dmem.load_byte(addr))
+            elif funct3 == 0x5:  # lhu
+                self.regs.write(rd, self.dmem.load_half(addr))
         elif opcode == 0x23:  # stores
             imm = imm_s(inst)
-            addr = rs1_val + imm
-            if funct3 == 0x2:  # sw
+            addr = mask32(rs1_val + imm)
+            size = {0x0: 1, 0x1: 2, 0x2: 4}.get(funct3)
+            if size == 1:  # sb
+                self.dmem.store_byte(addr, rs2_val)
+            elif size == 2:  # sh
+                self.dmem.store_half(addr, rs2_val)
+            elif size == 4:  # sw
                 self.dmem.store_word(addr, rs2_val)
+            if size is not None and self.unified_memory and self.imem.contains(addr):
+                self.imem.store(addr, rs2_val, size)
         elif opcode == 0x63:  # branches
             imm = imm_b(inst)
             if funct3 == 0x0:  # beq
@@ -230,43 +1377,151 @@ class CPU:
         else:
             # unknown opcode -> stop
             self.running = False
+            self.halt_reason = "illegal"
 
         self.pc = mask32(pc_next)
 
-    def run(self, max_steps: int = 100000):
+    def run_reference(self, max_steps: int = 100000):
         while self.running and self.step_count < max_steps:
-            self.step()
+            self.step_reference()
 
 
-# ---------------- .hex loader + main ----------------
+# ---------------- program loaders + main ----------------
 
 def load_hex_file(path: str) -> List[int]:
+    # bulk path: one hex conversion for the whole file when every line is
+    # exactly one 8-hex-digit token; otherwise fall back to per-line parsing
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = data.splitlines()
+    tokens = data.split()
+    blob = b"".join(tokens)
+    if len(blob) == 8 * len(tokens) and len(tokens) == len(lines) - lines.count(b""):
+        try:
+            raw = bytes.fromhex(blob.decode("ascii"))
+        except (UnicodeDecodeError, ValueError):
+            raw = None
+        if raw is not None:
+            words = array("I")
+            words.frombytes(raw)
+            if sys.byteorder == "little":
+                words.byteswap()  # text is most-significant digit first
+            return words.tolist()
+
     words = []
-    with open(path, "r") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            # assume 8 hex chars, no 0x
-            try:
-                w = int(line, 16)
-            except ValueError:
-                continue
-            words.append(w & 0xFFFFFFFF)
+    for line in lines:
+        fields = line.split()
+        if not fields:
+            continue
+        # the word is the first field (8 hex chars, no 0x); the rest of the
+        # line may be a comment
+        try:
+            w = int(fields[0], 16)
+        except ValueError:
+            continue
+        words.append(w & 0xFFFFFFFF)
+    return words
+
+
+def _map_file(path: str):
+    """Copy-on-write mmap of a file; None for an empty file."""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+
+def _word_view(buf, offset: int, length: int):
+    """Little-endian 32-bit words over buf[offset:offset+length], zero-copy
+    on little-endian hosts."""
+    view = memoryview(buf)[offset:offset + (length & ~3)]
+    if sys.byteorder == "little":
+        return view.cast("I")
+    words = array("I", view.tobytes())
+    words.byteswap()
     return words
 
 
+def load_bin_file(path: str, base: int = 0) -> Tuple[InstrMemory, DataMemory, int]:
+    """Raw little-endian image at base. Returns (imem, dmem, entry pc).
+
+    Instruction and data memory each get their own copy-on-write mapping,
+    so neither reads the file up front and stores never reach the file.
+    """
+    imap = _map_file(path)
+    dmem = DataMemory()
+    if imap is None:
+        return InstrMemory([], base), dmem, base
+    imem = InstrMemory(_word_view(imap, 0, len(imap)), base)
+    dmem.map_region(base, _map_file(path))
+    return imem, dmem, base
+
+
+ELF_HEADER = struct.Struct("<16sHHIIIIIHHHHHH")
+ELF_PHDR = struct.Struct("<IIIIIIII")
+PT_LOAD = 1
+PF_X = 1
+EM_RISCV = 0xF3
+
+
+def load_elf_file(path: str) -> Tuple[InstrMemory, DataMemory, int]:
+    """ELF32 little-endian RISC-V executable. Every PT_LOAD segment is mapped
+    into data memory; the executable segment holding the entry point (or
+    the first executable one) backs instruction memory."""
+    imap = _map_file(path)
+    if imap is None or len(imap) < ELF_HEADER.size:
+        raise ValueError("not an ELF file: " + path)
+    (ident, _type, machine, _version, entry, phoff, _shoff, _flags,
+     _ehsize, phentsize, phnum, _shentsize, _shnum, _shstrndx) = ELF_HEADER.unpack_from(imap, 0)
+    if ident[:4] != b"\x7fELF" or ident[4] != 1 or ident[5] != 1:
+        raise ValueError("not an ELF32 little-endian file: " + path)
+    if machine != EM_RISCV:
+        raise ValueError("not a RISC-V ELF file: " + path)
+
+    segments = []
+    for i in range(phnum):
+        seg = ELF_PHDR.unpack_from(imap, phoff + i * phentsize)
+        if seg[0] == PT_LOAD:
+            segments.append(seg)
+
+    dmap = _map_file(path)
+    dmem = DataMemory()
+    text = None
+    for p_type, offset, vaddr, _paddr, filesz, memsz, flags, _align in segments:
+        if filesz:
+            # bytes past filesz (.bss) read as zero from unbacked pages
+            dmem.map_region(vaddr, memoryview(dmap)[offset:offset + filesz])
+        if flags & PF_X and (text is None or vaddr <= entry < vaddr + memsz):
+            text = (offset, vaddr, filesz)
+
+    if text is None:
+        imem = InstrMemory([], entry)
+    else:
+        offset, vaddr, filesz = text
+        imem = InstrMemory(_word_view(imap, offset, filesz), vaddr)
+    return imem, dmem, entry
+
+
+def load_program(path: str) -> Tuple[InstrMemory, DataMemory, int]:
+    """Pick a loader from the file contents/extension: ELF, .bin or .hex."""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic == b"\x7fELF":
+        return load_elf_file(path)
+    if path.endswith(".bin"):
+        return load_bin_file(path)
+    return InstrMemory(load_hex_file(path)), DataMemory(), 0
+
+
 def main():
-    import sys
     if len(sys.argv) < 2:
-        print("Usage: python cpu.py prog.hex")
+        print("Usage: python cpu.py prog.hex|prog.bin|prog.elf")
         sys.exit(1)
 
     prog_path = sys.argv[1]
-    words = load_hex_file(prog_path)
-    imem = InstrMemory(words)
-    dmem = DataMemory()
+    imem, dmem, entry = load_program(prog_path)
     cpu = CPU(imem, dmem)
+    cpu.pc = entry
 
     cpu.run()
     print("Finished. Final register state:")
@@ -0,0 +1,249 @@
+# Hot-path profiler and instruction-mix statistics for cpu.CPU.
+#
+#   prof = Profiler(cpu)
+#   cpu.run(profiler=prof)
+#   prof.write_json("profile.json")
+#   prof.write_folded("profile.folded")   # flamegraph.pl / speedscope input
+#
+# Counters live in arrays sized when the profiler is created: one slot per
+# instruction word for execution and taken-branch counts, one per
+# (opcode, funct3, funct7) for the instruction mix and one per
+# 2**addr_shift-byte region for load and store addresses. Each retired
+# instruction costs a few array increments; dicts are only touched on calls
+# and returns, which move the shadow call stack behind the folded stacks.
+#
+# Calls and returns follow the RISC-V calling convention: jal / jalr with
+# rd = ra or t0 is a call, jalr x0 through ra or t0 a return. Profiling is
+# opt-in: CPU.run without profiler= never touches this module.
+
+import json
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+_M32 = 0xFFFFFFFF
+_LINK = (1, 5)              # ra, t0
+
+OPCODE_NAMES = {
+    0x00: "halt",           # cpu.HALT_RECORD: the words 0 and jal x0, 0
+    0x03: "load", 0x07: "load-fp", 0x13: "op-imm", 0x17: "auipc", 0x23: "store",
+    0x27: "store-fp", 0x33: "op", 0x37: "lui", 0x43: "fmadd", 0x47: "fmsub",
+    0x4B: "fnmsub", 0x4F: "fnmadd", 0x53: "op-fp", 0x63: "branch", 0x67: "jalr",
+    0x6F: "jal", 0x73: "system",
+}
+
+_BY_FUNCT3 = {
+    0x03: {0: "lb", 1: "lh", 2: "lw", 4: "lbu", 5: "lhu"},
+    0x07: {2: "flw", 3: "fld"},
+    0x13: {0: "addi", 2: "slti", 3: "sltiu", 4: "xori", 6: "ori", 7: "andi", 1: "slli"},
+    0x23: {0: "sb", 1: "sh", 2: "sw"},
+    0x27: {2: "fsw", 3: "fsd"},
+    0x63: {0: "beq", 1: "bne", 4: "blt", 5: "bge", 6: "bltu", 7: "bgeu"},
+    0x73: {0: "ecall", 1: "csrrw", 2: "csrrs", 3: "csrrc", 5: "csrrwi", 6: "csrrsi",
+           7: "csrrci"},
+}
+_OP = {(0, 0x00): "add", (0, 0x20): "sub", (1, 0x00): "sll", (2, 0x00): "slt",
+       (3, 0x00): "sltu", (4, 0x00): "xor", (5, 0x00): "srl", (5, 0x20): "sra",
+       (6, 0x00): "or", (7, 0x00): "and"}
+_OP.update({(f3, 0x01): name for f3, name in enumerate(
+    ("mul", "mulh", "mulhsu", "mulhu", "div", "divu", "rem", "remu"))})
+_OP_FP = {0x00: "fadd", 0x04: "fsub", 0x08: "fmul", 0x0C: "fdiv", 0x2C: "fsqrt",
+          0x10: "fsgnj", 0x70: "fmv.x.w", 0x78: "fmv.w.x"}
+
+# what retire() does per opcode: 0 nothing more, else one of these
+_LOAD, _STORE, _BRANCH, _JAL, _JALR = 1, 2, 3, 4, 5
+_ACTION = [0] * 128
+for _op, _kind in ((0x03, _LOAD), (0x07, _LOAD), (0x23, _STORE), (0x27, _STORE),
+                   (0x63, _BRANCH), (0x6F, _JAL), (0x67, _JALR)):
+    _ACTION[_op] = _kind
+
+
+def mnemonic(opcode: int, funct3: int, funct7: int) -> str:
+    """Instruction name for the mix; fields that are immediate bits for an
+    opcode are ignored."""
+    if opcode in (0x00, 0x37, 0x17, 0x6F, 0x67):
+        return OPCODE_NAMES[opcode]
+    if opcode == 0x33:
+        name = _OP.get((funct3, funct7))
+    elif opcode == 0x13 and funct3 == 5:
+        name = {0x00: "srli", 0x20: "srai"}.get(funct7 & 0x7E)
+    elif opcode in _BY_FUNCT3:
+        name = _BY_FUNCT3[opcode].get(funct3)
+    elif opcode == 0x53:
+        name = _OP_FP.get(funct7 & ~1)
+        if name == "fsgnj":
+            name += ("", "n", "x")[funct3] if funct3 < 3 else "?"
+        if name is not None and funct7 < 0x70:
+            name += ".d" if funct7 & 1 else ".s"
+    elif opcode in (0x43, 0x47, 0x4B, 0x4F):
+        name = OPCODE_NAMES[opcode] + (".d" if funct7 & 3 == 1 else ".s")
+    else:
+        name = None
+    if name is None:
+        return "%s/%d/0x%02x" % (OPCODE_NAMES.get(opcode, "0x%02x" % opcode), funct3, funct7)
+    return name
+
+
+class Profiler:
+    """Per-PC counts, instruction mix, branch outcomes, load / store address
+    histograms and call stacks for runs of cpu.
+
+    PCs are counted per word of cpu's instruction memory; executions
+    elsewhere only add to `outside`. symbols maps function entry addresses
+    to names for the folded stacks.
+    """
+
+    def __init__(self, cpu, addr_shift: int = 16, symbols: Optional[Dict[int, str]] = None):
+        if not 12 <= addr_shift <= 32:
+            raise ValueError("address histogram shift must be in 12..32: " + str(addr_shift))
+        imem = cpu.imem
+        self.base = getattr(imem, "base", 0)
+        self.words = len(imem.words)
+        self.addr_shift = addr_shift
+        self.symbols = dict(symbols or {})
+        self.entry = cpu.pc
+        self.reset()
+
+    def reset(self):
+        n = self.words
+        self.outside = 0
+        self.pc_counts = array("Q", [0]) * n
+        self.taken = array("Q", [0]) * n            # per branch pc
+        self.is_branch = bytearray(n)
+        self.mix = array("Q", [0]) * (1 << 17)      # opcode << 10 | funct3 << 7 | funct7
+        regions = 1 << (32 - self.addr_shift)
+        self.loads = array("Q", [0]) * regions
+        self.stores = array("Q", [0]) * regions
+        # shadow call stack: stack ids with parent / function, a count each
+        self.parent = [-1]
+        self.func = [self.entry]
+        self.stack_counts = [0]
+        self._children: Dict[Tuple[int, int], int] = {}
+        self._frames: List[int] = []
+        self._sid = 0
+
+    # ---- driving the CPU ----
+
+    def run(self, cpu, max_steps: int = 100000):
+        cpu.run_observed(max_steps, [self])
+
+    def retire(self, cpu, d, pc: int, a: int, b: int):
+        """Observer hook for CPU.run(profiler=...)."""
+        self.stack_counts[self._sid] += 1
+        i = (pc - self.base) >> 2
+        if 0 <= i < self.words:
+            self.pc_counts[i] += 1
+        else:
+            self.outside += 1
+            i = -1
+        op = d.opcode
+        self.mix[(op << 10) | (d.funct3 << 7) | d.funct7] += 1
+        action = _ACTION[op]
+        if not action:
+            return
+        if action == _LOAD:
+            self.loads[((a + d.imm) & _M32) >> self.addr_shift] += 1
+        elif action == _STORE:
+            self.stores[((a + d.imm) & _M32) >> self.addr_shift] += 1
+        elif action == _BRANCH:
+            if i >= 0:
+                self.is_branch[i] = 1
+                if cpu.pc != ((pc + 4) & _M32):
+                    self.taken[i] += 1
+        elif d.rd in _LINK:
+            self._call(cpu.pc)
+        elif action == _JALR and d.rd == 0 and d.rs1 in _LINK:
+            if self._frames:
+                self._sid = self._frames.pop()
+
+    def _call(self, target: int):
+        key = (self._sid, target)
+        sid = self._children.get(key)
+        if sid is None:
+            sid = self._children[key] = len(self.parent)
+            self.parent.append(self._sid)
+            self.func.append(target)
+            self.stack_counts.append(0)
+        self._frames.append(self._sid)
+        self._sid = sid
+
+    # ---- results ----
+
+    @property
+    def instructions(self) -> int:
+        return sum(self.stack_counts)
+
+    def _name(self, addr: int) -> str:
+        return self.symbols.get(addr) or "0x%08x" % addr
+
+    def hot_pcs(self, n: int = 10) -> List[Tuple[int, int]]:
+        """(pc, executions) for the n most executed PCs."""
+        counts = self.pc_counts
+        top = sorted((i for i in range(self.words) if counts[i]),
+                     key=lambda i: (-counts[i], i))[:n]
+        return [(self.base + 4 * i, counts[i]) for i in top]
+
+    def branches(self) -> List[Tuple[int, int, int]]:
+        """(pc, taken, not taken) for every executed conditional branch."""
+        counts, taken = self.pc_counts, self.taken
+        return [(self.base + 4 * i, taken[i], counts[i] - taken[i])
+                for i in range(self.words) if self.is_branch[i]]
+
+    def mix_counts(self) -> Dict[str, int]:
+        """Executions per instruction name."""
+        out: Dict[str, int] = {}
+        mix = self.mix
+        for k in range(len(mix)):
+            if mix[k]:
+                name = mnemonic(k >> 10, (k >> 7) & 7, k & 0x7F)
+                out[name] = out.get(name, 0) + mix[k]
+        return out
+
+    def opcode_counts(self) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        mix = self.mix
+        for op in range(128):
+            n = sum(mix[op << 10:(op + 1) << 10])
+            if n:
+                out[OPCODE_NAMES.get(op, "0x%02x" % op)] = n
+        return out
+
+    def address_histogram(self, stores: bool = False) -> Dict[int, int]:
+        """Region base address -> loads (or stores) in that region."""
+        hist = self.stores if stores else self.loads
+        return {r << self.addr_shift: hist[r] for r in range(len(hist)) if hist[r]}
+
+    def folded(self) -> List[str]:
+        """Folded stacks, 'outer;inner count' per distinct call stack."""
+        lines = []
+        for sid, count in enumerate(self.stack_counts):
+            if not count:
+                continue
+            names = []
+            s = sid
+            while s >= 0:
+                names.append(self._name(self.func[s]))
+                s = self.parent[s]
+            lines.append(";".join(reversed(names)) + " " + str(count))
+        return sorted(lines)
+
+    def report(self, top: int = 10) -> dict:
+        return {
+            "instructions": self.instructions,
+            "outside_pcs": self.outside,
+            "hot_pcs": [{"pc": pc, "count": c} for pc, c in self.hot_pcs(top)],
+            "opcodes": self.opcode_counts(),
+            "mix": self.mix_counts(),
+            "branches": [{"pc": pc, "taken": t, "not_taken": nt}
+                         for pc, t, nt in self.branches()],
+            "loads": {"0x%08x" % a: n for a, n in self.address_histogram().items()},
+            "stores": {"0x%08x" % a: n for a, n in self.address_histogram(True).items()},
+        }
+
+    def write_json(self, path: str, top: int = 10):
+        with open(path, "w") as f:
+            json.dump(self.report(top), f, indent=2)
+
+    def write_folded(self, path: str):
+        with open(path, "w") as f:
+            for line in self.folded():
+                f.write(line + "\n")
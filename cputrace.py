@@ -0,0 +1,273 @@
+# Streaming binary execution trace for cpu.CPU and the numeric units.
+#
+# Every retired instruction becomes one fixed-size little-endian record
+# (RECORD below): kind, instruction class, rd, flags, pc, instruction word,
+# rd value, memory address and memory data. Records are packed into a
+# preallocated buffer and written out whenever it fills, so memory stays
+# bounded however long the run; the stream can be gzip- or zstd-compressed.
+#
+#   with TraceWriter("run.trace.gz", compression="gzip") as tw:
+#       cpu.run(trace=tw)
+#   for rec in read_trace("run.trace.gz", classes=("load", "store")):
+#       ...
+#
+# With units=True each M-extension instruction is followed by its internal
+# multiplier / divider steps (KIND_UNIT_STEP records), taken from the
+# reference mdu trace. Tracing is opt-in: CPU.run without trace= never
+# touches this module.
+
+import gzip
+import struct
+from collections import namedtuple
+from typing import Iterable, Iterator, Optional, Tuple
+
+from src.numeric_core import mdu
+from src.numeric_core.bitvector import BitVector
+
+try:
+    import zstandard
+except ImportError:  # optional dependency: pip install zstandard
+    zstandard = None
+
+MAGIC = b"RVTR"
+VERSION = 1
+HEADER = struct.Struct("<4sHH")            # magic, version, record size
+RECORD = struct.Struct("<BBBBIIQIQ")       # 32 bytes
+
+KIND_RETIRE = 0
+KIND_UNIT_STEP = 1
+
+CLASSES = ("other", "alu", "load", "store", "branch", "jump", "mdu", "fpu", "system")
+_CLASS = {name: i for i, name in enumerate(CLASSES)}
+
+# flags of KIND_RETIRE records
+HAS_RD = 0x01       # value holds the value written to rd
+RD_FP = 0x02        # ... and rd is an f register
+MEM_LOAD = 0x04     # addr / data describe a load
+MEM_STORE = 0x08    # ... or a store
+
+# flags of KIND_UNIT_STEP records: the step's action, if it has one
+STEP_ACTIONS = ("", "sub", "restore", "add", "correct", "div_by_zero")
+_ACTION = {name: i for i, name in enumerate(STEP_ACTIONS)}
+
+_M64 = 0xFFFFFFFFFFFFFFFF
+_STORE_MASK = {0: 0xFF, 1: 0xFFFF, 2: 0xFFFFFFFF, 3: _M64}
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_GZIP_MAGIC = b"\x1f\x8b"
+
+TraceRecord = namedtuple("TraceRecord", "kind iclass rd flags pc inst value addr data")
+
+
+def _require_zstandard():
+    if zstandard is None:
+        raise ImportError("zstd trace compression needs zstandard (pip install zstandard)")
+
+
+def instruction_class(d) -> int:
+    """Index into CLASSES for a Decoded record."""
+    op = d.opcode
+    if op in (0x33, 0x13, 0x37, 0x17):
+        return _CLASS["mdu"] if op == 0x33 and d.funct7 == 0x01 else _CLASS["alu"]
+    if op in (0x03, 0x07):
+        return _CLASS["load"]
+    if op in (0x23, 0x27):
+        return _CLASS["store"]
+    if op == 0x63:
+        return _CLASS["branch"]
+    if op in (0x6F, 0x67):
+        return _CLASS["jump"]
+    if op in (0x53, 0x43, 0x47, 0x4B, 0x4F):
+        return _CLASS["fpu"]
+    if op == 0x73:
+        return _CLASS["system"]
+    return _CLASS["other"]
+
+
+def _rd_kind(d) -> int:
+    """0: no register result, 1: x register, 2: f register."""
+    op = d.opcode
+    if op in (0x23, 0x27, 0x63) or op == 0:
+        return 0
+    if op == 0x07 or op in (0x43, 0x47, 0x4B, 0x4F):
+        return 2
+    if op == 0x53:
+        return 1 if d.funct7 == 0x70 else 2
+    return 1
+
+
+def _selector(pc_range: Optional[Tuple[int, int]], classes: Optional[Iterable[str]]):
+    """(lo, hi, class codes or None) for the pc / class filters."""
+    lo, hi = pc_range if pc_range is not None else (0, 1 << 32)
+    codes = None
+    if classes is not None:
+        codes = set()
+        for name in classes:
+            if name not in _CLASS:
+                raise ValueError("Unknown instruction class: " + str(name))
+            codes.add(_CLASS[name])
+    return lo, hi, codes
+
+
+class TraceWriter:
+    """Buffered writer of RECORDs. compression is None, "gzip" or "zstd".
+
+    Only instructions with lo <= pc < hi (pc_range) and, if given, in one
+    of classes are recorded. buffer_records sets the in-memory buffer; it
+    is the only memory the writer holds.
+    """
+
+    def __init__(self, path: str, compression: Optional[str] = None,
+                 buffer_records: int = 4096, units: bool = False,
+                 pc_range: Optional[Tuple[int, int]] = None,
+                 classes: Optional[Iterable[str]] = None):
+        if compression not in (None, "gzip", "zstd"):
+            raise ValueError("Unknown trace compression: " + str(compression))
+        self.lo, self.hi, self.codes = _selector(pc_range, classes)
+        self.units = units
+        if compression == "zstd":
+            _require_zstandard()
+            self._raw = open(path, "wb")
+            self._fh = zstandard.ZstdCompressor().stream_writer(self._raw)
+        elif compression == "gzip":
+            self._raw = None
+            self._fh = gzip.open(path, "wb", compresslevel=6)
+        else:
+            self._raw = None
+            self._fh = open(path, "wb")
+        self._fh.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+        self._buf = bytearray(RECORD.size * buffer_records)
+        self._pos = 0
+        self._info = {}
+        self.records = 0
+
+    def _emit(self, kind, iclass, rd, flags, pc, inst, value, addr, data):
+        RECORD.pack_into(self._buf, self._pos, kind, iclass, rd, flags,
+                         pc, inst, value, addr, data)
+        self._pos += RECORD.size
+        self.records += 1
+        if self._pos == len(self._buf):
+            self.flush()
+
+    def retire(self, cpu, d, pc: int, a: int, b: int):
+        """Observer hook for CPU.run(trace=...): record one instruction."""
+        if not self.lo <= pc < self.hi:
+            return
+        info = self._info.get(d.inst)
+        if info is None:
+            info = self._info[d.inst] = (instruction_class(d), _rd_kind(d))
+        iclass, rd_kind = info
+        if self.codes is not None and iclass not in self.codes:
+            return
+        flags = value = addr = data = 0
+        if rd_kind == 1 and d.rd:
+            flags = HAS_RD
+            value = cpu.regs.regs[d.rd]
+        elif rd_kind == 2:
+            flags = HAS_RD | RD_FP
+            value = cpu.fregs.regs[d.rd]
+        if iclass == 2:    # load
+            flags |= MEM_LOAD
+            addr = (a + d.imm) & 0xFFFFFFFF
+            data = value
+        elif iclass == 3:  # store
+            flags |= MEM_STORE
+            addr = (a + d.imm) & 0xFFFFFFFF
+            src = b if d.opcode == 0x23 else cpu.fregs.regs[d.rs2]
+            data = src & _STORE_MASK[d.funct3 & 3]
+        self._emit(KIND_RETIRE, iclass, d.rd, flags, pc, d.inst, value, addr, data)
+        if self.units and iclass == 6:
+            self.unit_steps(_mdu_steps(d.funct3, a, b), pc, d.inst)
+
+    def unit_steps(self, steps, pc: int = 0, inst: int = 0, iclass: str = "mdu"):
+        """Record a numeric unit's step list (the dicts returned with
+        trace=True). The first two bit-string or count fields go to value
+        and data, the step index to addr, a quotient digit to rd and the
+        action to flags."""
+        code = _CLASS[iclass]
+        for n, step in enumerate(steps or ()):
+            payload = []
+            for key, v in step.items():
+                if key in ("i", "digit", "action", "event"):
+                    continue
+                if isinstance(v, str):
+                    payload.append(int(v, 2) & _M64 if v else 0)
+                elif isinstance(v, int):
+                    payload.append(v & _M64)
+            payload += [0, 0]
+            digit = step.get("digit")
+            action = _ACTION.get(step.get("action") or step.get("event") or "", 0)
+            self._emit(KIND_UNIT_STEP, code, (digit or 0) & 0xFF, action, pc, inst,
+                       payload[0], step.get("i", n) & 0xFFFFFFFF, payload[1])
+
+    def flush(self):
+        if self._pos:
+            self._fh.write(memoryview(self._buf)[:self._pos])
+            self._pos = 0
+
+    def close(self):
+        if self._fh is None:
+            return
+        self.flush()
+        self._fh.close()
+        if self._raw is not None:
+            self._raw.close()
+        self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _mdu_steps(funct3: int, a: int, b: int):
+    # the reference units are the ones that expose their steps
+    x, y = BitVector(32, a), BitVector(32, b)
+    if funct3 < 4:
+        signed1, signed2 = ((True, True), (True, True), (True, False), (False, False))[funct3]
+        return mdu.mul_wide.uncached.reference(x, y, signed1, signed2, trace=True)[3]
+    return mdu.div_rem.uncached.reference(x, y, not funct3 & 1, trace=True)[3]
+
+
+def _open_read(path: str):
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(_GZIP_MAGIC):
+        return gzip.open(path, "rb")
+    if magic == _ZSTD_MAGIC:
+        _require_zstandard()
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    return open(path, "rb")
+
+
+def read_trace(path: str, pc_range: Optional[Tuple[int, int]] = None,
+               classes: Optional[Iterable[str]] = None, kinds: Optional[Iterable[int]] = None,
+               chunk_records: int = 4096) -> Iterator[TraceRecord]:
+    """Iterate the records of a trace file (compression is detected),
+    optionally keeping only lo <= pc < hi, the named classes and the given
+    record kinds. Reads chunk_records records at a time."""
+    lo, hi, codes = _selector(pc_range, classes)
+    kinds = set(kinds) if kinds is not None else None
+    with _open_read(path) as f:
+        head = f.read(HEADER.size)
+        magic, version, size = HEADER.unpack(head) if len(head) == HEADER.size else (b"", 0, 0)
+        if magic != MAGIC:
+            raise ValueError("not a trace file: " + path)
+        if version != VERSION or size != RECORD.size:
+            raise ValueError("unsupported trace version %d / record size %d" % (version, size))
+        tail = b""
+        while True:
+            chunk = f.read(size * chunk_records)
+            if not chunk:
+                break
+            chunk = tail + chunk
+            whole = len(chunk) - len(chunk) % size
+            tail = chunk[whole:]
+            for rec in RECORD.iter_unpack(memoryview(chunk)[:whole]):
+                if not lo <= rec[4] < hi:
+                    continue
+                if codes is not None and rec[1] not in codes:
+                    continue
+                if kinds is not None and rec[0] not in kinds:
+                    continue
+                yield TraceRecord._make(rec)
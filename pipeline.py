@@ -0,0 +1,187 @@
+# Cycle model of a classic in-order 5-stage pipeline (IF ID EX MEM WB) that
+# runs alongside the functional cpu.CPU. The CPU executes each instruction
+# as usual; the model then places it in the pipeline from its decoded
+# fields, the registers it reads and writes and the next PC, so the timing
+# never affects architectural results.
+#
+# Hazards modelled:
+#   - RAW dependences, with full forwarding (EX/MEM and MEM/WB to EX) or
+#     none (register file written in the first half of WB, read in ID)
+#   - load-use: a loaded value reaches EX one cycle late even when forwarded
+#   - multi-cycle, unpipelined MDU and FPU: EX stays busy for the latency
+#   - control: predict not-taken; taken branches and jalr redirect from EX,
+#     jal from ID
+#
+# Timing costs nothing unless a PipelineModel is passed to CPU.run.
+
+from typing import Dict, List, Tuple
+
+STALL_CAUSES = ("load_use", "data", "mdu", "fpu", "branch", "jump")
+
+# producer kinds
+_ALU, _LOAD, _MDU, _FPU = 0, 1, 2, 3
+_CAUSE = {_ALU: "data", _LOAD: "load_use", _MDU: "mdu", _FPU: "fpu"}
+
+_FP = 32  # register namespace: x0..x31 -> 0..31, f0..f31 -> 32..63
+
+
+def _classify(d) -> Tuple[tuple, int, int, str]:
+    """(source registers, destination or -1, producer kind, control kind)
+    for a Decoded record. Control kind is '', 'branch', 'jal' or 'jalr'."""
+    op = d.opcode
+    rd, rs1, rs2 = d.rd, d.rs1, d.rs2
+    if op == 0x33:
+        return (rs1, rs2), rd, _MDU if d.funct7 == 0x01 else _ALU, ""
+    if op in (0x13, 0x67):
+        return (rs1,), rd, _ALU, "jalr" if op == 0x67 else ""
+    if op == 0x03:
+        return (rs1,), rd, _LOAD, ""
+    if op == 0x23:
+        return (rs1, rs2), -1, _ALU, ""
+    if op == 0x63:
+        return (rs1, rs2), -1, _ALU, "branch"
+    if op == 0x6F:
+        return (), rd, _ALU, "jal"
+    if op in (0x37, 0x17):
+        return (), rd, _ALU, ""
+    if op == 0x07:
+        return (rs1,), _FP + rd, _LOAD, ""
+    if op == 0x27:
+        return (rs1, _FP + rs2), -1, _ALU, ""
+    if op in (0x43, 0x47, 0x4B, 0x4F):
+        return (_FP + rs1, _FP + rs2, _FP + (d.funct7 >> 2)), _FP + rd, _FPU, ""
+    if op == 0x53:
+        if d.funct7 == 0x70:  # fmv.x.w
+            return (_FP + rs1,), rd, _ALU, ""
+        if d.funct7 == 0x78:  # fmv.w.x
+            return (rs1,), _FP + rd, _ALU, ""
+        if d.funct7 in (0x10, 0x11):  # sign injection
+            return (_FP + rs1, _FP + rs2), _FP + rd, _ALU, ""
+        return (_FP + rs1, _FP + rs2), _FP + rd, _FPU, ""
+    if op == 0x73:
+        return ((rs1,) if not d.funct3 & 4 else ()), rd, _ALU, ""
+    return (), -1, _ALU, ""
+
+
+class PipelineModel:
+    """5-stage timing model. Pass it to CPU.run(pipeline=...), then read
+    report().
+
+    fpu_latency / fdiv_latency are EX cycles for FPU arithmetic and for
+    fdiv/fsqrt; the MDU uses the CPU's own mul_latency / div_latency.
+    """
+
+    def __init__(self, forwarding: bool = True, branch_penalty: int = 2,
+                 jump_penalty: int = 1, fpu_latency: int = 4, fdiv_latency: int = 20):
+        self.forwarding = forwarding
+        self.branch_penalty = branch_penalty
+        self.jump_penalty = jump_penalty
+        self.fpu_latency = fpu_latency
+        self.fdiv_latency = fdiv_latency
+        self._info: Dict[int, Tuple[tuple, int, int, str]] = {}
+        self.reset()
+
+    def reset(self):
+        self.instructions = 0
+        self.ex = 1              # cycle the previous instruction entered EX
+        self.ex_free = 2         # first cycle EX can take a new instruction
+        self.busy_kind = _ALU    # unit holding EX until ex_free
+        self.fetch_ready = 2     # earliest EX cycle after a redirect
+        self.redirect = "branch"
+        self.done = 1            # last EX cycle of the youngest instruction
+        self.ready = [0] * 64    # register -> first EX cycle that can use it
+        self.producer = [_ALU] * 64
+        self.stalls = dict.fromkeys(STALL_CAUSES, 0)
+        self.flushes = 0
+        self.pc_stalls: Dict[int, int] = {}
+        self.pc_counts: Dict[int, int] = {}
+
+    # ---- driving the functional CPU ----
+
+    def run(self, cpu, max_steps: int = 100000):
+        cpu.run_observed(max_steps, [self])
+
+    def retire(self, cpu, d, pc: int, a: int, b: int):
+        """Account one retired instruction; a / b are its rs1 / rs2 values."""
+        info = self._info.get(d.inst)
+        if info is None:
+            info = self._info[d.inst] = _classify(d)
+        srcs, dst, kind, ctrl = info
+
+        t = self.ex + 1
+        if self.fetch_ready > t:
+            self._stall(pc, self.redirect, self.fetch_ready - t)
+            t = self.fetch_ready
+        if self.ex_free > t:
+            self._stall(pc, _CAUSE[self.busy_kind], self.ex_free - t)
+            t = self.ex_free
+        ready = self.ready
+        need, who = t, None
+        for r in srcs:
+            if r and ready[r] > need:
+                need, who = ready[r], r
+        if who is not None:
+            self._stall(pc, _CAUSE[self.producer[who]], need - t)
+            t = need
+
+        latency = 1
+        if kind == _MDU:
+            lat = cpu.div_latency if d.funct3 & 4 else cpu.mul_latency
+            latency = lat(d.funct3, a, b) if callable(lat) else lat
+        elif kind == _FPU:
+            latency = self.fdiv_latency if d.opcode == 0x53 and d.funct7 in (
+                0x0C, 0x0D, 0x2C, 0x2D) else self.fpu_latency
+        done = t + latency - 1
+        self.ex = t
+        self.ex_free = done + 1
+        self.busy_kind = kind
+        self.done = done
+        if dst > 0:
+            if self.forwarding:
+                ready[dst] = done + (2 if kind == _LOAD else 1)
+            else:
+                ready[dst] = done + 3
+            self.producer[dst] = kind
+
+        if ctrl:
+            taken = cpu.pc != ((pc + 4) & 0xFFFFFFFF)
+            if ctrl == "jal":
+                self.fetch_ready = t + 1 + self.jump_penalty
+                self.redirect = "jump"
+                self.flushes += 1
+            elif taken:
+                self.fetch_ready = t + 1 + self.branch_penalty
+                self.redirect = "jump" if ctrl == "jalr" else "branch"
+                self.flushes += 1
+        self.instructions += 1
+        self.pc_counts[pc] = self.pc_counts.get(pc, 0) + 1
+
+    def _stall(self, pc: int, cause: str, n: int):
+        self.stalls[cause] += n
+        self.pc_stalls[pc] = self.pc_stalls.get(pc, 0) + n
+
+    # ---- results ----
+
+    @property
+    def cycles(self) -> int:
+        # the youngest instruction still needs MEM and WB
+        return self.done + 3 if self.instructions else 0
+
+    def cpi(self) -> float:
+        return self.cycles / self.instructions if self.instructions else 0.0
+
+    def hotspots(self, n: int = 10) -> List[Tuple[int, int, int]]:
+        """(pc, stall cycles, executions) for the n PCs that stalled most."""
+        top = sorted(self.pc_stalls.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+        return [(pc, s, self.pc_counts.get(pc, 0)) for pc, s in top]
+
+    def report(self, top: int = 10) -> dict:
+        return {
+            "instructions": self.instructions,
+            "cycles": self.cycles,
+            "cpi": self.cpi(),
+            "stalls": dict(self.stalls),
+            "flushes": self.flushes,
+            "hotspots": [{"pc": pc, "stall_cycles": s, "count": c}
+                         for pc, s, c in self.hotspots(top)],
+        }
@@ -1,6 +1,11 @@
 # AI-BEGIN
 # src/numeric_core/adder.py
-# Full-adder based ripple-carry add/sub without using + - * / << >> on numeric values.
+# Full-adder based ripple-carry add/sub. Bit lists go through the gates one
+# bit at a time without + - * / << >> on numeric values; BitVector operands
+# take _packed_add, which applies the same gate equations to the whole word
+# with & | ^ and shifts.
+
+from .bitvector import BitVector, like
 
 def full_adder(a,b,cin):
     # sum = a XOR b XOR cin; cout = majority(a,b,cin)
@@ -9,11 +14,16 @@ def full_adder(a,b,cin):
     cout = ((a & b) | (a & cin) | (b & cin)) & 1
     return s, cout
 
-def ripple_add(bitsA, bitsB, cin=0):
+def ripple_add(bitsA, bitsB, cin=0, stats=None):
     """Add two same-length bit-vectors (MSB at index 0).
     Returns (sum_bits, carry_out)."""
     assert len(bitsA) == len(bitsB)
     n = len(bitsA)
+    if stats is not None:
+        # 7 gates per full adder; carry passes AND then OR at every bit
+        _count(stats, 7*n, 2*n+1)
+    if isinstance(bitsA, BitVector) or isinstance(bitsB, BitVector):
+        return _packed_add(BitVector.coerce(bitsA), BitVector.coerce(bitsB), cin)
     out = [0]*n
     c = cin & 1
     # process from LSB to MSB (right to left)
@@ -22,22 +32,210 @@ def ripple_add(bitsA, bitsB, cin=0):
         out[i] = s
     return out, c
 
+def _packed_add(a, b, cin):
+    # same full-adder equations applied to every bit position at once;
+    # carries are re-fed until none are left to propagate
+    n = a.width
+    x, y, c = a.value, b.value, cin & 1
+    s = x ^ y ^ c
+    carry = ((x & y) | (x & c) | (y & c)) << 1
+    while carry:
+        s, carry = s ^ carry, (s & carry) << 1
+    return BitVector(n, s), (s >> n) & 1
+
 def invert(bits):
+    if isinstance(bits, BitVector):
+        return BitVector(bits.width, ~bits.value)
     return [1-b for b in bits]
 
 def twos_negate(bits):
     inv = invert(bits)
     # add one
     one = [0]*(len(bits)-1) + [1]
-    s, c = ripple_add(inv, one, 0)
+    s, c = add(inv, one, 0)
     return s
 
 def sub(bitsA, bitsB):
     # A - B = A + (~B + 1)
     invB = invert(bitsB)
     one = [0]*(len(bitsB)-1) + [1]
-    tmp, _ = ripple_add(invB, one, 0)
-    s, c = ripple_add(bitsA, tmp, 0)
+    tmp, _ = add(invB, one, 0)
+    s, c = add(bitsA, tmp, 0)
     # For subtraction, carry-out==1 implies no borrow in two's complement convention
     return s, c
 # AI-END
+
+# ---------------- alternative adder engines ----------------
+# All engines use only AND/OR/XOR on single bits (ripple_add's packed
+# BitVector path aside) and return the same (sum_bits, carry_out) as
+# ripple_add. Passing a stats dict accumulates 'adds', 'gates' (logic gates
+# evaluated) and 'depth' (gate levels on the critical path, i.e. serial
+# steps) so engines can be compared.
+
+def _count(stats, gates, depth):
+    stats['adds'] = stats.get('adds', 0) + 1
+    stats['gates'] = stats.get('gates', 0) + gates
+    stats['depth'] = stats.get('depth', 0) + depth
+
+def _lsb_first(bitsA, bitsB):
+    return list(bitsA)[::-1], list(bitsB)[::-1]
+
+def _finish(template, s_lsb, cout):
+    return like(template, s_lsb[::-1]), cout
+
+def _prefix_add(bitsA, bitsB, cin, stats, network):
+    a, b = _lsb_first(bitsA, bitsB)
+    n = len(a)
+    g = [a[i] & b[i] for i in range(n)]
+    p = [a[i] ^ b[i] for i in range(n)]
+    G = g[:]
+    P = p[:]
+    gates = 2*n
+    levels = 0
+    for pairs in network(n):
+        # one level of (G,P) combines: (G,P)[i] o (G,P)[j] for j < i
+        newG = G[:]
+        newP = P[:]
+        for i, j in pairs:
+            newG[i] = G[i] | (P[i] & G[j])
+            newP[i] = P[i] & P[j]
+            gates += 3
+        G, P = newG, newP
+        levels += 1
+    c = cin & 1
+    # carry into bit i+1 is G[0..i] | P[0..i] & cin
+    carries = [c] + [G[i] | (P[i] & c) for i in range(n)]
+    s = [p[i] ^ carries[i] for i in range(n)]
+    if stats is not None:
+        _count(stats, gates + 3*n, 1 + 2*levels + 2 + 1)
+    return _finish(bitsA, s, carries[n])
+
+def _kogge_stone_levels(n):
+    levels = []
+    d = 1
+    while d < n:
+        levels.append([(i, i - d) for i in range(d, n)])
+        d = d * 2
+    return levels
+
+def _brent_kung_levels(n):
+    levels = []
+    d = 1
+    while d < n:  # up-sweep: build power-of-two spans
+        pairs = [(i, i - d) for i in range(2*d - 1, n, 2*d)]
+        if pairs:
+            levels.append(pairs)
+        d = d * 2
+    d = d // 2
+    while d >= 1:  # down-sweep: fill in the remaining prefixes
+        pairs = [(i, i - d) for i in range(3*d - 1, n, 2*d)]
+        if pairs:
+            levels.append(pairs)
+        d = d // 2
+    return levels
+
+def kogge_stone_add(bitsA, bitsB, cin=0, stats=None):
+    """Kogge-Stone parallel prefix adder: log2(n) levels, dense wiring."""
+    assert len(bitsA) == len(bitsB)
+    return _prefix_add(bitsA, bitsB, cin, stats, _kogge_stone_levels)
+
+def brent_kung_add(bitsA, bitsB, cin=0, stats=None):
+    """Brent-Kung parallel prefix adder: 2*log2(n)-1 levels, ~2n combines."""
+    assert len(bitsA) == len(bitsB)
+    return _prefix_add(bitsA, bitsB, cin, stats, _brent_kung_levels)
+
+CLA_BLOCK = 4
+
+def cla_add(bitsA, bitsB, cin=0, stats=None):
+    """Carry-lookahead adder: 4-bit lookahead blocks with rippled block carries.
+    Inside a block every carry is one sum-of-products of g/p and the block
+    carry-in (AND/OR gates with fan-in up to 5)."""
+    assert len(bitsA) == len(bitsB)
+    a, b = _lsb_first(bitsA, bitsB)
+    n = len(a)
+    g = [a[i] & b[i] for i in range(n)]
+    p = [a[i] ^ b[i] for i in range(n)]
+    carries = [cin & 1]
+    gates = 2*n
+    blocks = 0
+    for base in range(0, n, CLA_BLOCK):
+        c0 = carries[base]
+        for j in range(base, min(base + CLA_BLOCK, n)):
+            # c[j+1] = g[j] | p[j]g[j-1] | ... | p[j]..p[base]c0
+            term_or = g[j]
+            prop = p[j]
+            for k in range(j - 1, base - 1, -1):
+                term_or = term_or | (prop & g[k])
+                prop = prop & p[k]
+                gates += 1
+            term_or = term_or | (prop & c0)
+            gates += 2
+            carries.append(term_or)
+        blocks += 1
+    s = [p[i] ^ carries[i] for i in range(n)]
+    if stats is not None:
+        _count(stats, gates + n, 1 + 2*blocks + 1)
+    return _finish(bitsA, s, carries[n])
+
+SELECT_BLOCK = 8
+
+def carry_select_add(bitsA, bitsB, cin=0, stats=None):
+    """Carry-select adder: each block after the first is ripple-added for
+    both carry-ins and the real block carry picks one through a mux."""
+    assert len(bitsA) == len(bitsB)
+    a, b = _lsb_first(bitsA, bitsB)
+    n = len(a)
+    s = [0]*n
+    c = cin & 1
+    gates = 0
+    depth = 0
+    for base in range(0, n, SELECT_BLOCK):
+        top = min(base + SELECT_BLOCK, n)
+        w = top - base
+        if base == 0:
+            for i in range(base, top):
+                s[i], c = full_adder(a[i], b[i], c)
+            gates += 7*w
+            depth += 2*w
+            continue
+        s0 = [0]*w; s1 = [0]*w
+        c0 = 0; c1 = 1
+        for k, i in enumerate(range(base, top)):
+            s0[k], c0 = full_adder(a[i], b[i], c0)
+            s1[k], c1 = full_adder(a[i], b[i], c1)
+        # 2:1 mux per sum bit and for the carry: (x & ~sel) | (y & sel)
+        nc = 1 ^ c
+        for k in range(w):
+            s[base + k] = (s0[k] & nc) | (s1[k] & c)
+        c = (c0 & nc) | (c1 & c)
+        gates += 14*w + 4*(w + 1)
+        depth += 2
+    if stats is not None:
+        _count(stats, gates, depth + 1)
+    return _finish(bitsA, s, c)
+
+ADDER_ENGINES = {
+    'ripple': ripple_add,
+    'cla': cla_add,
+    'kogge_stone': kogge_stone_add,
+    'brent_kung': brent_kung_add,
+    'carry_select': carry_select_add,
+}
+
+_engine = {'name': 'ripple'}
+
+def set_adder_engine(name):
+    """Select the engine used by add() (and so by alu/mdu/fpu) by default."""
+    if name not in ADDER_ENGINES:
+        raise ValueError('Unknown adder engine: ' + str(name))
+    _engine['name'] = name
+
+def get_adder_engine():
+    return _engine['name']
+
+def add(bitsA, bitsB, cin=0, engine=None, stats=None):
+    """Add with the given engine, or the module-level one when engine is None."""
+    fn = ADDER_ENGINES[engine or _engine['name']]
+    if stats is None:
+        return fn(bitsA, bitsB, cin)
+    return fn(bitsA, bitsB, cin, stats=stats)
@@ -2,20 +2,25 @@
 # src/numeric_core/alu.py
 # RV32 ADD/SUB with flags N,Z,C,V using ripple-carry adder only.
 
-from .adder import ripple_add, sub
+from .adder import add, sub
+from .bitvector import BitVector
+from .backend import dispatch
 
 def msb(bits):
     return bits[0] if bits else 0
 
 def is_zero(bits):
+    if isinstance(bits, BitVector):
+        return 1 if bits.value == 0 else 0
     for b in bits:
         if b == 1:
             return 0
     return 1
 
+@dispatch
 def alu_add(bitsA, bitsB):
     n = len(bitsA)
-    s, c = ripple_add(bitsA, bitsB, 0)
+    s, c = add(bitsA, bitsB, 0)
     a_s = msb(bitsA)
     b_s = msb(bitsB)
     r_s = msb(s)
@@ -26,6 +31,7 @@ def alu_add(bitsA, bitsB):
     cflag = c  # carry out of MSB
     return s, {'N':nflag,'Z':zflag,'C':cflag,'V':v}
 
+@dispatch
 def alu_sub(bitsA, bitsB):
     s, c = sub(bitsA, bitsB)
     a_s = bitsA[0]
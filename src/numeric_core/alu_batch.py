@@ -0,0 +1,75 @@
+# src/numeric_core/alu_batch.py
+# Vectorised RV32 ADD/SUB over NumPy uint32 arrays, bit-exact with
+# alu.alu_add / alu.alu_sub (results and N, Z, C, V flags).
+# Carries are propagated with a Kogge-Stone prefix network built from
+# whole-array AND/OR/XOR and shifts: log2(32) = 5 combine steps.
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pip install numpy
+    np = None
+
+WIDTH = 32
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('numeric_core.alu_batch needs numpy (pip install numpy)')
+
+
+def _as_u32(x):
+    return np.asarray(x, dtype=np.uint32)
+
+
+def prefix_add(a, b, cin=0):
+    """Element-wise a + b + cin on uint32 arrays. Returns (sum, carry_out)."""
+    _require_numpy()
+    a = _as_u32(a)
+    b = _as_u32(b)
+    g = a & b
+    p = a ^ b
+    if cin:
+        g = g | (p & np.uint32(1))
+    pp = p.copy()
+    d = 1
+    while d < WIDTH:
+        sd = np.uint32(d)
+        g = g | (pp & (g << sd))
+        pp = pp & (pp << sd)
+        d *= 2
+    carries = (g << np.uint32(1)) | np.uint32(cin & 1)
+    s = p ^ carries
+    cout = (g >> np.uint32(WIDTH - 1)) & np.uint32(1)
+    return s, cout.astype(np.uint8)
+
+
+def _flags(s, c, v):
+    return {
+        'N': (s >> np.uint32(WIDTH - 1)).astype(np.uint8),
+        'Z': (s == 0).astype(np.uint8),
+        'C': c,
+        'V': v.astype(np.uint8),
+    }
+
+
+def alu_add_batch(a, b):
+    """Batch alu_add: returns (results, {'N','Z','C','V'} uint8 arrays)."""
+    _require_numpy()
+    a = _as_u32(a)
+    b = _as_u32(b)
+    s, c = prefix_add(a, b)
+    # same sign in, different sign out
+    v = ((~(a ^ b) & (a ^ s)) >> np.uint32(WIDTH - 1)) & np.uint32(1)
+    return s, _flags(s, c, v)
+
+
+def alu_sub_batch(a, b):
+    """Batch alu_sub. Like adder.sub, B is negated first (carry dropped) and
+    then added, so C matches the scalar path (e.g. C=0 for B=0)."""
+    _require_numpy()
+    a = _as_u32(a)
+    b = _as_u32(b)
+    neg_b, _ = prefix_add(~b, np.zeros_like(b), cin=1)
+    s, c = prefix_add(a, neg_b)
+    v = (((a ^ b) & (a ^ s)) >> np.uint32(WIDTH - 1)) & np.uint32(1)
+    return s, _flags(s, c, v)
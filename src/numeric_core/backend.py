@@ -0,0 +1,97 @@
+# src/numeric_core/backend.py
+# Backend selection for the public alu / shifter / mdu / fpu ops.
+#   'reference'    - the bit-list implementations (default)
+#   'fast'         - the native-int versions in fast.py, bit-exact with the
+#                    reference
+#   'differential' - runs the reference, and on sampled calls the fast
+#                    version too, recording every disagreement
+# Calls that ask for a trace or a stats dict always use the reference.
+
+import functools
+import inspect
+import random
+
+from . import fast
+from .memo import _observed
+
+BACKENDS = ('reference', 'fast', 'differential')
+
+_state = {'name': 'reference', 'rate': 1.0, 'rng': random.Random(0)}
+_stats = {'calls': 0, 'checked': 0, 'mismatches': []}
+
+
+def set_backend(name, sample_rate=1.0, seed=0):
+    """Select the backend. sample_rate is the fraction of calls the
+    differential backend cross-checks."""
+    if name not in BACKENDS:
+        raise ValueError('Unknown backend: ' + str(name))
+    _state['name'] = name
+    _state['rate'] = sample_rate
+    _state['rng'] = random.Random(seed)
+    reset_differential()
+
+
+def get_backend():
+    return _state['name']
+
+
+def reset_differential():
+    _stats['calls'] = 0
+    _stats['checked'] = 0
+    _stats['mismatches'] = []
+
+
+def differential_report():
+    """{'calls', 'checked', 'mismatches'}; each mismatch records the op, the
+    arguments as (width, int) pairs and both results."""
+    return {'calls': _stats['calls'], 'checked': _stats['checked'],
+            'mismatches': list(_stats['mismatches'])}
+
+
+def _show(x):
+    if isinstance(x, list) and x and all(b in (0, 1) for b in x):
+        return (len(x), fast._val(x))
+    if hasattr(x, 'width') and hasattr(x, 'value'):
+        return (x.width, x.value)
+    if isinstance(x, tuple):
+        return tuple(_show(y) for y in x)
+    return x
+
+
+def _same(ref, got):
+    if isinstance(ref, tuple):
+        return isinstance(got, tuple) and len(ref) == len(got) and all(
+            _same(r, g) for r, g in zip(ref, got))
+    return type(ref) is type(got) and ref == got
+
+
+def dispatch(fn):
+    """Decorator: route fn to its fast.py twin according to the backend."""
+    op = fn.__name__
+    fast_fn = getattr(fast, op)
+    params = list(inspect.signature(fn).parameters)
+    watch = [(params.index(p), p) for p in ('trace', 'stats') if p in params]
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        name = _state['name']
+        if name == 'reference':
+            return fn(*args, **kwargs)
+        if watch and _observed(watch, args, kwargs):
+            return fn(*args, **kwargs)
+        if name == 'fast':
+            return fast_fn(*args, **kwargs)
+        _stats['calls'] += 1
+        ref = fn(*args, **kwargs)
+        if _state['rng'].random() < _state['rate']:
+            _stats['checked'] += 1
+            got = fast_fn(*args, **kwargs)
+            if not _same(ref, got):
+                _stats['mismatches'].append({
+                    'op': op, 'args': _show(tuple(args)), 'kwargs': dict(kwargs),
+                    'reference': _show(ref), 'fast': _show(got)})
+        return ref
+
+    wrapper.reference = fn
+    wrapper.fast = fast_fn
+    return wrapper
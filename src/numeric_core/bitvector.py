@@ -0,0 +1,130 @@
+# src/numeric_core/bitvector.py
+# Compact fixed-width bit vector. Behaves like the 0/1 lists used across the
+# core (MSB at index 0, indexing, slicing, concatenation with lists) but
+# stores the bits packed in a single int.
+
+class BitVector:
+    __slots__ = ('width', 'value')
+
+    def __init__(self, width, value=0):
+        self.width = width
+        self.value = value & ((1 << width) - 1)
+
+    @classmethod
+    def from_list(cls, bits):
+        v = 0
+        for b in bits:
+            v = (v << 1) | (b & 1)
+        return cls(len(bits), v)
+
+    @classmethod
+    def coerce(cls, bits):
+        return bits if isinstance(bits, BitVector) else cls.from_list(bits)
+
+    def to_list(self):
+        return list(self)
+
+    # ---- sequence protocol ----
+
+    def __len__(self):
+        return self.width
+
+    def __iter__(self):
+        v = self.value
+        for i in range(self.width - 1, -1, -1):
+            yield (v >> i) & 1
+
+    def __getitem__(self, key):
+        w = self.width
+        if isinstance(key, slice):
+            start, stop, step = key.indices(w)
+            if step != 1:
+                return BitVector.from_list(self.to_list()[key])
+            n = stop - start
+            if n <= 0:
+                return BitVector(0)
+            return BitVector(n, self.value >> (w - stop))
+        if key < 0:
+            key += w
+        if key < 0 or key >= w:
+            raise IndexError('BitVector index out of range')
+        return (self.value >> (w - 1 - key)) & 1
+
+    def __setitem__(self, key, bit):
+        w = self.width
+        if key < 0:
+            key += w
+        if key < 0 or key >= w:
+            raise IndexError('BitVector index out of range')
+        mask = 1 << (w - 1 - key)
+        if bit & 1:
+            self.value |= mask
+        else:
+            self.value &= ~mask
+
+    def __add__(self, other):
+        if not isinstance(other, (BitVector, list, tuple)):
+            return NotImplemented
+        o = BitVector.coerce(other)
+        return BitVector(self.width + o.width, (self.value << o.width) | o.value)
+
+    def __radd__(self, other):
+        if not isinstance(other, (list, tuple)):
+            return NotImplemented
+        o = BitVector.from_list(other)
+        return BitVector(o.width + self.width, (o.value << self.width) | self.value)
+
+    def __eq__(self, other):
+        if isinstance(other, BitVector):
+            return self.width == other.width and self.value == other.value
+        if isinstance(other, (list, tuple)):
+            return self.to_list() == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        digits = max(1, (self.width + 3) // 4)
+        return 'BitVector(%d, 0x%0*X)' % (self.width, digits, self.value)
+
+    # ---- in-place shift registers (used by the iterative mul/div loops) ----
+
+    def shift_left_in(self, bit=0):
+        """Drop the MSB and shift bit in at the LSB."""
+        self.value = ((self.value << 1) | (bit & 1)) & ((1 << self.width) - 1)
+        return self
+
+    def shift_right_in(self, bit=0):
+        """Drop the LSB and shift bit in at the MSB."""
+        self.value = (self.value >> 1) | ((bit & 1) << (self.width - 1))
+        return self
+
+
+def is_bitvector(bits):
+    return isinstance(bits, BitVector)
+
+
+def zeros_like(template, n):
+    """n zero bits of the same kind (list or BitVector) as template."""
+    return BitVector(n) if isinstance(template, BitVector) else [0] * n
+
+
+def like(template, bits):
+    """Convert bits to the kind of template."""
+    if isinstance(template, BitVector):
+        return BitVector.coerce(bits)
+    return bits.to_list() if isinstance(bits, BitVector) else bits
+
+
+def shl_in(bits, bit=0):
+    """bits[1:] + [bit]; a BitVector is shifted in place."""
+    if isinstance(bits, BitVector):
+        return bits.shift_left_in(bit)
+    return bits[1:] + [bit]
+
+
+def shr_in(bits, bit=0):
+    """[bit] + bits[:-1]; a BitVector is shifted in place."""
+    if isinstance(bits, BitVector):
+        return bits.shift_right_in(bit)
+    return [bit] + bits[:-1]
@@ -0,0 +1,447 @@
+# src/numeric_core/fast.py
+# Native-integer implementations of the public alu / shifter / mdu / fpu ops.
+# Each function takes and returns exactly what its bit-list counterpart
+# does (same bit lists or BitVectors, same flag dicts, same rounding) but
+# computes on Python ints. Selected through backend.set_backend('fast').
+#
+# The float ops follow the reference algorithm step for step (align with
+# guard/round/sticky, add or subtract, normalize, round, repack) instead of
+# using the host FPU, which exposes neither the flags nor the directed
+# rounding modes.
+
+import math
+
+from .bitvector import BitVector
+
+
+def _val(bits):
+    if isinstance(bits, BitVector):
+        return bits.value
+    v = 0
+    for b in bits:
+        v = (v << 1) | b
+    return v
+
+
+def _out(template, value, n):
+    """value as n bits of the same kind as template."""
+    if isinstance(template, BitVector):
+        return BitVector(n, value)
+    if n == 0:
+        return []
+    return [int(c) for c in format(value & ((1 << n) - 1), '0%db' % n)]
+
+
+# ---------------- alu ----------------
+
+def alu_add(bitsA, bitsB):
+    n = len(bitsA)
+    a, b = _val(bitsA), _val(bitsB)
+    t = a + b
+    s = t & ((1 << n) - 1)
+    kind = bitsA if isinstance(bitsA, BitVector) else bitsB
+    a_s, b_s, r_s = a >> (n - 1), b >> (n - 1), s >> (n - 1)
+    v = 1 if (a_s == b_s and r_s != a_s) else 0
+    return _out(kind, s, n), {'N': r_s, 'Z': 1 if s == 0 else 0, 'C': t >> n, 'V': v}
+
+
+def alu_sub(bitsA, bitsB):
+    n = len(bitsA)
+    mask = (1 << n) - 1
+    a, b = _val(bitsA), _val(bitsB)
+    # same carry as the reference a + ((~b + 1) mod 2^n): 0 when b == 0
+    t = a + ((-b) & mask)
+    s = t & mask
+    kind = bitsA if isinstance(bitsA, BitVector) else bitsB
+    a_s, b_s, r_s = a >> (n - 1), b >> (n - 1), s >> (n - 1)
+    v = 1 if (a_s != b_s and r_s != a_s) else 0
+    return _out(kind, s, n), {'N': r_s, 'Z': 1 if s == 0 else 0, 'C': t >> n, 'V': v}
+
+
+# ---------------- shifter ----------------
+
+def sll(bits, shamt):
+    n = len(bits)
+    k = shamt % n
+    return _out(bits, _val(bits) << k, n)
+
+
+def srl(bits, shamt):
+    n = len(bits)
+    k = shamt % n
+    return _out(bits, _val(bits) >> k, n)
+
+
+def sra(bits, shamt):
+    n = len(bits)
+    k = shamt % n
+    v = _val(bits)
+    if v >> (n - 1):
+        v -= 1 << n
+    return _out(bits, v >> k, n)
+
+
+# ---------------- mdu ----------------
+
+def _signed(v, n):
+    return v - (1 << n) if v >> (n - 1) else v
+
+
+def mul_wide(rs1, rs2, signed1=True, signed2=True, engine='shift_add', trace=False):
+    n = len(rs1)
+    a, b = _val(rs1), _val(rs2)
+    if signed1:
+        a = _signed(a, n)
+    if signed2:
+        b = _signed(b, n)
+    p = (a * b) & ((1 << (2 * n)) - 1)
+    low = p & ((1 << n) - 1)
+    hi = p >> n
+    sign = low >> (n - 1) if (signed1 or signed2) else 0
+    overflow = 0 if hi == (((1 << n) - 1) if sign else 0) else 1
+    return _out(rs1, low, n), _out(rs1, hi, n), {'overflow': overflow}, None
+
+
+def div_rem(rs1, rs2, signed=True, engine='restoring', trace=False):
+    n = len(rs1)
+    mask = (1 << n) - 1
+    a, b = _val(rs1), _val(rs2)
+    if b == 0:
+        return _out(rs1, mask, n), _out(rs1, a, n), {'div_by_zero': 1, 'overflow': 0}, None
+    if signed:
+        if a == 1 << (n - 1) and b == mask:
+            return _out(rs1, a, n), _out(rs1, 0, n), {'div_by_zero': 0, 'overflow': 1}, None
+        sa, sb = _signed(a, n), _signed(b, n)
+        q = abs(sa) // abs(sb)
+        if (sa < 0) != (sb < 0):
+            q = -q
+        r = sa - q * sb
+    else:
+        q, r = divmod(a, b)
+    return _out(rs1, q & mask, n), _out(rs1, r & mask, n), {'div_by_zero': 0, 'overflow': 0}, None
+
+
+# ---------------- fpu ----------------
+
+def _flags(invalid=0, overflow=0, underflow=0, inexact=0):
+    return {'invalid': invalid, 'overflow': overflow, 'underflow': underflow, 'inexact': inexact}
+
+
+def _round_inc(m, rm, sign, guard, rnd, sticky):
+    if rm == 'RNE':
+        return 1 if (guard and (rnd or sticky or (m & 1))) else 0
+    if rm == 'RMM':
+        return guard
+    if rm == 'RUP':
+        return 1 if (guard | rnd | sticky) and sign == 0 else 0
+    if rm == 'RDN':
+        return 1 if (guard | rnd | sticky) and sign == 1 else 0
+    return 0
+
+
+def _unpack(e, f, wf):
+    """(E, m) with m's leading 1 explicit; subnormals normalized to E <= 0."""
+    if e:
+        return e, (1 << wf) | f
+    n = f.bit_length()
+    return n - wf, f << (wf + 1 - n)
+
+
+def _round_pack(s, E, m, guard, rnd, sticky, we, wf, rm):
+    """fpu._round_pack on ints: m has wf+1 bits with the MSB set."""
+    from .fpu import get_tininess, _overflow_to_max
+    emax = (1 << we) - 1
+    L = wf + 1
+    if E >= 1:
+        m += _round_inc(m, rm, s, guard, rnd, sticky)
+        if m >> L:
+            m >>= 1
+            E += 1
+        if E >= emax:
+            if _overflow_to_max(rm, s):
+                return (s << (we + wf)) | ((emax - 1) << wf) | ((1 << wf) - 1), \
+                    _flags(overflow=1, inexact=1)
+            return (s << (we + wf)) | (emax << wf), _flags(overflow=1, inexact=1)
+        inexact = 1 if (guard | rnd | sticky) else 0
+        return (s << (we + wf)) | (E << wf) | (m & ((1 << wf) - 1)), _flags(inexact=inexact)
+
+    tiny = 1
+    if E == 0 and get_tininess() == 'after':
+        tiny = 0 if (m + _round_inc(m, rm, s, guard, rnd, sticky)) >> L else 1
+    shift = 1 - E
+    ext = (m << 2) | (guard << 1) | rnd
+    body = ext >> shift
+    out = 1 if (sticky or ext & ((1 << shift) - 1)) else 0
+    m, g2, r2 = body >> 2, (body >> 1) & 1, body & 1
+    m += _round_inc(m, rm, s, g2, r2, out)
+    inexact = 1 if (g2 | r2 | out) else 0
+    # a carry into bit wf is exponent field 1: the smallest normal
+    return (s << (we + wf)) | m, _flags(underflow=tiny & inexact, inexact=inexact)
+
+
+def _fadd(x, y, we, wf, rm, is_sub):
+    emax = (1 << we) - 1
+    fmask = (1 << wf) - 1
+    qnan = (emax << wf) | (1 << (wf - 1))
+    sA, eA, fA = x >> (we + wf), (x >> wf) & emax, x & fmask
+    sB, eB, fB = y >> (we + wf), (y >> wf) & emax, y & fmask
+    if is_sub:
+        sB ^= 1
+    if (eA == emax and fA) or (eB == emax and fB):
+        return qnan, _flags(invalid=1)
+    a_inf = eA == emax
+    b_inf = eB == emax
+    if a_inf or b_inf:
+        if a_inf and b_inf and sA != sB:
+            return qnan, _flags(invalid=1)
+        s = sA if a_inf else sB
+        return (s << (we + wf)) | (emax << wf), _flags()
+    a_zero = eA == 0 and fA == 0
+    b_zero = eB == 0 and fB == 0
+    if a_zero and b_zero:
+        from .fpu import _zero_sum_sign
+        return _zero_sum_sign(sA, sB, rm) << (we + wf), _flags()
+    if a_zero:
+        return (sB << (we + wf)) | (eB << wf) | fB, _flags()
+    if b_zero:
+        return x, _flags()
+
+    EA, mA = _unpack(eA, fA, wf)
+    EB, mB = _unpack(eB, fB, wf)
+    return _add_mag(sA, EA, mA, sB, EB, mB, wf + 1, we, wf, rm)
+
+
+def _add_mag(sA, EA, mA, sB, EB, mB, L, we, wf, rm):
+    """fpu._add_core on ints: L-bit magnitudes, rounded once to wf bits."""
+    fmask = (1 << wf) - 1
+    if EA > EB or (EA == EB and mA >= mB):
+        big, small, E, sBig, sSmall, shift = mA, mB, EA, sA, sB, EA - EB
+    else:
+        big, small, E, sBig, sSmall, shift = mB, mA, EB, sB, sA, EB - EA
+
+    if shift == 0:
+        kept, g, r, st = small, 0, 0, 0
+    else:
+        kept = small >> shift
+        g = (small >> (shift - 1)) & 1
+        r = (small >> (shift - 2)) & 1 if shift >= 2 else 0
+        st = 1 if shift > 2 and small & ((1 << (shift - 2)) - 1) else 0
+
+    sign = sBig
+    if sBig == sSmall:
+        m = big + kept
+        if m >> L:
+            guard, roundb, sticky = m & 1, 0, 1 if (g or r or st) else 0
+            m >>= 1
+            E += 1
+        else:
+            guard, roundb, sticky = g, r, st
+    else:
+        d = (big << 3) - ((kept << 3) | (g << 2) | (r << 1) | st)
+        if d == 0:
+            return (1 if rm == 'RDN' else 0) << (we + wf), _flags()
+        sh = L + 3 - d.bit_length()
+        d <<= sh
+        E -= sh
+        m = d >> 3
+        guard, roundb, sticky = (d >> 2) & 1, (d >> 1) & 1, d & 1
+
+    extra = L - (wf + 1)
+    if extra > 0:
+        low = m & ((1 << extra) - 1)
+        sticky = 1 if (low & ((1 << (extra - 2)) - 1) or guard or roundb or sticky) else 0
+        guard, roundb = (low >> (extra - 1)) & 1, (low >> (extra - 2)) & 1
+        m >>= extra
+        L = wf + 1
+
+    return _round_pack(sign, E, m, guard, roundb, sticky, we, wf, rm)
+
+
+def _fmul(x, y, we, wf, bias, rm):
+    emax = (1 << we) - 1
+    fmask = (1 << wf) - 1
+    qnan = (emax << wf) | (1 << (wf - 1))
+    sA, eA, fA = x >> (we + wf), (x >> wf) & emax, x & fmask
+    sB, eB, fB = y >> (we + wf), (y >> wf) & emax, y & fmask
+    s = sA ^ sB
+    if (eA == emax and fA) or (eB == emax and fB):
+        return qnan, _flags(invalid=1)
+    a_inf, b_inf = eA == emax, eB == emax
+    a_zero, b_zero = eA == 0 and fA == 0, eB == 0 and fB == 0
+    if (a_inf and b_zero) or (b_inf and a_zero):
+        return qnan, _flags(invalid=1)
+    if a_inf or b_inf:
+        return (s << (we + wf)) | (emax << wf), _flags()
+    if a_zero or b_zero:
+        return s << (we + wf), _flags()
+
+    EA, mA = _unpack(eA, fA, wf)
+    EB, mB = _unpack(eB, fB, wf)
+    prod = mA * mB                                 # 2*wf+2 bits
+    E = EA + EB - bias + 1
+    if not prod >> (2 * wf + 1):
+        prod <<= 1
+        E -= 1
+    guard = (prod >> wf) & 1
+    rnd = (prod >> (wf - 1)) & 1
+    sticky = 1 if prod & ((1 << (wf - 1)) - 1) else 0
+    return _round_pack(s, E, prod >> (wf + 1), guard, rnd, sticky, we, wf, rm)
+
+
+def _fma(x, y, z, we, wf, bias, rm, neg_prod, neg_c):
+    emax = (1 << we) - 1
+    fmask = (1 << wf) - 1
+    qnan = (emax << wf) | (1 << (wf - 1))
+    sA, eA, fA = x >> (we + wf), (x >> wf) & emax, x & fmask
+    sB, eB, fB = y >> (we + wf), (y >> wf) & emax, y & fmask
+    sC, eC, fC = z >> (we + wf), (z >> wf) & emax, z & fmask
+    sP = sA ^ sB ^ neg_prod
+    sC ^= neg_c
+    if (eA == emax and fA) or (eB == emax and fB) or (eC == emax and fC):
+        return qnan, _flags(invalid=1)
+    a_inf, b_inf, c_inf = eA == emax, eB == emax, eC == emax
+    a_zero, b_zero = eA == 0 and fA == 0, eB == 0 and fB == 0
+    c_zero = eC == 0 and fC == 0
+    if (a_inf and b_zero) or (b_inf and a_zero):
+        return qnan, _flags(invalid=1)
+    p_inf = a_inf or b_inf
+    if p_inf or c_inf:
+        if p_inf and c_inf and sP != sC:
+            return qnan, _flags(invalid=1)
+        return ((sP if p_inf else sC) << (we + wf)) | (emax << wf), _flags()
+    if a_zero or b_zero:
+        if c_zero:
+            from .fpu import _zero_sum_sign
+            return _zero_sum_sign(sP, sC, rm) << (we + wf), _flags()
+        return (sC << (we + wf)) | (eC << wf) | fC, _flags()
+
+    L = 2 * (wf + 1)
+    EA, mA = _unpack(eA, fA, wf)
+    EB, mB = _unpack(eB, fB, wf)
+    prod = mA * mB
+    E = EA + EB - bias + 1
+    if not prod >> (L - 1):
+        prod <<= 1
+        E -= 1
+    if c_zero:
+        return _add_mag(sP, E, prod, sP, E, 0, L, we, wf, rm)
+    EC, mC = _unpack(eC, fC, wf)
+    return _add_mag(sP, E, prod, sC, EC, mC << (wf + 1), L, we, wf, rm)
+
+
+def _dflags(invalid=0, div_by_zero=0, overflow=0, underflow=0, inexact=0):
+    return {'invalid': invalid, 'div_by_zero': div_by_zero, 'overflow': overflow,
+            'underflow': underflow, 'inexact': inexact}
+
+
+def _finish_qr(s, E, m, guard, rnd, sticky, we, wf, rm):
+    r, flg = _round_pack(s, E, m, guard, rnd, sticky, we, wf, rm)
+    return r, _dflags(**flg)
+
+
+def _fdiv(x, y, we, wf, bias, rm):
+    emax = (1 << we) - 1
+    fmask = (1 << wf) - 1
+    qnan = (emax << wf) | (1 << (wf - 1))
+    sA, eA, fA = x >> (we + wf), (x >> wf) & emax, x & fmask
+    sB, eB, fB = y >> (we + wf), (y >> wf) & emax, y & fmask
+    s = sA ^ sB
+    if (eA == emax and fA) or (eB == emax and fB):
+        return qnan, _dflags(invalid=1)
+    a_inf, b_inf = eA == emax, eB == emax
+    a_zero, b_zero = eA == 0 and fA == 0, eB == 0 and fB == 0
+    if (a_inf and b_inf) or (a_zero and b_zero):
+        return qnan, _dflags(invalid=1)
+    if a_inf:
+        return (s << (we + wf)) | (emax << wf), _dflags()
+    if b_zero:
+        return (s << (we + wf)) | (emax << wf), _dflags(div_by_zero=1)
+    if a_zero or b_inf:
+        return s << (we + wf), _dflags()
+
+    EA, mA = _unpack(eA, fA, wf)
+    EB, mB = _unpack(eB, fB, wf)
+    E = EA - EB + bias
+    pre = wf + 2
+    if mA < mB:
+        pre += 1
+        E -= 1
+    q, r = divmod(mA << pre, mB)
+    return _finish_qr(s, E, q >> 2, (q >> 1) & 1, q & 1, 1 if r else 0, we, wf, rm)
+
+
+def _fsqrt(x, we, wf, bias, rm):
+    emax = (1 << we) - 1
+    fmask = (1 << wf) - 1
+    qnan = (emax << wf) | (1 << (wf - 1))
+    s, eA, fA = x >> (we + wf), (x >> wf) & emax, x & fmask
+    if eA == emax and fA:
+        return qnan, _dflags(invalid=1)
+    if eA == 0 and fA == 0:
+        return x, _dflags()
+    if s:
+        return qnan, _dflags(invalid=1)
+    if eA == emax:
+        return x, _dflags()
+
+    E, m = _unpack(eA, fA, wf)
+    e = E - bias
+    if e % 2:
+        m <<= 1
+        e -= 1
+    M = m << (wf + 4)
+    R = math.isqrt(M)
+    return _finish_qr(0, e // 2 + bias, R >> 2, (R >> 1) & 1, R & 1,
+                      1 if M != R * R else 0, we, wf, rm)
+
+
+def _fp_op(core, n):
+    def op(a_bits, b_bits, round_mode='RNE'):
+        r, flg = core(_val(a_bits), _val(b_bits), round_mode)
+        return _out(a_bits, r, n), flg
+    return op
+
+
+fadd_f32 = _fp_op(lambda x, y, rm: _fadd(x, y, 8, 23, rm, False), 32)
+fsub_f32 = _fp_op(lambda x, y, rm: _fadd(x, y, 8, 23, rm, True), 32)
+fmul_f32 = _fp_op(lambda x, y, rm: _fmul(x, y, 8, 23, 127, rm), 32)
+fadd_f64 = _fp_op(lambda x, y, rm: _fadd(x, y, 11, 52, rm, False), 64)
+fsub_f64 = _fp_op(lambda x, y, rm: _fadd(x, y, 11, 52, rm, True), 64)
+fmul_f64 = _fp_op(lambda x, y, rm: _fmul(x, y, 11, 52, 1023, rm), 64)
+
+
+def _fma_op(core, n):
+    def op(a_bits, b_bits, c_bits, round_mode='RNE'):
+        r, flg = core(_val(a_bits), _val(b_bits), _val(c_bits), round_mode)
+        return _out(a_bits, r, n), flg
+    return op
+
+
+fmadd_f32 = _fma_op(lambda x, y, z, rm: _fma(x, y, z, 8, 23, 127, rm, 0, 0), 32)
+fmsub_f32 = _fma_op(lambda x, y, z, rm: _fma(x, y, z, 8, 23, 127, rm, 0, 1), 32)
+fnmsub_f32 = _fma_op(lambda x, y, z, rm: _fma(x, y, z, 8, 23, 127, rm, 1, 0), 32)
+fnmadd_f32 = _fma_op(lambda x, y, z, rm: _fma(x, y, z, 8, 23, 127, rm, 1, 1), 32)
+fmadd_f64 = _fma_op(lambda x, y, z, rm: _fma(x, y, z, 11, 52, 1023, rm, 0, 0), 64)
+fmsub_f64 = _fma_op(lambda x, y, z, rm: _fma(x, y, z, 11, 52, 1023, rm, 0, 1), 64)
+fnmsub_f64 = _fma_op(lambda x, y, z, rm: _fma(x, y, z, 11, 52, 1023, rm, 1, 0), 64)
+fnmadd_f64 = _fma_op(lambda x, y, z, rm: _fma(x, y, z, 11, 52, 1023, rm, 1, 1), 64)
+
+
+def _fdiv_op(we, wf, bias, n):
+    def op(a_bits, b_bits, round_mode='RNE', engine='srt4', stats=None):
+        r, flg = _fdiv(_val(a_bits), _val(b_bits), we, wf, bias, round_mode)
+        return _out(a_bits, r, n), flg
+    return op
+
+
+def _fsqrt_op(we, wf, bias, n):
+    def op(a_bits, round_mode='RNE', stats=None):
+        r, flg = _fsqrt(_val(a_bits), we, wf, bias, round_mode)
+        return _out(a_bits, r, n), flg
+    return op
+
+
+fdiv_f32 = _fdiv_op(8, 23, 127, 32)
+fdiv_f64 = _fdiv_op(11, 52, 1023, 64)
+fsqrt_f32 = _fsqrt_op(8, 23, 127, 32)
+fsqrt_f64 = _fsqrt_op(11, 52, 1023, 64)
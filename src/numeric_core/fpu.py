@@ -1,12 +1,18 @@
 # src/numeric_core/fpu.py
-from .adder import ripple_add
+from .adder import add
+from .memo import memoized, clear_cache
+from .backend import dispatch
+from .bitvector import BitVector, like, zeros_like, shl_in, shr_in
+from .mdu import DIV_ENGINES
 
 def _is_zero(x):
+    if isinstance(x, BitVector): return x.value == 0
     for b in x:
         if b == 1: return False
     return True
 
 def _or(x):
+    if isinstance(x, BitVector): return 1 if x.value else 0
     for b in x:
         if b == 1: return 1
     return 0
@@ -18,18 +24,19 @@ def _match_len(a, b):
 
 def _addu(a, b):
     a, b = _match_len(a, b)
-    s, _ = ripple_add(a, b, 0)
+    s, _ = add(a, b, 0)
     return s
 
 def _subu(a, b):
     a, b = _match_len(a, b)
     inv = [1 - x for x in b]
     one = [0]*(len(b)-1)+[1]
-    t, _ = ripple_add(inv, one, 0)
-    s, c = ripple_add(a, t, 0)
+    t, _ = add(inv, one, 0)
+    s, c = add(a, t, 0)
     return s, c  # c==1 => no borrow
 
 def _bits_to_int(b):
+    if isinstance(b, BitVector): return b.value
     v = 0
     for x in b: v = (v << 1) | x
     return v
@@ -44,6 +51,8 @@ def _int_to_bits(x, n):
 def _round(sig, rm, sign, guard, rnd, sticky):
     if rm == 'RNE':
         inc = 1 if (guard==1 and (rnd==1 or sticky==1 or sig[-1]==1)) else 0
+    elif rm == 'RMM':
+        inc = guard
     elif rm == 'RTZ':
         inc = 0
     elif rm == 'RUP':
@@ -54,7 +63,7 @@ def _round(sig, rm, sign, guard, rnd, sticky):
         inc = 0
     if inc:
         one = [0]*(len(sig)-1)+[1]
-        sig, _ = ripple_add(sig, one, 0)
+        sig, _ = add(sig, one, 0)
     return sig, inc
 
 def _normalize_left(sig):
@@ -84,7 +93,7 @@ def _align(m_small, shift):
         return [0]*L, 0, 0, 1 if _or(m_small) else 0
     kept = m_small[:max(0, L - shift)]
     body = [0]*shift + kept
-    tail = m_small[L - shift:] if shift <= L else m_small[:]
+    tail = m_small[L - shift:] if shift <= L else [0]*(shift - L) + m_small[:]
     guard = tail[0] if len(tail) >= 1 else 0
     rnd   = tail[1] if len(tail) >= 2 else 0
     sticky = 1 if (len(tail) > 2 and _or(tail[2:])) else 0
@@ -93,9 +102,78 @@ def _align(m_small, shift):
         else: body = body[-L:]
     return body, guard, rnd, sticky
 
+_tininess = {'mode': 'after'}
+
+def set_tininess(mode):
+    """Detect tininess 'after' rounding (the RISC-V choice, default) or
+    'before' rounding. Only the underflow flag depends on it."""
+    if mode not in ('after', 'before'):
+        raise ValueError('Unknown tininess mode: ' + str(mode))
+    _tininess['mode'] = mode
+    clear_cache()
+
+def get_tininess():
+    return _tininess['mode']
+
+def _unpack(e, f, e0):
+    """(E, m): mantissa with an explicit leading 1 and the biased exponent
+    of that 1. A subnormal (e == 0) is normalized, so its E is <= 0."""
+    if not e0:
+        return _bits_to_int(e), [1]+f
+    lz = 0
+    while f[lz] == 0:
+        lz += 1
+    return -lz, f[lz:] + [0]*(lz+1)
+
+def _zero_sum_sign(s1, s2, rm):
+    """Sign of an exact zero sum of two zeros: theirs when they agree,
+    otherwise -0 only when rounding toward negative."""
+    if s1 == s2:
+        return s1
+    return 1 if rm == 'RDN' else 0
+
+def _overflow_to_max(rm, sign):
+    """Whether an overflow rounds to the largest finite value rather than
+    infinity: rounding toward zero, or toward the infinity opposite the result's
+    sign."""
+    return rm == 'RTZ' or (rm == 'RDN' and sign == 0) or (rm == 'RUP' and sign == 1)
+
+def _round_pack(s, E, m, guard, rnd, sticky, we, wf, rm):
+    """Round the wf+1 bit mantissa m (MSB = 1, MSB weight 2^(E-bias)) and
+    pack it. E <= 0 is below the normal range: m is shifted right into the
+    subnormal encoding first, so the result rounds at the subnormal LSB."""
+    L = wf + 1
+    if E >= 1:
+        m_r, inc = _round(m, rm, s, guard, rnd, sticky)
+        if inc and m_r[0]==0:
+            # rounding carried out of the top bit: 1.11..1 + ulp == 10.00..0
+            m_r = [1] + [0]*(L-1)
+            E += 1
+        if E >= (2**we - 1):
+            flags = {'invalid':0,'overflow':1,'underflow':0,'inexact':1}
+            if _overflow_to_max(rm, s):
+                return _pack(s,[1]*(we-1)+[0],[1]*wf), flags
+            return _pack(s,[1]*we,[0]*wf), flags
+        return _pack(s, _int_to_bits(E, we), m_r[1:1+wf]), {'invalid':0,'overflow':0,'underflow':0,'inexact': (1 if (guard|rnd|sticky) else 0)}
+
+    tiny = 1
+    if _tininess['mode'] == 'after' and E == 0:
+        # rounded with an unbounded exponent, 0.11..1 may still reach 2^emin
+        m_r, inc = _round(m, rm, s, guard, rnd, sticky)
+        tiny = 0 if (inc and m_r[0]==0) else 1
+    body, g_out, r_out, s_out = _align(list(m) + [guard, rnd], 1 - E)
+    g2, r2 = body[L], body[L+1]
+    s2 = 1 if (sticky or g_out or r_out or s_out) else 0
+    m_r, _ = _round(body[:L], rm, s, g2, r2, s2)
+    inexact = 1 if (g2|r2|s2) else 0
+    # m_r[0] is set only if rounding reached 2^emin: exponent field 1, normal
+    return _pack(s, [0]*(we-1) + [m_r[0]], m_r[1:]), {'invalid':0,'overflow':0,'underflow': tiny & inexact,'inexact': inexact}
+
 def _fadd_core(a_bits, b_bits, we, wf, bias, rm, is_sub):
     sA=a_bits[0]; eA=a_bits[1:1+we]; fA=a_bits[1+we:1+we+wf]
     sB=b_bits[0]; eB=b_bits[1:1+we]; fB=b_bits[1+we:1+we+wf]
+    if is_sub:
+        sB = 1 - sB    # a - b == a + (-b); everything below is an addition
 
     eA0,eA1 = _special(eA)
     eB0,eB1 = _special(eB)
@@ -108,7 +186,7 @@ def _fadd_core(a_bits, b_bits, we, wf, bias, rm, is_sub):
     a_inf = eA1 and _is_zero(fA)
     b_inf = eB1 and _is_zero(fB)
     if a_inf or b_inf:
-        if (a_inf and b_inf and ((not is_sub and sA!=sB) or (is_sub and sA==sB))):
+        if a_inf and b_inf and sA != sB:
             return _pack(0,[1]*we,[1]+[0]*(wf-1)), {'invalid':1,'overflow':0,'underflow':0,'inexact':0}
         s = sA if a_inf else sB
         return _pack(s,[1]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
@@ -116,30 +194,38 @@ def _fadd_core(a_bits, b_bits, we, wf, bias, rm, is_sub):
     a_zero = eA0 and _is_zero(fA)
     b_zero = eB0 and _is_zero(fB)
     if a_zero and b_zero:
-        return _pack(sA & sB,[0]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
+        return _pack(_zero_sum_sign(sA, sB, rm),[0]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
     if a_zero:
-        return _pack(sB ^ (1 if is_sub else 0), eB, fB), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
+        return _pack(sB, eB, fB), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
     if b_zero:
         return _pack(sA, eA, fA), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
 
-    mA=[1]+fA; mB=[1]+fB
-    EA=_bits_to_int(eA); EB=_bits_to_int(eB)
-    if EA>=EB:
+    if not (eA0 or eB0):
+        # fast path: both operands normal
+        return _add_core(sA, _bits_to_int(eA), [1]+fA, sB, _bits_to_int(eB), [1]+fB, we, wf, rm)
+    EA, mA = _unpack(eA, fA, eA0)
+    EB, mB = _unpack(eB, fB, eB0)
+    return _add_core(sA, EA, mA, sB, EB, mB, we, wf, rm)
+
+def _add_core(sA, EA, mA, sB, EB, mB, we, wf, rm):
+    """Add two signed magnitudes, each m (MSB = 1) with MSB weight 2^(E-bias),
+    and round once to wf fraction bits. fadd passes wf+1 bit mantissas; FMA
+    passes the exact 2*(wf+1) bit product and a zero-extended addend."""
+    if EA > EB or (EA == EB and _bits_to_int(mA) >= _bits_to_int(mB)):
         mBig,mSmall,E = mA,mB,EA
-        sBig = sA; sSmall = sB ^ (1 if is_sub else 0)
+        sBig,sSmall = sA,sB
         shift = EA-EB
     else:
         mBig,mSmall,E = mB,mA,EB
-        sBig = sB if not is_sub else (1^sA)
-        sSmall = sA
+        sBig,sSmall = sB,sA
         shift = EB-EA
 
     mSmall, g_align, r_align, s_align = _align(mSmall, shift)
     mBig,  mSmall = _match_len(mBig, mSmall)
     same = (sBig == sSmall)
+    L = len(mBig)
 
     if same:
-        L = len(mBig)
         m_sum = _addu([0] + mBig, [0] + mSmall)  # L+1 bits
         res_sign = sBig
         if m_sum[0] == 1:
@@ -155,27 +241,37 @@ def _fadd_core(a_bits, b_bits, we, wf, bias, rm, is_sub):
             roundb = r_align
             sticky = s_align
     else:
-        m, _ = _subu(mBig, mSmall)
+        # subtract with guard/round/sticky attached so their borrow is kept
+        d, _ = _subu(mBig + [0, 0, 0], mSmall + [g_align, r_align, s_align])
+        if _is_zero(d):
+            return _pack(1 if rm == 'RDN' else 0,[0]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
         res_sign = sBig
-        m, sh = _normalize_left(m)
+        d, sh = _normalize_left(d)
         E -= sh
-        guard = g_align
-        roundb = r_align
-        sticky = s_align
-
-    m_r, inc = _round(m, rm, res_sign, guard, roundb, sticky)
-    if inc and m_r[0]==0 and m[0]==1:
-        m_r,_ = _normalize_right([1]+m_r)
-        E += 1
-
-    if E >= (2**we - 1):
-        return _pack(res_sign,[1]*we,[0]*wf), {'invalid':0,'overflow':1,'underflow':0,'inexact':1}
-    if E <= 0:
-        return _pack(res_sign,[0]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':1,'inexact':1}
-
-    exp = _int_to_bits(E, we)
-    frac = m_r[1:1+wf]
-    return _pack(res_sign, exp, frac), {'invalid':0,'overflow':0,'underflow':0,'inexact': (1 if (guard|roundb|sticky) else 0)}
+        m = d[:L]
+        guard, roundb, sticky = d[L], d[L+1], d[L+2]
+
+    if L > wf + 1:
+        # wide (FMA) mantissa: the bits below the result's LSB become g/r/s
+        sticky = 1 if (_or(m[wf+3:]) or guard or roundb or sticky) else 0
+        guard, roundb = m[wf+1], m[wf+2]
+        m = m[:wf+1]
+        L = wf + 1
+
+    return _round_pack(res_sign, E, m, guard, roundb, sticky, we, wf, rm)
+
+def _mant_product(mA, mB):
+    """Exact 2L-bit product of two L-bit mantissas (shift-and-add)."""
+    n = len(mA)
+    prod=zeros_like(mA, 2*n)
+    mcand=zeros_like(mA, n)+mA
+    mult=mB[:]
+    for _ in range(n):
+        if mult[-1]==1:
+            prod,_=add(prod, mcand, 0)
+        mcand = shl_in(mcand, 0)
+        mult = shr_in(mult, 0)
+    return prod
 
 def _fmul_core(a_bits, b_bits, we, wf, bias, rm):
     s = a_bits[0]^b_bits[0]
@@ -199,60 +295,266 @@ def _fmul_core(a_bits, b_bits, we, wf, bias, rm):
     if a_zero or b_zero:
         return _pack(s,[0]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
 
-    mA=[1]+fA; mB=[1]+fB
-    prod=[0]*(2*(wf+1))
-    mcand=[0]*(wf+1)+mA
-    mult=mB[:]
-    for _ in range(wf+1):
-        if mult[-1]==1:
-            prod,_=ripple_add(prod, mcand, 0)
-        mcand = mcand[1:]+[0]
-        mult = [0]+mult[:-1]
-
-    if prod[0]==1:
-        m = prod
-        E = _bits_to_int(eA)+_bits_to_int(eB)-bias+1
+    if eA0 or eB0:
+        EA, mA = _unpack(eA, fA, eA0)
+        EB, mB = _unpack(eB, fB, eB0)
     else:
-        sh=0
-        while prod[0]==0 and sh<(wf+2):
-            prod = prod[1:]+[0]; sh+=1
-        m=prod
-        E = _bits_to_int(eA)+_bits_to_int(eB)-bias+1-sh
-
-    frac = m[1:1+wf]
-    extra = m[1+wf:1+wf+3]
-    guard = extra[0] if len(extra)>0 else 0
-    rnd   = extra[1] if len(extra)>1 else 0
-    sticky= 1 if (len(extra)>2 and any(extra[2:])) else 0
-
-    frac_r, inc = _round(frac, rm, s, guard, rnd, sticky)
-    if inc and frac_r[0]==0 and frac[0]==1:
-        E += 1
-
-    if E >= (2**we - 1):
-        return _pack(s,[1]*we,[0]*wf), {'invalid':0,'overflow':1,'underflow':0,'inexact':1}
-    if E <= 0:
-        return _pack(s,[0]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':1,'inexact':1}
-
-    exp = _int_to_bits(E, we)
-    return _pack(s, exp, frac_r), {'invalid':0,'overflow':0,'underflow':0,'inexact': (1 if (guard|rnd|sticky) else 0)}
+        EA, mA, EB, mB = _bits_to_int(eA), [1]+fA, _bits_to_int(eB), [1]+fB
+    prod = _mant_product(mA, mB)
+    E = EA+EB-bias+1
+    if prod[0]==0:
+        prod = shl_in(prod, 0); E -= 1
+
+    guard = prod[1+wf]
+    rnd   = prod[2+wf]
+    sticky= _or(prod[3+wf:])
+    return _round_pack(s, E, prod[:1+wf], guard, rnd, sticky, we, wf, rm)
+
+def _fma_core(a_bits, b_bits, c_bits, we, wf, bias, rm, neg_prod, neg_c):
+    """(+/-)(a*b) (+/-) c with one rounding: the exact product from
+    _mant_product goes straight into _add_core."""
+    sP = a_bits[0] ^ b_bits[0] ^ neg_prod
+    sC = c_bits[0] ^ neg_c
+    eA=a_bits[1:1+we]; fA=a_bits[1+we:1+we+wf]
+    eB=b_bits[1:1+we]; fB=b_bits[1+we:1+we+wf]
+    eC=c_bits[1:1+we]; fC=c_bits[1+we:1+we+wf]
 
+    eA0,eA1 = _special(eA)
+    eB0,eB1 = _special(eB)
+    eC0,eC1 = _special(eC)
+    if (eA1 and not _is_zero(fA)) or (eB1 and not _is_zero(fB)) or (eC1 and not _is_zero(fC)):
+        return _pack(0,[1]*we,[1]+[0]*(wf-1)), {'invalid':1,'overflow':0,'underflow':0,'inexact':0}
+    a_inf = eA1 and _is_zero(fA)
+    b_inf = eB1 and _is_zero(fB)
+    c_inf = eC1 and _is_zero(fC)
+    a_zero = eA0 and _is_zero(fA)
+    b_zero = eB0 and _is_zero(fB)
+    c_zero = eC0 and _is_zero(fC)
+    if (a_inf and b_zero) or (b_inf and a_zero):
+        return _pack(0,[1]*we,[1]+[0]*(wf-1)), {'invalid':1,'overflow':0,'underflow':0,'inexact':0}
+    p_inf = a_inf or b_inf
+    if p_inf or c_inf:
+        if p_inf and c_inf and sP != sC:
+            return _pack(0,[1]*we,[1]+[0]*(wf-1)), {'invalid':1,'overflow':0,'underflow':0,'inexact':0}
+        return _pack(sP if p_inf else sC,[1]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
+    if a_zero or b_zero:
+        if c_zero:
+            return _pack(_zero_sum_sign(sP, sC, rm),[0]*we,[0]*wf), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
+        return _pack(sC, eC, fC), {'invalid':0,'overflow':0,'underflow':0,'inexact':0}
+
+    EA, mA = _unpack(eA, fA, eA0)
+    EB, mB = _unpack(eB, fB, eB0)
+    prod = _mant_product(mA, mB)
+    E = EA+EB-bias+1
+    if prod[0]==0:
+        prod = shl_in(prod, 0); E -= 1
+    if c_zero:
+        # nothing to add, but the product still needs its single rounding
+        return _add_core(sP, E, prod, sP, E, zeros_like(prod, len(prod)), we, wf, rm)
+    EC, mC = _unpack(eC, fC, eC0)
+    return _add_core(sP, E, prod, sC, EC, mC+[0]*(wf+1), we, wf, rm)
+
+def _dflags(invalid=0, div_by_zero=0, overflow=0, underflow=0, inexact=0):
+    return {'invalid':invalid,'div_by_zero':div_by_zero,'overflow':overflow,'underflow':underflow,'inexact':inexact}
+
+def _finish_qr(s, E, m, guard, rnd, sticky, we, wf, rm):
+    """Round an L-bit quotient/root (MSB = 1) and repack; shared by div/sqrt."""
+    r, flg = _round_pack(s, E, m, guard, rnd, sticky, we, wf, rm)
+    return r, _dflags(**flg)
+
+def _fdiv_core(a_bits, b_bits, we, wf, bias, rm, engine, stats):
+    """Mantissa quotient from one of the mdu digit-recurrence dividers
+    (radix-4 SRT by default): wf+3 quotient bits give the result, guard and
+    round; a non-zero remainder is the sticky bit."""
+    s = a_bits[0]^b_bits[0]
+    eA=a_bits[1:1+we]; fA=a_bits[1+we:1+we+wf]
+    eB=b_bits[1:1+we]; fB=b_bits[1+we:1+we+wf]
+    eA0,eA1 = _special(eA)
+    eB0,eB1 = _special(eB)
+    if (eA1 and not _is_zero(fA)) or (eB1 and not _is_zero(fB)):
+        return _pack(0,[1]*we,[1]+[0]*(wf-1)), _dflags(invalid=1)
+    a_inf = eA1 and _is_zero(fA)
+    b_inf = eB1 and _is_zero(fB)
+    a_zero = eA0 and _is_zero(fA)
+    b_zero = eB0 and _is_zero(fB)
+    if (a_inf and b_inf) or (a_zero and b_zero):
+        return _pack(0,[1]*we,[1]+[0]*(wf-1)), _dflags(invalid=1)
+    if a_inf:
+        return _pack(s,[1]*we,[0]*wf), _dflags()
+    if b_zero:
+        return _pack(s,[1]*we,[0]*wf), _dflags(div_by_zero=1)
+    if a_zero or b_inf:
+        return _pack(s,[0]*we,[0]*wf), _dflags()
+
+    EA, mA = _unpack(eA, fA, eA0)
+    EB, mB = _unpack(eB, fB, eB0)
+    E = EA-EB+bias
+    pre = wf+2                      # quotient in [1,2) scaled to wf+3 bits
+    if _bits_to_int(mA) < _bits_to_int(mB):
+        pre += 1
+        E -= 1
+    N = 2*(wf+1)+2
+    num = [0]*(N-(wf+1)-pre) + list(mA) + [0]*pre
+    den = [0]*(N-(wf+1)) + list(mB)
+    q, r, steps = DIV_ENGINES[engine](num, den, stats is not None)
+    if stats is not None:
+        stats['ops'] = stats.get('ops', 0) + 1
+        stats['steps'] = stats.get('steps', 0) + len(steps)
+    q = q[N-(wf+3):]
+    return _finish_qr(s, E, q[:wf+1], q[wf+1], q[wf+2], _or(r), we, wf, rm)
+
+def _isqrt_bits(x, stats):
+    """Digit-by-digit square root of an even-width bit list: each step
+    brings down two radicand bits and settles one root bit with a trial
+    subtraction. Returns (root, remainder_nonzero)."""
+    W = len(x)
+    n = W//2 + 3
+    rem = [0]*n
+    root = [0]*n
+    for i in range(0, W, 2):
+        rem = rem[2:] + [x[i], x[i+1]]
+        trial = root[2:] + [0, 1]        # 4*root + 1
+        d, c = add(rem, [1-b for b in trial], 1)
+        if c == 1:                       # rem >= trial
+            rem = d
+            root = root[1:] + [1]
+        else:
+            root = root[1:] + [0]
+    if stats is not None:
+        stats['ops'] = stats.get('ops', 0) + 1
+        stats['steps'] = stats.get('steps', 0) + W//2
+    return root[-(W//2):], _or(rem)
+
+def _fsqrt_core(a_bits, we, wf, bias, rm, stats):
+    s=a_bits[0]; eA=a_bits[1:1+we]; fA=a_bits[1+we:1+we+wf]
+    eA0,eA1 = _special(eA)
+    a_zero = eA0 and _is_zero(fA)
+    if eA1 and not _is_zero(fA):
+        return _pack(0,[1]*we,[1]+[0]*(wf-1)), _dflags(invalid=1)
+    if a_zero:
+        return _pack(s,[0]*we,[0]*wf), _dflags()
+    if s == 1:
+        return _pack(0,[1]*we,[1]+[0]*(wf-1)), _dflags(invalid=1)
+    if eA1:
+        return _pack(0,[1]*we,[0]*wf), _dflags()
+
+    E, m = _unpack(eA, fA, eA0)
+    e = E - bias
+    m = list(m)
+    if e % 2:
+        m = m + [0]                     # odd exponent: radicand in [2,4)
+        e -= 1
+    else:
+        m = [0] + m
+    # root of m * 2^(wf+4) has wf+3 bits: result, guard and round
+    root, sticky = _isqrt_bits(m + [0]*(wf+4), stats)
+    root = root[-(wf+3):]
+    return _finish_qr(0, e//2 + bias, root[:wf+1], root[wf+1], root[wf+2], sticky, we, wf, rm)
+
+@memoized
+@dispatch
 def fadd_f32(a_bits, b_bits, round_mode='RNE'):
-    return _fadd_core(a_bits, b_bits, 8, 23, 127, round_mode, False)
+    r, flg = _fadd_core(a_bits, b_bits, 8, 23, 127, round_mode, False)
+    return like(a_bits, r), flg
 
+@memoized
+@dispatch
 def fsub_f32(a_bits, b_bits, round_mode='RNE'):
-    b2 = b_bits[:]; b2[0]=1-b2[0]
-    return _fadd_core(a_bits, b2, 8, 23, 127, round_mode, True)
+    r, flg = _fadd_core(a_bits, b_bits, 8, 23, 127, round_mode, True)
+    return like(a_bits, r), flg
 
+@memoized
+@dispatch
 def fmul_f32(a_bits, b_bits, round_mode='RNE'):
-    return _fmul_core(a_bits, b_bits, 8, 23, 127, round_mode)
+    r, flg = _fmul_core(a_bits, b_bits, 8, 23, 127, round_mode)
+    return like(a_bits, r), flg
 
+@memoized
+@dispatch
 def fadd_f64(a_bits, b_bits, round_mode='RNE'):
-    return _fadd_core(a_bits, b_bits, 11, 52, 1023, round_mode, False)
+    r, flg = _fadd_core(a_bits, b_bits, 11, 52, 1023, round_mode, False)
+    return like(a_bits, r), flg
 
+@memoized
+@dispatch
 def fsub_f64(a_bits, b_bits, round_mode='RNE'):
-    b2 = b_bits[:]; b2[0]=1-b2[0]
-    return _fadd_core(a_bits, b2, 11, 52, 1023, round_mode, True)
+    r, flg = _fadd_core(a_bits, b_bits, 11, 52, 1023, round_mode, True)
+    return like(a_bits, r), flg
 
+@memoized
+@dispatch
 def fmul_f64(a_bits, b_bits, round_mode='RNE'):
-    return _fmul_core(a_bits, b_bits, 11, 52, 1023, round_mode)
\ No newline at end of file
+    r, flg = _fmul_core(a_bits, b_bits, 11, 52, 1023, round_mode)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fmadd_f32(a_bits, b_bits, c_bits, round_mode='RNE'):
+    r, flg = _fma_core(a_bits, b_bits, c_bits, 8, 23, 127, round_mode, 0, 0)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fmsub_f32(a_bits, b_bits, c_bits, round_mode='RNE'):
+    r, flg = _fma_core(a_bits, b_bits, c_bits, 8, 23, 127, round_mode, 0, 1)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fnmsub_f32(a_bits, b_bits, c_bits, round_mode='RNE'):
+    r, flg = _fma_core(a_bits, b_bits, c_bits, 8, 23, 127, round_mode, 1, 0)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fnmadd_f32(a_bits, b_bits, c_bits, round_mode='RNE'):
+    r, flg = _fma_core(a_bits, b_bits, c_bits, 8, 23, 127, round_mode, 1, 1)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fmadd_f64(a_bits, b_bits, c_bits, round_mode='RNE'):
+    r, flg = _fma_core(a_bits, b_bits, c_bits, 11, 52, 1023, round_mode, 0, 0)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fmsub_f64(a_bits, b_bits, c_bits, round_mode='RNE'):
+    r, flg = _fma_core(a_bits, b_bits, c_bits, 11, 52, 1023, round_mode, 0, 1)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fnmsub_f64(a_bits, b_bits, c_bits, round_mode='RNE'):
+    r, flg = _fma_core(a_bits, b_bits, c_bits, 11, 52, 1023, round_mode, 1, 0)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fnmadd_f64(a_bits, b_bits, c_bits, round_mode='RNE'):
+    r, flg = _fma_core(a_bits, b_bits, c_bits, 11, 52, 1023, round_mode, 1, 1)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fdiv_f32(a_bits, b_bits, round_mode='RNE', engine='srt4', stats=None):
+    r, flg = _fdiv_core(a_bits, b_bits, 8, 23, 127, round_mode, engine, stats)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fdiv_f64(a_bits, b_bits, round_mode='RNE', engine='srt4', stats=None):
+    r, flg = _fdiv_core(a_bits, b_bits, 11, 52, 1023, round_mode, engine, stats)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fsqrt_f32(a_bits, round_mode='RNE', stats=None):
+    r, flg = _fsqrt_core(a_bits, 8, 23, 127, round_mode, stats)
+    return like(a_bits, r), flg
+
+@memoized
+@dispatch
+def fsqrt_f64(a_bits, round_mode='RNE', stats=None):
+    r, flg = _fsqrt_core(a_bits, 11, 52, 1023, round_mode, stats)
+    return like(a_bits, r), flg
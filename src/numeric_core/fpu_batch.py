@@ -0,0 +1,285 @@
+# src/numeric_core/fpu_batch.py
+# Vectorised IEEE-754 add / sub / mul over NumPy bit-pattern arrays (uint32
+# for float32, uint64 for float64), bit-exact with fpu.fadd_*/fsub_*/fmul_*
+# including subnormals, the five rounding modes and the tininess setting.
+# Every element goes through the same unpack -> align -> add/multiply ->
+# normalize -> round -> pack steps as the scalar core, as whole-array
+# integer ops; special values are patched in with masks at the end.
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pip install numpy
+    np = None
+
+from .fpu import get_tininess
+
+FLAGS = ('invalid', 'overflow', 'underflow', 'inexact')
+_FORMATS = {32: (8, 23, 127), 64: (11, 52, 1023)}
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('numeric_core.fpu_batch needs numpy (pip install numpy)')
+
+
+def _u(x):
+    return np.uint64(x)
+
+
+def _bit_length(x):
+    x = x.copy()
+    n = np.zeros(x.shape, dtype=np.int64)
+    for s in (32, 16, 8, 4, 2, 1):
+        t = x >> _u(s)
+        hit = t != 0
+        n += s * hit
+        x = np.where(hit, t, x)
+    return n + (x != 0)
+
+
+def _fields(x, we, wf):
+    s = x >> _u(we + wf)
+    e = ((x >> _u(wf)) & _u((1 << we) - 1)).astype(np.int64)
+    f = x & _u((1 << wf) - 1)
+    return s, e, f
+
+
+def _unpack(e, f, wf):
+    """(E, m) with m's leading 1 at bit wf; subnormals normalized to E <= 0."""
+    sub = e == 0
+    n = _bit_length(f)
+    sh = np.where(sub, wf + 1 - n, 0).astype(np.uint64)
+    m = np.where(sub, f << sh, f | _u(1 << wf))
+    E = np.where(sub, n - wf, e)
+    return E, m
+
+
+def _round_inc(m, rm, s, g, r, st):
+    if rm == 'RNE':
+        return g & (r | st | (m & _u(1)))
+    if rm == 'RMM':
+        return g
+    if rm == 'RUP':
+        return (g | r | st) & (s ^ _u(1))
+    if rm == 'RDN':
+        return (g | r | st) & s
+    return np.zeros_like(m)
+
+
+def _round_pack(s, E, m, g, r, st, we, wf, rm):
+    """fpu._round_pack over arrays: m has wf+1 bits with the MSB set."""
+    L = wf + 1
+    emax = (1 << we) - 1
+    sign = s << _u(we + wf)
+    # normal range
+    mn = m + _round_inc(m, rm, s, g, r, st)
+    carry = (mn >> _u(L)).astype(bool)
+    mn = np.where(carry, mn >> _u(1), mn)
+    En = E + carry
+    ovf = En >= emax
+    exp_n = np.clip(En, 0, emax).astype(np.uint64) << _u(wf)
+    # overflow: infinity, or the largest finite value (fpu._overflow_to_max)
+    if rm == 'RTZ':
+        to_max = np.ones(s.shape, dtype=bool)
+    elif rm in ('RDN', 'RUP'):
+        to_max = s == _u(1 if rm == 'RUP' else 0)
+    else:
+        to_max = np.zeros(s.shape, dtype=bool)
+    huge = np.where(to_max, _u(((emax - 1) << wf) | ((1 << wf) - 1)), _u(emax << wf))
+    normal = np.where(ovf, sign | huge, sign | exp_n | (mn & _u((1 << wf) - 1)))
+    inexact_n = np.where(ovf, _u(1), g | r | st)
+    # below the normal range: shift into the subnormal encoding, then round
+    shift = np.clip(1 - E, 0, L + 3).astype(np.uint64)
+    ext = (m << _u(2)) | (g << _u(1)) | r
+    body = ext >> shift
+    out = st | ((ext & ((_u(1) << shift) - _u(1))) != 0).astype(np.uint64)
+    m2 = body >> _u(2)
+    g2 = (body >> _u(1)) & _u(1)
+    r2 = body & _u(1)
+    m2 = m2 + _round_inc(m2, rm, s, g2, r2, out)
+    inexact_s = g2 | r2 | out
+    tiny = np.ones(E.shape, dtype=bool)
+    if get_tininess() == 'after':
+        tiny = ~((E == 0) & carry)
+    sub = E < 1
+    bits = np.where(sub, sign | m2, normal)
+    inexact = np.where(sub, inexact_s, inexact_n).astype(np.uint8)
+    flags = {
+        'invalid': np.zeros(E.shape, dtype=np.uint8),
+        'overflow': (~sub & ovf).astype(np.uint8),
+        'underflow': (sub & tiny & (inexact_s != 0)).astype(np.uint8),
+        'inexact': inexact,
+    }
+    return bits, flags
+
+
+def _align(small, shift, L):
+    """small >> shift plus guard / round / sticky (shift >= 0)."""
+    sh = np.clip(shift, 0, L + 3).astype(np.uint64)
+    one = _u(1)
+    kept = small >> sh
+    g = np.where(sh >= 1, (small >> np.maximum(sh, one) - one) & one, _u(0))
+    r = np.where(sh >= 2, (small >> np.maximum(sh, _u(2)) - _u(2)) & one, _u(0))
+    low = (one << np.maximum(sh, _u(2)) - _u(2)) - one
+    st = np.where(sh > 2, ((small & low) != 0).astype(np.uint64), _u(0))
+    return kept, g, r, st
+
+
+def _add_mag(sA, EA, mA, sB, EB, mB, we, wf, rm):
+    L = wf + 1
+    a_big = (EA > EB) | ((EA == EB) & (mA >= mB))
+    big = np.where(a_big, mA, mB)
+    small = np.where(a_big, mB, mA)
+    E = np.where(a_big, EA, EB)
+    s_big = np.where(a_big, sA, sB)
+    same = sA == sB
+    kept, g, r, st = _align(small, np.abs(EA - EB), L)
+
+    # same signs: add, renormalize a carry-out by one place
+    ms = big + kept
+    c = (ms >> _u(L)).astype(bool)
+    ms_g = np.where(c, ms & _u(1), g)
+    ms_r = np.where(c, _u(0), r)
+    ms_st = np.where(c, ((g | r | st) != 0).astype(np.uint64), st)
+    ms = np.where(c, ms >> _u(1), ms)
+    Es = E + c
+
+    # different signs: subtract with guard/round/sticky attached, renormalize
+    d = (big << _u(3)) - ((kept << _u(3)) | (g << _u(2)) | (r << _u(1)) | st)
+    cancel = ~same & (d == 0)
+    sh = np.where(cancel, 0, L + 3 - _bit_length(d))
+    d = d << sh.astype(np.uint64)
+    Ed = E - sh
+
+    m = np.where(same, ms, d >> _u(3))
+    gg = np.where(same, ms_g, (d >> _u(2)) & _u(1))
+    rr = np.where(same, ms_r, (d >> _u(1)) & _u(1))
+    ss = np.where(same, ms_st, d & _u(1))
+    E = np.where(same, Es, Ed)
+    bits, flags = _round_pack(s_big, E, m, gg, rr, ss, we, wf, rm)
+    zero = _u(1 << (we + wf)) if rm == 'RDN' else _u(0)
+    bits = np.where(cancel, zero, bits)
+    for k in FLAGS:
+        flags[k] = np.where(cancel, np.uint8(0), flags[k])
+    return bits, flags
+
+
+def _mul_wide(a, b):
+    """Exact product of two < 2^53 uint64 arrays as (hi, lo) 64-bit halves."""
+    m32 = _u(0xFFFFFFFF)
+    a0, a1 = a & m32, a >> _u(32)
+    b0, b1 = b & m32, b >> _u(32)
+    p00 = a0 * b0
+    mid = a1 * b0 + a0 * b1                  # < 2^54
+    lo = p00 + (mid << _u(32))
+    carry = (lo < p00).astype(np.uint64)
+    hi = a1 * b1 + (mid >> _u(32)) + carry
+    return hi, lo
+
+
+def _special_fields(x, we, wf):
+    s, e, f = _fields(x, we, wf)
+    emax = (1 << we) - 1
+    nan = (e == emax) & (f != 0)
+    inf = (e == emax) & (f == 0)
+    zero = (e == 0) & (f == 0)
+    return s, e, f, nan, inf, zero
+
+
+def _patch(bits, flags, mask, value, invalid=0):
+    bits = np.where(mask, value, bits)
+    for k in FLAGS:
+        flags[k] = np.where(mask, np.uint8(invalid if k == 'invalid' else 0), flags[k])
+    return bits
+
+
+def _fadd(x, y, width, rm, is_sub):
+    we, wf, _ = _FORMATS[width]
+    emax = (1 << we) - 1
+    qnan = _u((emax << wf) | (1 << (wf - 1)))
+    inf_bits = _u(emax << wf)
+    sA, eA, fA, nA, iA, zA = _special_fields(x, we, wf)
+    sB, eB, fB, nB, iB, zB = _special_fields(y, we, wf)
+    if is_sub:
+        sB = sB ^ _u(1)
+    EA, mA = _unpack(eA, fA, wf)
+    EB, mB = _unpack(eB, fB, wf)
+    bits, flags = _add_mag(sA, EA, mA, sB, EB, mB, we, wf, rm)
+
+    top = _u(we + wf)
+    y_eff = (sB << top) | (y & _u((1 << (we + wf)) - 1))
+    bits = _patch(bits, flags, zB, x)
+    bits = _patch(bits, flags, zA, y_eff)
+    # two zeros: their sign when they agree, else -0 only under RDN
+    zero_sign = (sA & sB) | ((sA ^ sB) & _u(1 if rm == 'RDN' else 0))
+    bits = _patch(bits, flags, zA & zB, zero_sign << top)
+    bits = _patch(bits, flags, iA | iB, np.where(iA, sA, sB) << top | inf_bits)
+    bits = _patch(bits, flags, iA & iB & (sA != sB), qnan, invalid=1)
+    bits = _patch(bits, flags, nA | nB, qnan, invalid=1)
+    return bits, flags
+
+
+def _fmul(x, y, width, rm):
+    we, wf, bias = _FORMATS[width]
+    emax = (1 << we) - 1
+    qnan = _u((emax << wf) | (1 << (wf - 1)))
+    sA, eA, fA, nA, iA, zA = _special_fields(x, we, wf)
+    sB, eB, fB, nB, iB, zB = _special_fields(y, we, wf)
+    s = sA ^ sB
+    EA, mA = _unpack(eA, fA, wf)
+    EB, mB = _unpack(eB, fB, wf)
+    hi, lo = _mul_wide(mA, mB)               # product has 2*wf+1 or 2*wf+2 bits
+    plen = np.where(hi != 0, _bit_length(hi) + 64, _bit_length(lo))
+    full = plen == 2 * wf + 2
+    k = np.where(full, wf + 1, wf).astype(np.uint64)   # bits below the result mantissa
+    m = (hi << (_u(64) - k)) | (lo >> k)
+    m = m & _u((1 << (wf + 1)) - 1)
+    g = (lo >> (k - _u(1))) & _u(1)
+    r = (lo >> (k - _u(2))) & _u(1)
+    st = ((lo & ((_u(1) << (k - _u(2))) - _u(1))) != 0).astype(np.uint64)
+    E = EA + EB - bias + full.astype(np.int64)
+    bits, flags = _round_pack(s, E, m, g, r, st, we, wf, rm)
+
+    top = _u(we + wf)
+    bits = _patch(bits, flags, zA | zB, s << top)
+    bits = _patch(bits, flags, iA | iB, (s << top) | _u(emax << wf))
+    bits = _patch(bits, flags, (iA & zB) | (iB & zA), qnan, invalid=1)
+    bits = _patch(bits, flags, nA | nB, qnan, invalid=1)
+    return bits, flags
+
+
+def _run(core, a, b, width, *args):
+    _require_numpy()
+    dtype = np.uint32 if width == 32 else np.uint64
+    a = np.asarray(a, dtype=dtype).astype(np.uint64)
+    b = np.asarray(b, dtype=dtype).astype(np.uint64)
+    bits, flags = core(a, b, width, *args)
+    flags = {k: flags[k].astype(np.uint8) for k in FLAGS}
+    return bits.astype(dtype), flags, {k: int(flags[k].any()) for k in FLAGS}
+
+
+def fadd_f32_batch(a, b, round_mode='RNE'):
+    """Batch fadd_f32 on uint32 bit patterns. Returns (results, per-element
+    flag arrays, OR-reduced flags)."""
+    return _run(_fadd, a, b, 32, round_mode, False)
+
+
+def fsub_f32_batch(a, b, round_mode='RNE'):
+    return _run(_fadd, a, b, 32, round_mode, True)
+
+
+def fmul_f32_batch(a, b, round_mode='RNE'):
+    return _run(_fmul, a, b, 32, round_mode)
+
+
+def fadd_f64_batch(a, b, round_mode='RNE'):
+    """Batch fadd_f64 on uint64 bit patterns."""
+    return _run(_fadd, a, b, 64, round_mode, False)
+
+
+def fsub_f64_batch(a, b, round_mode='RNE'):
+    return _run(_fadd, a, b, 64, round_mode, True)
+
+
+def fmul_f64_batch(a, b, round_mode='RNE'):
+    return _run(_fmul, a, b, 64, round_mode)
@@ -1,37 +1,30 @@
 # src/numeric_core/mdu.py
-from .adder import ripple_add, twos_negate
-from .alu import msb
+from .adder import add, twos_negate, invert
+from .alu import msb, is_zero
 from .bits import from_hex_string
+from .memo import memoized
+from .backend import dispatch
+from .bitvector import zeros_like, like, shl_in, shr_in
 
 def _is_zero(bits):
-    for b in bits:
-        if b == 1:
-            return False
-    return True
+    return is_zero(bits) == 1
 
 def _invert(bits):
-    return [1 - x for x in bits]
-
-def _sub_bits(a, b):
-    inv = _invert(b)
-    one = [0] * (len(b) - 1) + [1]
-    t, _ = ripple_add(inv, one, 0)
-    s, c = ripple_add(a, t, 0)  # c==1 => no borrow
-    return s, c
+    return invert(bits)
 
 def _addu(a, b):
-    s, _ = ripple_add(a, b, 0)
+    s, _ = add(a, b, 0)
     return s
 
 def mul_shift_add_64(a, b, trace=False):
     n = len(a)
-    acc = [0] * (2 * n)
-    mulcand = [0] * n + a[:]
-    mult = b[:]
+    acc = zeros_like(a, 2 * n)
+    mulcand = zeros_like(a, n) + a[:]
+    mult = like(a, b[:])
     steps = []
     for i in range(n):
         if mult[-1] == 1:
-            acc, _ = ripple_add(acc, mulcand, 0)
+            acc, _ = add(acc, mulcand, 0)
         if trace:
             steps.append({
                 'i': i,
@@ -39,137 +32,328 @@ def mul_shift_add_64(a, b, trace=False):
                 'mulcand': ''.join(map(str, mulcand)),
                 'mult': ''.join(map(str, mult)),
             })
-        mulcand = mulcand[1:] + [0]
-        mult = [0] + mult[:-1]
+        mulcand = shl_in(mulcand, 0)
+        mult = shr_in(mult, 0)
     return acc, (steps if trace else None)
 
-def mul_low32(rs1, rs2, trace=False):
-    n = len(rs1)
-    s1 = msb(rs1); s2 = msb(rs2)
-    neg = 1 if (s1 ^ s2) else 0
+def _csa(x, y, z):
+    # 3:2 carry-save compressor over whole rows; carries move up one weight
+    n = len(x)
+    sm = [x[i] ^ y[i] ^ z[i] for i in range(n)]
+    cy = [(x[i] & y[i]) | (x[i] & z[i]) | (y[i] & z[i]) for i in range(n)]
+    return sm, cy[1:] + [0]
+
+def _booth_digits(b):
+    """Radix-4 Booth recoding of an unsigned multiplier (MSB at index 0).
+    Yields (neg, one, two) selector bits per digit, least significant first."""
+    lsb = list(b)[::-1] + ([0, 0] if len(b) % 2 == 0 else [0])
+    prev = 0
+    for i in range(0, len(lsb), 2):
+        b0 = lsb[i]; b1 = lsb[i + 1]
+        one = b0 ^ prev
+        two = (b1 & (1 ^ b0) & (1 ^ prev)) | ((1 ^ b1) & b0 & prev)
+        yield b1, one, two
+        prev = b1
+
+def mul_booth_wallace_64(a, b, trace=False):
+    """Unsigned n x n -> 2n product from radix-4 Booth partial products
+    reduced by a Wallace tree of carry-save adders; carries are propagated
+    once, in the final add."""
+    n = len(a)
+    W = 2 * n
+    al = list(a)
+    steps = []
+    rows = []
+    corr = [0] * W  # +1 of every negated partial product, at its weight
+    for i, (neg, one, two) in enumerate(_booth_digits(b)):
+        k = 2 * i
+        if not (one | two):
+            continue
+        m = [0] + al if one else al + [0]  # |digit| * a, n+1 bits
+        width = W - k
+        m = m[-width:] if width < len(m) else [0] * (width - len(m)) + m
+        if neg:
+            m = [x ^ 1 for x in m]
+            corr[W - 1 - k] = 1
+        row = m + [0] * k
+        rows.append(row)
+        if trace:
+            digit = (2 if two else 1) * (-1 if neg else 1)
+            steps.append({'i': i, 'digit': digit, 'pp': ''.join(map(str, row))})
+    rows.append(corr)
+    level = 0
+    while len(rows) > 2:
+        nxt = []
+        full = len(rows) - len(rows) % 3
+        for j in range(0, full, 3):
+            nxt.extend(_csa(rows[j], rows[j + 1], rows[j + 2]))
+        rows = nxt + rows[full:]
+        level += 1
+        if trace:
+            steps.append({'level': level, 'rows': len(rows)})
+    if len(rows) == 1:
+        rows.append([0] * W)
+    acc, _ = add(like(a, rows[0]), like(a, rows[1]), 0)
+    if trace:
+        steps.append({'final': ''.join(map(str, acc))})
+    return acc, (steps if trace else None)
+
+MUL_ENGINES = {
+    'shift_add': mul_shift_add_64,
+    'booth': mul_booth_wallace_64,
+}
+
+def _product(rs1, rs2, signed1, signed2, engine, trace):
+    """Full 2n-bit product of rs1 and rs2 read as signed or unsigned."""
+    s1 = msb(rs1) if signed1 else 0
+    s2 = msb(rs2) if signed2 else 0
     a = rs1 if s1 == 0 else twos_negate(rs1)
     b = rs2 if s2 == 0 else twos_negate(rs2)
-    acc, steps = mul_shift_add_64(a, b, trace=trace)
-    if neg:
+    acc, steps = MUL_ENGINES[engine](a, b, trace=trace)
+    if s1 ^ s2:
         acc = twos_negate(acc)
-    low32 = acc[-n:]
-    sign = low32[0]
+    return acc, steps
+
+@memoized
+@dispatch
+def mul_wide(rs1, rs2, signed1=True, signed2=True, engine='shift_add', trace=False):
+    """One multiplication serving both halves: returns (low, high, flags, steps).
+    MUL+MULH is mul_wide(a, b), MULHU is signed1=signed2=False and
+    MULHSU is signed2=False; the low word is the same for all three."""
+    n = len(rs1)
+    acc, steps = _product(rs1, rs2, signed1, signed2, engine, trace)
+    low = acc[-n:]
     hi = acc[:-n]
+    sign = low[0] if (signed1 or signed2) else 0
     overflow = 0
     for bit in hi:
         if bit != sign:
             overflow = 1
             break
-    return low32, {'overflow': overflow}, steps if trace else None
-
-def mulh_signed(rs1, rs2):
-    n = len(rs1)
-    s1 = msb(rs1); s2 = msb(rs2)
-    neg = 1 if (s1 ^ s2) else 0
-    a = rs1 if s1 == 0 else twos_negate(rs1)
-    b = rs2 if s2 == 0 else twos_negate(rs2)
-    acc, _ = mul_shift_add_64(a, b, trace=False)
-    if neg:
-        acc = twos_negate(acc)
-    return acc[:-n]
+    return low, hi, {'overflow': overflow}, steps if trace else None
 
-def mulhu_unsigned(rs1, rs2):
-    n = len(rs1)
-    acc, _ = mul_shift_add_64(rs1, rs2, trace=False)
-    return acc[:-n]
+@memoized
+def mul_low32(rs1, rs2, trace=False, engine='shift_add'):
+    low, _, flags, steps = mul_wide(rs1, rs2, True, True, engine, trace)
+    return low, flags, steps
 
-def mulhsu(rs1, rs2):
-    n = len(rs1)
-    s1 = msb(rs1)
-    a = rs1 if s1 == 0 else twos_negate(rs1)  # signed abs
-    b = rs2[:]                                 # unsigned
-    acc, _ = mul_shift_add_64(a, b, trace=False)
-    if s1 == 1:
-        acc = twos_negate(acc)
-    return acc[:-n]
+@memoized
+def mulh_signed(rs1, rs2, engine='shift_add'):
+    return mul_wide(rs1, rs2, True, True, engine)[1]
 
-def div_signed(rs1, rs2, trace=False):
-    n = len(rs1)
-    s1 = msb(rs1); s2 = msb(rs2)
+@memoized
+def mulhu_unsigned(rs1, rs2, engine='shift_add'):
+    return mul_wide(rs1, rs2, False, False, engine)[1]
 
-    if _is_zero(rs2):
-        q = [1] * n
-        r = rs1[:]
-        return q, r, {'div_by_zero': 1, 'overflow': 0}, [{'event': 'div_by_zero'}] if trace else None
+@memoized
+def mulhsu(rs1, rs2, engine='shift_add'):
+    return mul_wide(rs1, rs2, True, False, engine)[1]
 
-    # INT_MIN/-1 special
-    is_int_min = (rs1[0] == 1 and all(x == 0 for x in rs1[1:]))
-    is_neg_one = (rs2 == [1] * n)
-    if is_int_min and is_neg_one:
-        q = rs1[:]
-        r = [0] * n
-        return q, r, {'div_by_zero': 0, 'overflow': 1}, [] if trace else None
+# ---------------- division engines ----------------
+# Each engine divides unsigned magnitudes a / b (n bits each, b != 0) and
+# returns (quotient, remainder, steps). The divisor is inverted once up
+# front; subtraction is then a single add with carry-in 1.
 
-    # magnitudes
-    a = rs1 if s1 == 0 else twos_negate(rs1)
-    b = rs2 if s2 == 0 else twos_negate(rs2)
+def _bits_str(bits):
+    return ''.join(map(str, bits))
 
-    rem = [0] * n
-    quo = [0] * n
+def _div_restoring(a, b, trace):
+    n = len(a)
+    inv_b = _invert(b)
+    rem = zeros_like(a, n)
+    quo = zeros_like(a, n)
     steps = []
     for i in range(n):
-        rem = rem[1:] + [a[i]]
-        rem_t, carry = _sub_bits(rem, b)
+        rem = shl_in(rem, a[i])
+        rem_t, carry = add(rem, inv_b, 1)
         if carry == 1:  # no borrow => rem >= b
             rem = rem_t
-            quo = quo[1:] + [1]
+            quo = shl_in(quo, 1)
             act = 'sub'
         else:
-            quo = quo[1:] + [0]
+            quo = shl_in(quo, 0)
             act = 'restore'
         if trace:
-            steps.append({'i': i, 'rem': ''.join(map(str, rem)), 'quo': ''.join(map(str, quo)), 'action': act})
+            steps.append({'i': i, 'rem': _bits_str(rem), 'quo': _bits_str(quo), 'action': act})
+    return quo, rem, steps
 
-    q_neg = 1 if (s1 ^ s2) else 0
-    r_neg = s1
-    if q_neg:
-        quo = twos_negate(quo)
-    if r_neg and not _is_zero(rem):
-        rem = twos_negate(rem)
+def _div_nonrestoring(a, b, trace):
+    """Never restores: a negative partial remainder is fixed by adding the
+    divisor on the next step instead of re-adding it immediately."""
+    n = len(a)
+    B = [0, 0] + list(b)                # n+2 bit signed partial remainder
+    inv_B = _invert(B)
+    rem = zeros_like(a, n + 2)
+    quo = zeros_like(a, n)
+    steps = []
+    for i in range(n):
+        negative = rem[0]
+        rem = shl_in(rem, a[i])
+        if negative:
+            rem, _ = add(rem, like(rem, B), 0)
+            act = 'add'
+        else:
+            rem, _ = add(rem, like(rem, inv_B), 1)
+            act = 'sub'
+        quo = shl_in(quo, 1 ^ rem[0])
+        if trace:
+            steps.append({'i': i, 'rem': _bits_str(rem), 'quo': _bits_str(quo), 'action': act})
+    if rem[0] == 1:
+        rem, _ = add(rem, like(rem, B), 0)
+        if trace:
+            steps.append({'i': n, 'rem': _bits_str(rem), 'quo': _bits_str(quo), 'action': 'correct'})
+    return quo, like(a, rem[2:]), steps
 
-    return quo, rem, {'div_by_zero': 0, 'overflow': 0}, steps if trace else None
+def _signed_small(bits):
+    v = 0
+    for x in bits:
+        v = v * 2 + x
+    if bits and bits[0] == 1:
+        v = v - (1 << len(bits))
+    return v
 
-# unsigned DIV/REM (RV32M)
-def divu_unsigned(rs1, rs2, trace=False):
-    """Unsigned restoring division. rs1, rs2 are bit arrays (MSB at index 0)."""
-    n = len(rs1)
-    # If divisor is zero: q=all1, r=dividend (RISC-V semantics)
-    if _is_zero(rs2):
-        return [1]*n, rs1[:], {'div_by_zero':1}, ([] if not trace else [{'step':0,'rem':rs1[:],'q':([1]*n),'op':'/0'}])
+# low two bits appended to Q (resp. Q-1) for each radix-4 digit
+_SRT_Q = {2: [1, 0], 1: [0, 1], 0: [0, 0], -1: [1, 1], -2: [1, 0]}
+_SRT_QM = {2: [0, 1], 1: [0, 0], 0: [1, 1], -1: [1, 0], -2: [0, 1]}
 
-    rem = [0]*n
-    q = [0]*n
-    tr = []
+def _div_srt4(a, b, trace):
+    """Radix-4 SRT: quotient digits in {-2..2} chosen from a truncated
+    estimate of the partial remainder and the divisor's top 5 bits, with
+    on-the-fly conversion of the redundant quotient (Q, Q-1 registers).
 
-    for i in range(n):
-        # Bring down next dividend bit
-        next_bit = rs1[i]
-        rem = rem[1:] + [next_bit]    # left shift rem by 1 and OR in bit
-        # Try subtracting divisor
-        diff, c = _sub_bits(rem, rs2) # c==1 => no borrow => rem >= rs2
-        if c == 1:
-            rem = diff
-            q[i] = 1
-            op = 'sub'
+    The divisor is normalised (MSB set) so its 5-bit estimate is >= 16;
+    truncation then moves each threshold by under 1/16 of the divisor, well
+    inside the redundancy of the {-2..2} digit set (|R| <= 2/3 * divisor).
+    """
+    n0 = len(a)
+    pad = 8 - n0 if n0 < 8 else 0      # the estimate needs at least 8 bits
+    al = [0] * pad + list(a)
+    bl = [0] * pad + list(b)
+    n = len(al)
+    lz = 0
+    while bl[lz] == 0:
+        lz += 1
+    D = bl[lz:] + [0] * lz             # normalised divisor, n bits
+    d_top = 0
+    for x in D[:5]:
+        d_top = d_top * 2 + x
+    K = (lz + 2) // 2 + 1              # radix-4 digits so that |A| <= 2/3 * D * 4^K
+    W = n + 2 * K + 2                  # signed partial remainder width
+    rem = [0] * (W - n - lz) + al + [0] * lz        # A = a << lz
+    Q = [0]                            # two's-complement, leading sign bit
+    QM = [1]                           # Q - 1, starts at -1
+    steps = []
+    for j in range(K):
+        m = 2 * (K - 1 - j)            # S = D << m
+        S = [0] * (W - n - m) + D + [0] * m
+        # truncated estimate on the same scale as d_top: R >> (n - 5 + m), 8 bits
+        hi = W - (n - 5 + m)
+        r_top = _signed_small(rem[hi - 8:hi])
+        if 2 * r_top >= 3 * d_top:
+            q = 2
+        elif 2 * r_top >= d_top:
+            q = 1
+        elif 2 * r_top >= -d_top:
+            q = 0
+        elif 2 * r_top >= -3 * d_top:
+            q = -1
         else:
-            # restore
-            op = 'restore'
+            q = -2
+        if q:
+            mult = S[1:] + [0] if q in (2, -2) else S
+            if q > 0:
+                rem, _ = add(rem, _invert(mult), 1)
+            else:
+                rem, _ = add(rem, mult, 0)
+        # on-the-fly conversion: append digit bits, never propagate carries
+        Q, QM = ((Q if q >= 0 else QM) + _SRT_Q[q],
+                 (Q if q > 0 else QM) + _SRT_QM[q])
         if trace:
-            tr.append({'step': i, 'rem': rem[:], 'q': q[:], 'op': op})
+            steps.append({'i': j, 'digit': q, 'rem': _bits_str(rem), 'quo': _bits_str(Q)})
+    if rem[0] == 1:                    # final remainder negative: Q-1, R+D
+        Q = QM
+        rem, _ = add(rem, [0] * (W - n) + D, 0)
+        if trace:
+            steps.append({'i': K, 'digit': None, 'rem': _bits_str(rem), 'quo': _bits_str(Q), 'action': 'correct'})
+    quo = ([Q[0]] * n0 + Q)[-n0:]
+    r = rem[W - n - lz:W - lz][-n0:]   # undo the normalisation shift
+    return like(a, quo), like(a, r), steps
 
-    flags = {'overflow':0}
-    return q, rem, flags, tr
+DIV_ENGINES = {
+    'restoring': _div_restoring,
+    'nonrestoring': _div_nonrestoring,
+    'srt4': _div_srt4,
+}
 
-def rem_signed(rs1, rs2, trace=False):
-    q, r, flg, tr = div_signed(rs1, rs2, trace=trace)
-    return r, flg, tr
+@memoized
+@dispatch
+def div_rem(rs1, rs2, signed=True, engine='restoring', trace=False):
+    """Quotient and remainder from one division: returns (q, r, flags, steps).
+    A DIV/REM (or DIVU/REMU) pair on the same operands needs only this call.
+    RISC-V rules: x/0 -> q = all ones, r = x; INT_MIN/-1 -> q = INT_MIN, r = 0."""
+    n = len(rs1)
+    if _is_zero(rs2):
+        q = like(rs1, [1] * n)
+        r = rs1[:]
+        return q, r, {'div_by_zero': 1, 'overflow': 0}, [{'event': 'div_by_zero'}] if trace else None
 
-def remu_unsigned(rs1, rs2, trace=False):
-    q, r, flg, tr = divu_unsigned(rs1, rs2, trace=trace)
+    s1 = msb(rs1) if signed else 0
+    s2 = msb(rs2) if signed else 0
+    if signed:
+        # INT_MIN/-1 special
+        is_int_min = (rs1[0] == 1 and all(x == 0 for x in rs1[1:]))
+        is_neg_one = (rs2 == [1] * n)
+        if is_int_min and is_neg_one:
+            q = rs1[:]
+            r = zeros_like(rs1, n)
+            return q, r, {'div_by_zero': 0, 'overflow': 1}, [] if trace else None
+
+    # magnitudes
+    a = rs1 if s1 == 0 else twos_negate(rs1)
+    b = rs2 if s2 == 0 else twos_negate(rs2)
+    quo, rem, steps = DIV_ENGINES[engine](a, like(a, b), trace)
+
+    if s1 ^ s2:
+        quo = twos_negate(quo)
+    if s1 and not _is_zero(rem):
+        rem = twos_negate(rem)
+    return quo, rem, {'div_by_zero': 0, 'overflow': 0}, steps if trace else None
+
+@memoized
+def div_signed(rs1, rs2, trace=False, engine='restoring'):
+    return div_rem(rs1, rs2, True, engine, trace)
+
+def _divu_restoring_result(rs1, q, r, flags, steps, trace):
+    # divu_unsigned's original contract: a trace list even when not tracing,
+    # a single flag key and {'step', 'rem', 'q', 'op'} records with the
+    # quotient filled in from the MSB
+    n = len(rs1)
+    if flags['div_by_zero']:
+        tr = [{'step': 0, 'rem': list(rs1), 'q': [1] * n, 'op': '/0'}] if trace else []
+        return q, r, {'div_by_zero': 1}, tr
+    tr = []
+    for s in steps or ():
+        k = n - 1 - s['i']
+        quo = [int(c) for c in s['quo']]
+        tr.append({'step': s['i'], 'rem': [int(c) for c in s['rem']],
+                   'q': quo[k:] + quo[:k], 'op': s['action']})
+    return q, r, {'overflow': 0}, tr
+
+# unsigned DIV/REM (RV32M)
+@memoized
+def divu_unsigned(rs1, rs2, trace=False, engine='restoring'):
+    """Unsigned division. rs1, rs2 are bit arrays (MSB at index 0)."""
+    q, r, flags, steps = div_rem(rs1, rs2, False, engine, trace)
+    if engine == 'restoring':
+        return _divu_restoring_result(rs1, q, r, flags, steps, trace)
+    return q, r, flags, steps
+
+@memoized
+def rem_signed(rs1, rs2, trace=False, engine='restoring'):
+    q, r, flg, tr = div_rem(rs1, rs2, True, engine, trace)
     return r, flg, tr
 
+@memoized
+def remu_unsigned(rs1, rs2, trace=False, engine='restoring'):
+    q, r, flg, tr = divu_unsigned(rs1, rs2, trace, engine)
+    return r, flg, tr
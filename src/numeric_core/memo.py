@@ -0,0 +1,145 @@
+# src/numeric_core/memo.py
+# Opt-in memoization for the mdu / fpu entry points. A call is keyed by the
+# op name, the operands packed to (kind, width, int) and the remaining
+# arguments (engine, rounding mode, ...) under the active backend. Off by
+# default; enable_cache() turns it on. Calls that ask for a trace or stats,
+# and every call under the differential backend, always run the real code.
+
+from collections import OrderedDict
+import functools
+import inspect
+
+from .bitvector import BitVector
+
+
+class LRUCache:
+    """Bounded least-recently-used map with hit/miss/eviction counters."""
+
+    def __init__(self, capacity=4096):
+        if capacity < 1:
+            raise ValueError('cache capacity must be >= 1')
+        self.capacity = capacity
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        try:
+            value = self.data[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.capacity:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.data.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {'capacity': self.capacity, 'size': len(self.data), 'hits': self.hits,
+                'misses': self.misses, 'evictions': self.evictions}
+
+
+_cache = None
+_depth = 0     # >0 while a cached op runs: nested cached ops go straight through
+
+
+def enable_cache(capacity=4096):
+    """Turn memoization on (replacing any existing cache) and return it."""
+    global _cache
+    _cache = LRUCache(capacity)
+    return _cache
+
+
+def disable_cache():
+    global _cache
+    _cache = None
+
+
+def clear_cache():
+    if _cache is not None:
+        _cache.clear()
+
+
+def cache_stats():
+    return _cache.stats() if _cache is not None else None
+
+
+def _pack(x):
+    if isinstance(x, BitVector):
+        return ('bv', x.width, x.value)
+    if isinstance(x, list):
+        v = 0
+        for b in x:
+            v = (v << 1) | b
+        return ('bits', len(x), v)
+    return x
+
+
+def _copy(x):
+    # results hold mutable bit lists / flag dicts; callers must not be able
+    # to corrupt the cached copy
+    if isinstance(x, list):
+        return list(x)
+    if isinstance(x, dict):
+        return dict(x)
+    if isinstance(x, tuple):
+        return tuple(_copy(y) for y in x)
+    if isinstance(x, BitVector):
+        return BitVector(x.width, x.value)
+    return x
+
+
+def _observed(watch, args, kwargs):
+    # a trace or a stats dict was asked for: the caller wants the real run
+    for pos, name in watch:
+        v = kwargs[name] if name in kwargs else (args[pos] if len(args) > pos else None)
+        if v is not None and v is not False and v != 0:
+            return True
+    return False
+
+
+def memoized(fn):
+    """Decorator: serve fn from the LRU cache when one is enabled."""
+    op = fn.__name__
+    params = list(inspect.signature(fn).parameters)
+    watch = [(params.index(p), p) for p in ('trace', 'stats') if p in params]
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        global _depth
+        cache = _cache
+        if cache is None or _depth:
+            return fn(*args, **kwargs)
+        if watch and _observed(watch, args, kwargs):
+            return fn(*args, **kwargs)
+        from .backend import get_backend
+        name = get_backend()
+        if name == 'differential':
+            # a hit would skip the cross-check the backend exists for
+            return fn(*args, **kwargs)
+        key = (op, name, tuple(_pack(a) for a in args),
+               tuple(sorted((k, _pack(v)) for k, v in kwargs.items())) if kwargs else ())
+        hit = cache.get(key)
+        if hit is not None:
+            return _copy(hit)
+        _depth += 1
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            _depth -= 1
+        cache.put(key, _copy(result))
+        return result
+
+    wrapper.uncached = fn
+    return wrapper
@@ -3,6 +3,9 @@
 # Skeleton for SLL/SRL/SRA without using << or >>.
 # Implement either an iterative shift register or a barrel shifter using list ops.
 
+from .backend import dispatch
+
+@dispatch
 def sll(bits, shamt):
     # Left logical: drop MSBs, insert zeros at LSB side.
     n = len(bits)
@@ -11,12 +14,14 @@ def sll(bits, shamt):
     res = bits[k:] + [0]*k
     return res
 
+@dispatch
 def srl(bits, shamt):
     n = len(bits)
     k = shamt % n
     res = [0]*k + bits[:n-k]
     return res
 
+@dispatch
 def sra(bits, shamt):
     n = len(bits)
     k = shamt % n
@@ -0,0 +1,115 @@
+# tests/rvasm.py
+# Tiny RV32 encoder used by the CPU tests to build programs inline.
+
+def _r(opcode, rd, f3, rs1, rs2, f7):
+    return (f7 << 25) | (rs2 << 20) | (rs1 << 15) | (f3 << 12) | (rd << 7) | opcode
+
+def _i(opcode, rd, f3, rs1, imm):
+    return ((imm & 0xFFF) << 20) | (rs1 << 15) | (f3 << 12) | (rd << 7) | opcode
+
+def _s(opcode, f3, rs1, rs2, imm):
+    imm &= 0xFFF
+    return ((imm >> 5) << 25) | (rs2 << 20) | (rs1 << 15) | (f3 << 12) | ((imm & 0x1F) << 7) | opcode
+
+def _b(f3, rs1, rs2, off):
+    off &= 0x1FFF
+    return (((off >> 12) & 1) << 31) | (((off >> 5) & 0x3F) << 25) | (rs2 << 20) | (rs1 << 15) \
+        | (f3 << 12) | (((off >> 1) & 0xF) << 8) | (((off >> 11) & 1) << 7) | 0x63
+
+def add(rd, rs1, rs2): return _r(0x33, rd, 0, rs1, rs2, 0x00)
+def sub(rd, rs1, rs2): return _r(0x33, rd, 0, rs1, rs2, 0x20)
+def and_(rd, rs1, rs2): return _r(0x33, rd, 7, rs1, rs2, 0x00)
+def or_(rd, rs1, rs2): return _r(0x33, rd, 6, rs1, rs2, 0x00)
+def xor(rd, rs1, rs2): return _r(0x33, rd, 4, rs1, rs2, 0x00)
+def sll(rd, rs1, rs2): return _r(0x33, rd, 1, rs1, rs2, 0x00)
+def srl(rd, rs1, rs2): return _r(0x33, rd, 5, rs1, rs2, 0x00)
+def sra(rd, rs1, rs2): return _r(0x33, rd, 5, rs1, rs2, 0x20)
+
+def mul(rd, rs1, rs2): return _r(0x33, rd, 0, rs1, rs2, 0x01)
+def mulh(rd, rs1, rs2): return _r(0x33, rd, 1, rs1, rs2, 0x01)
+def mulhsu(rd, rs1, rs2): return _r(0x33, rd, 2, rs1, rs2, 0x01)
+def mulhu(rd, rs1, rs2): return _r(0x33, rd, 3, rs1, rs2, 0x01)
+def div(rd, rs1, rs2): return _r(0x33, rd, 4, rs1, rs2, 0x01)
+def divu(rd, rs1, rs2): return _r(0x33, rd, 5, rs1, rs2, 0x01)
+def rem(rd, rs1, rs2): return _r(0x33, rd, 6, rs1, rs2, 0x01)
+def remu(rd, rs1, rs2): return _r(0x33, rd, 7, rs1, rs2, 0x01)
+
+def addi(rd, rs1, imm): return _i(0x13, rd, 0, rs1, imm)
+def andi(rd, rs1, imm): return _i(0x13, rd, 7, rs1, imm)
+def ori(rd, rs1, imm): return _i(0x13, rd, 6, rs1, imm)
+def xori(rd, rs1, imm): return _i(0x13, rd, 4, rs1, imm)
+def slli(rd, rs1, sh): return _i(0x13, rd, 1, rs1, sh)
+def srli(rd, rs1, sh): return _i(0x13, rd, 5, rs1, sh)
+def srai(rd, rs1, sh): return _i(0x13, rd, 5, rs1, 0x400 | sh)
+
+def lb(rd, rs1, imm): return _i(0x03, rd, 0, rs1, imm)
+def lh(rd, rs1, imm): return _i(0x03, rd, 1, rs1, imm)
+def lw(rd, rs1, imm): return _i(0x03, rd, 2, rs1, imm)
+def lbu(rd, rs1, imm): return _i(0x03, rd, 4, rs1, imm)
+def lhu(rd, rs1, imm): return _i(0x03, rd, 5, rs1, imm)
+def sb(rs2, rs1, imm): return _s(0x23, 0, rs1, rs2, imm)
+def sh(rs2, rs1, imm): return _s(0x23, 1, rs1, rs2, imm)
+def sw(rs2, rs1, imm): return _s(0x23, 2, rs1, rs2, imm)
+
+def beq(rs1, rs2, off): return _b(0, rs1, rs2, off)
+def bne(rs1, rs2, off): return _b(1, rs1, rs2, off)
+
+def jal(rd, off):
+    off &= 0x1FFFFF
+    return (((off >> 20) & 1) << 31) | (((off >> 1) & 0x3FF) << 21) | (((off >> 11) & 1) << 20) \
+        | (((off >> 12) & 0xFF) << 12) | (rd << 7) | 0x6F
+
+def jalr(rd, rs1, imm): return _i(0x67, rd, 0, rs1, imm)
+def lui(rd, imm20): return ((imm20 & 0xFFFFF) << 12) | (rd << 7) | 0x37
+def auipc(rd, imm20): return ((imm20 & 0xFFFFF) << 12) | (rd << 7) | 0x17
+
+HALT = 0x0000006F
+
+def li(rd, value):
+    """lui+addi pair loading an arbitrary 32-bit constant."""
+    value &= 0xFFFFFFFF
+    lo = value & 0xFFF
+    if lo & 0x800:
+        lo -= 0x1000
+    hi = ((value - lo) >> 12) & 0xFFFFF
+    return [lui(rd, hi), addi(rd, rd, lo)]
+
+def loop_program(n):
+    """Sum 1..n into x3 with a countdown loop; used as a loop-heavy workload."""
+    return li(1, n) + [       # 0x00: x1 = n
+        addi(3, 0, 0),        # 0x08: x3 = 0
+        add(3, 3, 1),         # 0x0C: x3 += x1
+        addi(1, 1, -1),       # 0x10: x1 -= 1
+        bne(1, 0, -8),        # 0x14: loop while x1 != 0
+        HALT,
+    ]
+
+# RV32F / RV32D (rm defaults to 7 = dynamic, i.e. fcsr.frm)
+def flw(rd, rs1, imm): return _i(0x07, rd, 2, rs1, imm)
+def fld(rd, rs1, imm): return _i(0x07, rd, 3, rs1, imm)
+def fsw(rs2, rs1, imm): return _s(0x27, 2, rs1, rs2, imm)
+def fsd(rs2, rs1, imm): return _s(0x27, 3, rs1, rs2, imm)
+def fadd_s(rd, rs1, rs2, rm=7): return _r(0x53, rd, rm, rs1, rs2, 0x00)
+def fadd_d(rd, rs1, rs2, rm=7): return _r(0x53, rd, rm, rs1, rs2, 0x01)
+def fsub_s(rd, rs1, rs2, rm=7): return _r(0x53, rd, rm, rs1, rs2, 0x04)
+def fsub_d(rd, rs1, rs2, rm=7): return _r(0x53, rd, rm, rs1, rs2, 0x05)
+def fmul_s(rd, rs1, rs2, rm=7): return _r(0x53, rd, rm, rs1, rs2, 0x08)
+def fmul_d(rd, rs1, rs2, rm=7): return _r(0x53, rd, rm, rs1, rs2, 0x09)
+def fdiv_s(rd, rs1, rs2, rm=7): return _r(0x53, rd, rm, rs1, rs2, 0x0C)
+def fdiv_d(rd, rs1, rs2, rm=7): return _r(0x53, rd, rm, rs1, rs2, 0x0D)
+def fsqrt_s(rd, rs1, rm=7): return _r(0x53, rd, rm, rs1, 0, 0x2C)
+def fsqrt_d(rd, rs1, rm=7): return _r(0x53, rd, rm, rs1, 0, 0x2D)
+def fsgnjn_s(rd, rs1, rs2): return _r(0x53, rd, 1, rs1, rs2, 0x10)
+def fmv_x_w(rd, rs1): return _r(0x53, rd, 0, rs1, 0, 0x70)
+def fmv_w_x(rd, rs1): return _r(0x53, rd, 0, rs1, 0, 0x78)
+
+def _r4(opcode, rd, rs1, rs2, rs3, fmt, rm):
+    return _r(opcode, rd, rm, rs1, rs2, (rs3 << 2) | fmt)
+
+def fmadd_s(rd, rs1, rs2, rs3, rm=7): return _r4(0x43, rd, rs1, rs2, rs3, 0, rm)
+def fmadd_d(rd, rs1, rs2, rs3, rm=7): return _r4(0x43, rd, rs1, rs2, rs3, 1, rm)
+def fnmsub_s(rd, rs1, rs2, rs3, rm=7): return _r4(0x4B, rd, rs1, rs2, rs3, 0, rm)
+
+def csrrw(rd, csr, rs1): return _i(0x73, rd, 1, rs1, csr)
+def csrrs(rd, csr, rs1): return _i(0x73, rd, 2, rs1, csr)
+def csrrwi(rd, csr, uimm): return _i(0x73, rd, 5, uimm, csr)
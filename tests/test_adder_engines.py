@@ -0,0 +1,53 @@
+# tests/test_adder_engines.py
+import random
+import pytest
+from src.numeric_core.adder import (ADDER_ENGINES, ripple_add, add,
+                                    set_adder_engine, get_adder_engine)
+from src.numeric_core.bits import from_hex_string, to_hex_string
+from src.numeric_core.bitvector import BitVector
+from src.numeric_core.mdu import mul_low32, div_signed
+from src.numeric_core.fpu import fmul_f64
+
+def bits(v, n):
+    return [(v >> (n - 1 - i)) & 1 for i in range(n)]
+
+@pytest.mark.parametrize('engine', sorted(ADDER_ENGINES))
+def test_engine_matches_ripple(engine):
+    rng = random.Random(3)
+    for n in (1, 5, 8, 25, 32, 53, 64):
+        for _ in range(30):
+            a = bits(rng.getrandbits(n), n)
+            b = bits(rng.choice([rng.getrandbits(n), (1 << n) - 1]), n)
+            cin = rng.randrange(2)
+            assert add(a, b, cin, engine=engine) == ripple_add(a, b, cin)
+    r, c = add(BitVector(32, 0xFFFFFFFF), BitVector(32, 1), engine=engine)
+    assert isinstance(r, BitVector) and r.value == 0 and c == 1
+
+def test_stats_show_prefix_depth_advantage():
+    a, b = bits(0x123456789ABCDEF0, 64), bits(0x0FEDCBA987654321, 64)
+    cost = {}
+    for name in ADDER_ENGINES:
+        st = {}
+        add(a, b, engine=name, stats=st)
+        assert st['adds'] == 1 and st['gates'] > 0
+        cost[name] = st
+    assert cost['kogge_stone']['depth'] < cost['cla']['depth'] < cost['ripple']['depth']
+    assert cost['brent_kung']['gates'] < cost['kogge_stone']['gates']
+    assert cost['carry_select']['depth'] < cost['ripple']['depth']
+
+def test_module_level_engine_drives_units():
+    a = from_hex_string('0x0000000D', width=32)
+    b = from_hex_string('0xFFFFFFF3', width=32)
+    x = bits(0x3FF8000000000001, 64)
+    y = bits(0x4008000000000003, 64)
+    expect = (mul_low32(a, b)[0], div_signed(b, a)[:2], fmul_f64(x, y))
+    try:
+        for name in ADDER_ENGINES:
+            set_adder_engine(name)
+            assert get_adder_engine() == name
+            assert (mul_low32(a, b)[0], div_signed(b, a)[:2], fmul_f64(x, y)) == expect
+    finally:
+        set_adder_engine('ripple')
+    assert to_hex_string(expect[0]).endswith('FFFFFF57')
+    with pytest.raises(ValueError):
+        set_adder_engine('magic')
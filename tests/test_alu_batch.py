@@ -0,0 +1,35 @@
+# tests/test_alu_batch.py
+import random
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from src.numeric_core.alu import alu_add, alu_sub
+from src.numeric_core.alu_batch import alu_add_batch, alu_sub_batch
+from src.numeric_core.bitvector import BitVector
+
+EDGE = [0, 1, 0x7FFFFFFF, 0x80000000, 0xFFFFFFFF, 0xFFFFFFF3, 0x0000000D]
+
+def _operands(seed, n):
+    rng = random.Random(seed)
+    a = [rng.choice(EDGE) if rng.random() < 0.2 else rng.getrandbits(32) for _ in range(n)]
+    b = [rng.choice(EDGE) if rng.random() < 0.2 else rng.getrandbits(32) for _ in range(n)]
+    a += [x for x in EDGE for _ in EDGE]
+    b += [y for _ in EDGE for y in EDGE]
+    return a, b
+
+@pytest.mark.parametrize('batch, scalar', [(alu_add_batch, alu_add), (alu_sub_batch, alu_sub)])
+def test_batch_matches_scalar(batch, scalar):
+    a, b = _operands(5, 400)
+    res, flags = batch(np.array(a, dtype=np.uint32), np.array(b, dtype=np.uint32))
+    for i, (x, y) in enumerate(zip(a, b)):
+        r, f = scalar(BitVector(32, x), BitVector(32, y))
+        assert int(res[i]) == r.value
+        for k in 'NZCV':
+            assert int(flags[k][i]) == f[k], (hex(x), hex(y), k)
+
+def test_batch_reference_cases():
+    r, f = alu_add_batch([0x7FFFFFFF], [1])
+    assert int(r[0]) == 0x80000000 and int(f['V'][0]) == 1 and int(f['C'][0]) == 0
+    r, f = alu_sub_batch([0x80000000], [1])
+    assert int(r[0]) == 0x7FFFFFFF and int(f['V'][0]) == 1 and int(f['C'][0]) == 1
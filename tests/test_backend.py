@@ -0,0 +1,108 @@
+import random
+import struct
+
+import pytest
+
+from src.numeric_core import backend
+from src.numeric_core.bitvector import BitVector
+from src.numeric_core.alu import alu_add, alu_sub
+from src.numeric_core.shifter import sll, srl, sra
+from src.numeric_core.mdu import mul_wide, div_rem, mul_low32, rem_signed
+from src.numeric_core.fpu import (fadd_f32, fsub_f32, fmul_f32,
+                                  fadd_f64, fsub_f64, fmul_f64)
+
+
+def bits(v, n):
+    return [(v >> (n - 1 - i)) & 1 for i in range(n)]
+
+
+def val(b):
+    v = 0
+    for x in b:
+        v = (v << 1) | x
+    return v
+
+
+@pytest.fixture
+def differential():
+    backend.set_backend('differential')
+    yield
+    backend.set_backend('reference')
+
+
+INT_EDGE = [0, 1, 2, 0x7FFFFFFF, 0x80000000, 0x80000001, 0xFFFFFFFF, 0xFFFFFFFE]
+F32_EDGE = [0x00000000, 0x80000000, 0x3F800000, 0xBF800000, 0x7F800000, 0xFF800000,
+            0x7FC00000, 0x7F7FFFFF, 0x00800000, 0x00000001, 0x3FFFFFFF, 0x33800000,
+            0x3DCCCCCD, 0x3E4CCCCD, 0x4B800000, 0xCB7FFFFF]
+
+
+def test_integer_ops_match(differential):
+    rng = random.Random(5)
+    pairs = [(x, y) for x in INT_EDGE for y in INT_EDGE]
+    pairs += [(rng.getrandbits(32), rng.getrandbits(rng.choice((4, 16, 32)))) for _ in range(150)]
+    for x, y in pairs:
+        a, b = bits(x, 32), bits(y, 32)
+        alu_add(a, b); alu_sub(a, b)
+        sll(a, y); srl(a, y); sra(a, y)
+        for s1, s2 in ((True, True), (False, False), (True, False)):
+            mul_wide(a, b, s1, s2)
+        div_rem(a, b, True); div_rem(a, b, False)
+        alu_add(BitVector(32, x), BitVector(32, y))
+        div_rem(BitVector(32, x), BitVector(32, y))
+    rep = backend.differential_report()
+    assert rep['checked'] == rep['calls'] > 0
+    assert rep['mismatches'] == []
+
+
+def test_float_ops_match_all_rounding_modes(differential):
+    rng = random.Random(9)
+    f32 = [(x, y) for x in F32_EDGE for y in F32_EDGE]
+    for _ in range(200):
+        x = rng.getrandbits(32)
+        y = (x ^ rng.getrandbits(rng.choice((1, 8, 24)))) if rng.random() < 0.5 else rng.getrandbits(32)
+        f32.append((x, y))
+    for x, y in f32:
+        for rm in ('RNE', 'RTZ', 'RUP', 'RDN'):
+            for fn in (fadd_f32, fsub_f32, fmul_f32):
+                fn(bits(x, 32), bits(y, 32), rm)
+    for _ in range(150):
+        x, y = rng.getrandbits(64), rng.getrandbits(64)
+        if rng.random() < 0.5:
+            y = x ^ rng.getrandbits(rng.choice((1, 20, 52)))
+        for fn in (fadd_f64, fsub_f64, fmul_f64):
+            fn(bits(x, 64), bits(y, 64), rng.choice(('RNE', 'RTZ', 'RUP', 'RDN', 'RMM')))
+    assert backend.differential_report()['mismatches'] == []
+
+
+def test_fast_backend_results_and_sampling():
+    f = lambda v: bits(struct.unpack('<I', struct.pack('<f', v))[0], 32)
+    try:
+        backend.set_backend('fast')
+        assert val(fsub_f32(f(5.0), f(2.0))[0]) == val(f(3.0))
+        assert val(fadd_f32(f(1.5), f(-1.75))[0]) == val(f(-0.25))
+        assert val(mul_low32(bits(7, 32), bits(0xFFFFFFFA, 32))[0]) == (-42) & 0xFFFFFFFF
+        assert val(rem_signed(bits(0xFFFFFFF9, 32), bits(2, 32))[0]) == 0xFFFFFFFF
+        q, r, _, steps = div_rem(bits(100, 32), bits(7, 32), trace=True)
+        assert steps                      # traces come from the reference
+        backend.set_backend('differential', sample_rate=0.25, seed=3)
+        for i in range(200):
+            alu_add(bits(i, 32), bits(3 * i, 32))
+        rep = backend.differential_report()
+        assert rep['calls'] == 200 and 20 < rep['checked'] < 100
+    finally:
+        backend.set_backend('reference')
+    with pytest.raises(ValueError):
+        backend.set_backend('gpu')
+
+
+def test_mismatch_is_reported(differential):
+    def sll(bits, shamt):                 # a broken "reference" shifter
+        return bits[:]
+    broken = backend.dispatch(sll)
+    broken(bits(1, 32), 4)
+    broken(bits(1, 32), 0)
+    rep = backend.differential_report()
+    assert rep['checked'] == 2 and len(rep['mismatches']) == 1
+    m = rep['mismatches'][0]
+    assert m['op'] == 'sll' and m['args'] == ((32, 1), 4)
+    assert m['reference'] == (32, 1) and m['fast'] == (32, 16)
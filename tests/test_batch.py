@@ -0,0 +1,34 @@
+# tests/test_batch.py
+import json
+from batch import collect_jobs, run_batch, run_one
+import rvasm
+from rvasm import HALT, loop_program
+
+def _write_hex(path, words):
+    path.write_text("".join("%08X\n" % w for w in words))
+
+def test_run_one_reports_halt_reasons(tmp_path):
+    _write_hex(tmp_path / "ok.hex", loop_program(10))
+    _write_hex(tmp_path / "spin.hex", [rvasm.beq(0, 0, 0)])
+    _write_hex(tmp_path / "bad.hex", [rvasm.addi(1, 0, 1), 0xFFFFFFFF])
+    jobs = {j["path"].rsplit("/", 1)[1]: j
+            for j in collect_jobs(str(tmp_path), 5000, None, [(0x0, 2)])}
+    ok = run_one(jobs["ok.hex"])
+    assert ok["halt_reason"] == "halt" and ok["regs"][3] == 55
+    assert ok["memory"] == {"0x00000000": [0, 0]}
+    assert run_one(jobs["spin.hex"])["halt_reason"] == "step_limit"
+    assert run_one(jobs["bad.hex"])["halt_reason"] == "illegal"
+    assert run_one(dict(jobs["spin.hex"], max_steps=10**9, timeout=0.05))["halt_reason"] == "timeout"
+
+def test_manifest_batch_over_pool(tmp_path):
+    for n in (3, 4, 5):
+        _write_hex(tmp_path / ("p%d.hex" % n), loop_program(n))
+    manifest = tmp_path / "jobs.txt"
+    manifest.write_text('p3.hex\n# comment\n{"path": "p4.hex", "max_steps": 4}\np5.hex\nmissing.hex\n')
+    results = {r["program"].rsplit("/", 1)[1]: r
+               for r in run_batch(collect_jobs(str(manifest), 1000, None, []), workers=2)}
+    assert results["p3.hex"]["regs"][3] == 6
+    assert results["p4.hex"]["halt_reason"] == "step_limit" and results["p4.hex"]["steps"] == 4
+    assert results["p5.hex"]["regs"][3] == 15
+    assert results["missing.hex"]["halt_reason"] == "error"
+    json.dumps(results)
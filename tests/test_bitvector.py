@@ -0,0 +1,69 @@
+# tests/test_bitvector.py
+import random
+from src.numeric_core.bitvector import BitVector
+from src.numeric_core.alu import alu_add, alu_sub
+from src.numeric_core.shifter import sll, srl, sra
+from src.numeric_core.mdu import (mul_low32, mulh_signed, mulhu_unsigned, mulhsu,
+                                  div_signed, divu_unsigned, rem_signed, remu_unsigned)
+from src.numeric_core.fpu import fadd_f32, fsub_f32, fmul_f32, fadd_f64, fmul_f64
+
+def bits(v, n):
+    return [(v >> (n - 1 - i)) & 1 for i in range(n)]
+
+def test_sequence_behaviour_matches_list():
+    lst = bits(0xDEADBEEF, 32)
+    bv = BitVector.from_list(lst)
+    assert len(bv) == 32 and list(bv) == lst
+    assert bv[0] == 1 and bv[-1] == 1 and bv[4] == lst[4]
+    assert bv[3:17] == lst[3:17] and bv[:-8] == lst[:-8] and bv[-8:] == lst[-8:]
+    assert [0, 1] + bv == [0, 1] + lst
+    assert bv + [1] == lst + [1]
+    bv[0] = 0
+    assert bv.value == 0x5EADBEEF
+    assert BitVector(8, 0x81).shift_left_in(1).value == 0x03
+    assert BitVector(8, 0x81).shift_right_in(1).value == 0xC0
+
+def _same(out_list, out_bv):
+    assert isinstance(out_bv, BitVector)
+    assert out_bv.to_list() == out_list
+
+def test_integer_units_bit_exact():
+    rng = random.Random(7)
+    specials = [0, 1, 0x7FFFFFFF, 0x80000000, 0xFFFFFFFF]
+    for _ in range(40):
+        a = rng.choice(specials + [rng.getrandbits(32)])
+        b = rng.choice(specials + [rng.getrandbits(32)])
+        la, lb = bits(a, 32), bits(b, 32)
+        va, vb = BitVector(32, a), BitVector(32, b)
+        for fn in (alu_add, alu_sub):
+            (rl, fl), (rv, fv) = fn(la, lb), fn(va, vb)
+            _same(rl, rv); assert fl == fv
+        for fn in (sll, srl, sra):
+            _same(fn(la, b & 31), fn(va, b & 31))
+        _same(mul_low32(la, lb)[0], mul_low32(va, vb)[0])
+        for fn in (mulh_signed, mulhu_unsigned, mulhsu):
+            _same(fn(la, lb), fn(va, vb))
+        for fn in (div_signed, divu_unsigned):
+            ql, rl, fl, _ = fn(la, lb)
+            qv, rv, fv, _ = fn(va, vb)
+            _same(ql, qv); _same(rl, rv); assert fl == fv
+        for fn in (rem_signed, remu_unsigned):
+            _same(fn(la, lb)[0], fn(va, vb)[0])
+
+def test_float_units_bit_exact():
+    rng = random.Random(11)
+    for _ in range(40):
+        a, b = rng.getrandbits(32), rng.getrandbits(32)
+        for fn in (fadd_f32, fsub_f32, fmul_f32):
+            (rl, fl), (rv, fv) = fn(bits(a, 32), bits(b, 32)), fn(BitVector(32, a), BitVector(32, b))
+            _same(rl, rv); assert fl == fv
+        a, b = rng.getrandbits(64), rng.getrandbits(64)
+        for fn in (fadd_f64, fmul_f64):
+            (rl, fl), (rv, fv) = fn(bits(a, 64), bits(b, 64)), fn(BitVector(64, a), BitVector(64, b))
+            _same(rl, rv); assert fl == fv
+
+def test_mul_trace_matches():
+    a, b = bits(0x0000000D, 32), bits(0xFFFFFFF3, 32)
+    _, _, tl = mul_low32(a, b, trace=True)
+    _, _, tv = mul_low32(BitVector.from_list(a), BitVector.from_list(b), trace=True)
+    assert tl == tv
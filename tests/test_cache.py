@@ -0,0 +1,117 @@
+# tests/test_cache.py
+import random
+import pytest
+from cpu import CPU, InstrMemory, DataMemory
+from cache import Cache, CacheHierarchy
+import rvasm
+from rvasm import lw, sw, add, addi, bne, HALT, loop_program
+
+class RefCache:
+    """Straightforward list-of-sets LRU model to check the array version."""
+    def __init__(self, sets, assoc, line):
+        self.sets = [[] for _ in range(sets)]
+        self.assoc, self.line = assoc, line
+        self.hits = self.misses = self.evictions = 0
+
+    def access(self, addr):
+        ln = addr // self.line
+        s = self.sets[ln % len(self.sets)]
+        if ln in s:
+            s.remove(ln)
+            s.append(ln)
+            self.hits += 1
+            return
+        self.misses += 1
+        if len(s) == self.assoc:
+            s.pop(0)
+            self.evictions += 1
+        s.append(ln)
+
+@pytest.mark.parametrize('assoc', [1, 2, 4, 8])
+def test_lru_matches_reference_model(assoc):
+    rng = random.Random(assoc)
+    c = Cache(size=1024, assoc=assoc, line_size=16)
+    ref = RefCache(1024 // (16 * assoc), assoc, 16)
+    for _ in range(5000):
+        a = rng.choice((rng.randrange(4096), rng.randrange(256)))
+        assert c.access(a) == (a // 16 in ref.sets[(a // 16) % len(ref.sets)])
+        ref.access(a)
+    assert (c.hits, c.misses, c.evictions) == (ref.hits, ref.misses, ref.evictions)
+
+def test_plru_and_random_policies():
+    A, B, C, D, E = (i * 64 for i in range(5))   # 4 sets of 16-byte lines: all in set 0
+    plru = Cache(size=256, assoc=4, line_size=16, policy='plru')
+    for a in (A, B, C, D, A, E):
+        plru.access(a)
+    # the tree points away from A (last) and D (its subtree's last), so C goes
+    assert sorted(plru.resident) == sorted(x // 16 for x in (A, B, D, E))
+    rnd = Cache(size=256, assoc=4, line_size=16, policy='random', seed=3)
+    for a in (A, B, C, D, E):
+        rnd.access(a)
+    assert rnd.evictions == 1 and len(rnd.resident) == 4 and E // 16 in rnd.resident
+
+def test_write_back_vs_write_through():
+    l2 = Cache(size=4096, assoc=4, line_size=16, name='L2')
+    wb = Cache(size=64, assoc=1, line_size=16, next_level=l2)
+    for a in (0, 0, 4, 64, 128):      # 0, 64, 128 share set 0
+        wb.access(a, write=True)
+    assert wb.writebacks == 2 and wb.evictions == 2
+    l2b = Cache(size=4096, assoc=4, line_size=16, name='L2')
+    wt = Cache(size=64, assoc=1, line_size=16, write_back=False, next_level=l2b)
+    for a in (0, 0, 4, 64):
+        wt.access(a, write=True)
+    assert wt.writebacks == 0 and wt.misses == 4 and wt.hits == 0   # no write-allocate
+    assert l2b.hits + l2b.misses == 4
+
+def test_bad_geometry():
+    with pytest.raises(ValueError):
+        Cache(size=1000, assoc=2, line_size=16)
+    with pytest.raises(ValueError):
+        Cache(policy='fifo')
+
+def test_attached_hierarchy_counts_and_preserves_results():
+    words = rvasm.li(1, 64) + rvasm.li(2, 0x10000) + [
+        lw(3, 2, 0), add(4, 4, 3), sw(4, 2, 4), addi(2, 2, 8), addi(1, 1, -1), bne(1, 0, -20), HALT]
+    plain = CPU(InstrMemory(list(words)), DataMemory())
+    plain.run()
+    cpu = CPU(InstrMemory(list(words)), DataMemory())
+    hier = CacheHierarchy(l1d=dict(size=256, assoc=2, line_size=32), l2={})
+    hier.attach(cpu)
+    cpu.run()
+    assert cpu.regs.regs == plain.regs.regs
+    rep = hier.report()
+    d = rep['L1D']
+    assert d['accesses'] == 128 and d['misses'] == 64 * 8 // 32
+    assert rep['L1I']['accesses'] == cpu.step_count
+    assert d['top_pcs'][0]['pc'] == 16 and d['top_pcs'][0]['misses'] == 16
+    assert list(d['regions']) == [0x10000]
+    assert rep['L2']['misses'] > 0
+    hier.detach()
+    assert isinstance(cpu.dmem, DataMemory)
+
+def test_block_mode_charges_data_accesses_to_their_pc():
+    words = rvasm.li(1, 64) + rvasm.li(2, 0x10000) + [
+        lw(3, 2, 0), add(4, 4, 3), sw(4, 2, 4), addi(2, 2, 8), addi(1, 1, -1), bne(1, 0, -20), HALT]
+    per_pc = []
+    for blocks in (False, True):
+        cpu = CPU(InstrMemory(list(words)), DataMemory())
+        hier = CacheHierarchy(l1d=dict(size=256, assoc=2, line_size=32, track_hits=True))
+        hier.attach(cpu)
+        if blocks:
+            with pytest.warns(RuntimeWarning, match='L1I'):
+                cpu.run(100, blocks=True)
+            cpu.run(blocks=True)              # warns once per attach
+        else:
+            cpu.run()
+        per_pc.append(hier.l1d.per_pc)
+    assert per_pc[0] == per_pc[1]
+    assert sorted(per_pc[1]) == [0x10, 0x18]
+
+def test_track_hits_per_pc():
+    cpu = CPU(InstrMemory(loop_program(5)), DataMemory())
+    hier = CacheHierarchy(l1i=dict(track_hits=True))
+    hier.attach(cpu)
+    cpu.run()
+    h, m, e = hier.l1i.per_pc[0x0C]
+    assert h + m == 5
+    assert hier.l1i.hits + hier.l1i.misses == cpu.step_count
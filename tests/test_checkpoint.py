@@ -0,0 +1,132 @@
+# tests/test_checkpoint.py
+import pytest
+from cpu import CPU, InstrMemory, DataMemory, PAGE_SIZE
+from checkpoint import Checkpoint, Checkpointer, snapshot, restore, first_divergence
+from rvasm import li, addi, sw, bne, jal, fmv_w_x, fadd_s, HALT
+
+def fill_program(n, last=1):
+    """Store n..1 to consecutive words from 0x10000 (crossing pages), then
+    x5 = last."""
+    return li(2, 0x10000) + li(1, n) + [
+        sw(1, 2, 0), addi(2, 2, 4), addi(1, 1, -1), bne(1, 0, -12),   # 0x10..0x1C
+        fmv_w_x(1, 2), fadd_s(2, 1, 1),
+        addi(5, 0, last), HALT]
+
+def new_cpu(n=3000, last=1, **kw):
+    return CPU(InstrMemory(fill_program(n, last)), DataMemory(), **kw)
+
+def test_restore_and_resume_matches_uninterrupted_run():
+    ref = new_cpu()
+    ref.run(10 ** 6)
+    cpu = new_cpu()
+    cpu.run(5000)
+    ck = snapshot(cpu)
+    cpu.run(10 ** 6)
+    restore(cpu, ck)
+    assert (cpu.pc, cpu.step_count, cpu.running) == (ck.pc, 5000, True)
+    cpu.run(10 ** 6, blocks=True)
+    assert snapshot(cpu).same_state(snapshot(ref))
+    assert cpu.step_count == ref.step_count and cpu.fregs.regs == ref.fregs.regs
+
+def test_binary_round_trip(tmp_path):
+    cpu = new_cpu()
+    cpu.run(10 ** 6)
+    ck = snapshot(cpu)
+    assert len(ck.pages) == 3                  # 12000 bytes of stores
+    blob = ck.to_bytes()
+    assert len(blob) < len(ck.pages) * PAGE_SIZE // 2
+    back = Checkpoint.from_bytes(blob)
+    assert back.same_state(ck)
+    assert (back.step_count, back.extra_cycles, back.halt_reason) == \
+        (ck.step_count, ck.extra_cycles, "halt")
+    path = str(tmp_path / 'ck.bin')
+    ck.save(path)
+    assert Checkpoint.load(path).same_state(ck)
+    with pytest.raises(ValueError):
+        Checkpoint.from_bytes(b'RVCK' + bytes(8))
+
+def test_periodic_checkpoints_share_unchanged_pages():
+    cpu = new_cpu()
+    ckr = Checkpointer(cpu, every=1000)
+    ckr.run(10 ** 6)
+    steps = [c.step_count for c in ckr.checkpoints]
+    assert steps == list(range(0, cpu.step_count, 1000))
+    a, b = ckr.checkpoints[5], ckr.checkpoints[8]   # page 0x10 full, 0x11 written
+    assert a.pages[0x10] is b.pages[0x10]
+    assert a.pages[0x11] is not b.pages[0x11]
+    with pytest.raises(ValueError):
+        Checkpointer(cpu, every=0)
+
+def test_keep_bounds_the_series():
+    ckr = Checkpointer(new_cpu(), every=500, keep=4)
+    ckr.run(10 ** 6)
+    assert len(ckr.checkpoints) == 4
+    with pytest.raises(ValueError):
+        ckr.nearest(100)
+
+def test_fast_forward_into_a_variant_cpu():
+    cpu = new_cpu()
+    ckr = Checkpointer(cpu, every=1000)
+    ckr.run(10 ** 6)
+    ref = new_cpu()
+    ref.run(7777)
+    other = new_cpu(backend='reference', mul_latency=5)
+    ckr.fast_forward(other, 7777)
+    assert other.step_count == 7777
+    assert snapshot(other).same_state(snapshot(ref))
+
+def test_restore_undoes_code_writes():
+    cpu = new_cpu(50)
+    ck = snapshot(cpu)
+    cpu.run(10)
+    cpu.imem.store_word(0x10, addi(9, 0, 1))   # overwrite the loop's sw
+    cpu.run(10 ** 6)
+    assert cpu.regs.regs[9] == 1
+    restore(cpu, ck)
+    cpu.run(10 ** 6, blocks=True)
+    ref = new_cpu(50)
+    ref.run(10 ** 6)
+    assert snapshot(cpu).same_state(snapshot(ref))
+
+class FlakyMemory(DataMemory):
+    """Flips bit 0 of one store: a stand-in for a model bug."""
+    def store_word(self, addr, value):
+        super().store_word(addr, value ^ 1 if addr == 0x10000 + 4 * 2000 else value)
+
+def test_first_divergence_bisects_to_the_exact_step():
+    cpu_a = new_cpu()
+    cpu_b = CPU(InstrMemory(fill_program(3000)), FlakyMemory())
+    ck_a, ck_b = Checkpointer(cpu_a, every=700), Checkpointer(cpu_b, every=700)
+    ck_a.run(10 ** 6)
+    ck_b.run(10 ** 6)
+    assert first_divergence(cpu_a, ck_a, cpu_b, ck_b) == 4 + 4 * 2000 + 1   # that sw
+    cpu_c = new_cpu()
+    ck_c = Checkpointer(cpu_c, every=700)
+    ck_c.run(10 ** 6)
+    assert first_divergence(cpu_a, ck_a, cpu_c, ck_c) is None
+    cpu_d = new_cpu(last=2)
+    assert first_divergence(cpu_a, ck_a, cpu_d, Checkpointer(cpu_d)) is None   # nothing taken
+
+def spin_program():
+    """Never halts: store x1 to consecutive words from 0x10000, forever."""
+    return li(2, 0x10000) + [sw(1, 2, 0), addi(2, 2, 4), addi(1, 1, 1), jal(0, -12)]
+
+class LateFlakyMemory(DataMemory):
+    def store_word(self, addr, value):
+        super().store_word(addr, value ^ 1 if addr == 0x10000 + 4 * 220 else value)
+
+def test_first_divergence_on_runs_that_never_halt():
+    def checkpointed(dmem):
+        cpu = CPU(InstrMemory(spin_program()), dmem)
+        ck = Checkpointer(cpu, every=300)
+        ck.run(1000)
+        return cpu, ck
+    cpu_a, ck_a = checkpointed(DataMemory())
+    cpu_b, ck_b = checkpointed(DataMemory())
+    assert first_divergence(cpu_a, ck_a, cpu_b, ck_b) is None
+    assert cpu_a.step_count == 1000 and cpu_a.running
+    cpu_c, ck_c = checkpointed(LateFlakyMemory())    # after the last checkpoint
+    assert first_divergence(cpu_a, ck_a, cpu_c, ck_c) == 3 + 4 * 220
+    cpu_a, ck_a = checkpointed(DataMemory())
+    cpu_c, ck_c = checkpointed(LateFlakyMemory())
+    assert first_divergence(cpu_a, ck_a, cpu_c, ck_c, max_steps=850) is None
@@ -0,0 +1,157 @@
+# tests/test_cosim.py
+import pytest
+from cpu import CPU, InstrMemory, DataMemory
+from cosim import CoSim, RefInterpreter, CommitLog, cpu_commit, parse_commit_line
+from rvasm import (li, add, sub, addi, andi, xori, slli, srai, lw, lb, lhu, sw, sb, sh,
+                   mul, mulh, div, remu, bne, jal, jalr, lui, auipc,
+                   fmv_w_x, fadd_s, fsw, csrrs, HALT)
+
+STEPS_PER_CALL = 22
+
+def make(n=300, dmem=None):
+    """Loop calling a function that mixes ALU, memory and M ops, then a few
+    F and CSR instructions."""
+    code = li(2, 0x10000) + li(1, n) + [
+        jal(6, 0x28),                                   # 0x10: call 0x38
+        addi(2, 2, 8), addi(1, 1, -1), bne(1, 0, -12),  # 0x14..0x1C
+        fmv_w_x(1, 1), fadd_s(2, 1, 1), fsw(2, 2, 0),   # 0x20..0x28
+        csrrs(15, 1, 0), lui(17, 0xABCDE), HALT,        # 0x2C..0x34
+        mul(3, 1, 1), sw(3, 2, 0), lw(16, 2, 0), lb(4, 2, 0), sh(4, 2, 4), lhu(5, 2, 4),
+        div(7, 3, 1), remu(8, 3, 1), mulh(9, 3, 3), srai(10, 3, 3), xori(11, 10, -1),
+        sub(12, 11, 5), andi(12, 12, 0x7F), slli(12, 12, 2), sb(12, 2, 7),
+        auipc(13, 1), add(14, 14, 16),
+        jalr(0, 6, 0),
+    ]
+    return CPU(InstrMemory(code), dmem or DataMemory())
+
+def lw_step(i):
+    """Step count just after the lw of loop iteration i."""
+    return 4 + STEPS_PER_CALL * i + 4
+
+def sb_step(i):
+    return 4 + STEPS_PER_CALL * i + 16
+
+class FlakyLoad(DataMemory):
+    """Corrupts one load: a stand-in for a bug in the model."""
+    def load_word(self, addr):
+        v = super().load_word(addr)
+        return v ^ 0x100 if addr == 0x10000 + 8 * 200 else v
+
+class FlakyStore(DataMemory):
+    """Corrupts one byte store that is never read back."""
+    def store_byte(self, addr, value):
+        super().store_byte(addr, value ^ 1 if addr == 0x10000 + 8 * 123 + 7 else value)
+
+def test_clean_run_agrees_in_lockstep():
+    cpu = make()
+    ref = RefInterpreter.from_cpu(cpu)
+    sim = CoSim(cpu, ref)
+    assert sim.run(10 ** 6) is None
+    assert cpu.halt_reason == 'halt'
+    assert sim.checked == cpu.step_count == 4 + STEPS_PER_CALL * 300 + 6
+    assert ref.adopted == 4                 # fmv, fadd, fsw, csrrs
+    assert ref.regs == cpu.regs.regs
+
+def test_lockstep_stops_at_the_first_divergence():
+    cpu = make(dmem=FlakyLoad())
+    div = CoSim(cpu, RefInterpreter.from_cpu(make())).run(10 ** 6)
+    assert (div.step, div.pc, div.inst) == (lw_step(200), 0x40, lw(16, 2, 0))
+    expect = (300 - 200) ** 2
+    assert div.diffs == [('x16', expect ^ 0x100, expect)]
+    assert cpu.step_count == lw_step(200)
+    text = str(div)
+    assert 'step %d' % lw_step(200) in text and 'x16' in text
+    assert div.report()['diffs'][0]['ref'] == expect
+
+def test_sampling_finds_the_same_instruction():
+    cpu = make(dmem=FlakyLoad())
+    sim = CoSim(cpu, RefInterpreter.from_cpu(make()), sample_every=1000, blocks=True)
+    div = sim.run(10 ** 6)
+    assert div.step == lw_step(200) and div.diffs[0][0] == 'x16'   # x14 keeps it
+    assert sim.samples == lw_step(200) // 1000
+    assert sim.checked < 1000
+
+    cpu = make()
+    sim = CoSim(cpu, RefInterpreter.from_cpu(cpu), sample_every=500)
+    assert sim.run(10 ** 6) is None and cpu.halt_reason == 'halt'
+    assert sim.samples > 0 and sim.checked < cpu.step_count
+
+def test_sampling_sees_memory_only_divergence():
+    cpu = make(dmem=FlakyStore())
+    assert CoSim(cpu, RefInterpreter.from_cpu(make())).run(10 ** 6) is None
+    cpu = make(dmem=FlakyStore())
+    div = CoSim(cpu, RefInterpreter.from_cpu(make()), sample_every=700).run(10 ** 6)
+    assert div.inst is None and div.step == -(-sb_step(123) // 700) * 700
+    assert div.diffs[0][0] == 'mem[0x%08X]' % (0x10000 + 8 * 123 + 7)
+
+def test_shift_decode_ignores_funct7_bit_25():
+    cpu = CPU(InstrMemory(li(1, -16) + [slli(2, 1, 3) | 1 << 25, srai(3, 1, 2) | 1 << 25, HALT]),
+              DataMemory())
+    assert CoSim(cpu, RefInterpreter.from_cpu(cpu)).run(100) is None
+    assert (cpu.regs.read(2), cpu.regs.read(3)) == (0xFFFFFF80, 0xFFFFFFFC)
+
+def test_bad_interval():
+    with pytest.raises(ValueError):
+        CoSim(make(), None, sample_every=0)
+
+# ---- spike commit logs ----
+
+def test_parse_commit_line():
+    c = parse_commit_line('core   0: 3 0x80000010 (0x00b52023) mem 0x80001000 0x0000002a')
+    assert (c.pc, c.inst, c.regs, c.stores) == (0x80000010, 0x00b52023, (), ((0x80001000, 4, 42),))
+    c = parse_commit_line('core   0: 3 0x0000000080000014 (0x00052583) x11 0xffffffff80000001 '
+                          'mem 0x0000000080001000')
+    assert c.regs == (('x11', 0x80000001),) and c.stores == ()
+    c = parse_commit_line('core   0: 3 0x80000018 (0x00101073) c1_fflags 0x00000000 x0  0x00000000')
+    assert c.regs == () and c.halted is None
+    assert parse_commit_line('core   0: 0x80000018 (0x00101073) csrw fflags, zero') is None
+
+def write_log(path, cpu, tamper_step=None):
+    lines = []
+
+    class Logger:
+        def retire(self, cpu, d, pc, a, b):
+            c = cpu_commit(cpu, d, pc, a, b)
+            line = 'core   0: 3 0x%08x (0x%08x)' % (c.pc, c.inst)
+            for name, v in c.regs:
+                line += ' %-3s 0x%0*x' % (name, 16 if name[0] == 'f' else 8, v)
+            for addr, size, v in c.stores:
+                if cpu.step_count == tamper_step:
+                    v ^= 4
+                line += ' mem 0x%08x 0x%0*x' % (addr, 2 * size, v)
+            lines.append(line)
+
+    cpu.run_observed(10 ** 6, [Logger()])
+    path.write_text('\n'.join(['bbl loader'] + lines) + '\n')
+
+@pytest.mark.parametrize('sample_every', [1, 400])
+def test_commit_log_reference(tmp_path, sample_every):
+    p = tmp_path / 'spike.log'
+    write_log(p, make(50))
+    log = CommitLog(str(p))
+    cpu = make(50)
+    sim = CoSim(cpu, log, sample_every=sample_every)
+    assert sim.run(10 ** 6) is None and not sim.exhausted
+    log.close()
+
+    write_log(p, make(50), tamper_step=sb_step(20))
+    cpu = make(50)
+    div = CoSim(cpu, CommitLog(str(p)), sample_every=sample_every).run(10 ** 6)
+    assert div.step == sb_step(20) and div.diffs[0][0] == 'stores'
+
+def test_commit_log_running_out(tmp_path):
+    p = tmp_path / 'short.log'
+    write_log(p, make(50))
+    p.write_text('\n'.join(p.read_text().splitlines()[:101]) + '\n')
+    cpu = make(50)
+    sim = CoSim(cpu, CommitLog(str(p)))
+    assert sim.run(10 ** 6) is None and sim.exhausted and sim.checked == 100
+
+@pytest.mark.parametrize('unified', [False, True])
+def test_stores_into_code_follow_the_memory_model(unified):
+    # rewrites the addi at 0x0C; it only runs patched with unified memory
+    code = li(5, addi(3, 0, 7)) + [sw(5, 0, 0x0C), addi(3, 0, 1), HALT]
+    cpu = CPU(InstrMemory(code), DataMemory(), unified_memory=unified)
+    sim = CoSim(cpu, RefInterpreter.from_cpu(cpu))
+    assert sim.run(100) is None
+    assert cpu.regs.read(3) == (7 if unified else 1)
@@ -0,0 +1,162 @@
+# tests/test_cpu.py
+from cpu import CPU, InstrMemory, DataMemory, load_hex_file, predecode
+import random
+import rvasm
+from rvasm import addi, lui, sw, srai, HALT, loop_program
+
+def run_words(words, max_steps=100000, **kw):
+    cpu = CPU(InstrMemory(list(words)), DataMemory(), **kw)
+    cpu.run(max_steps)
+    return cpu
+
+def test_base_program():
+    cpu = run_words(load_hex_file('test_base.hex'))
+    r = cpu.regs.regs
+    assert r[1:7] == [5, 10, 15, 15, 0x10000, 2]
+    assert cpu.dmem.load_word(0x10000) == 15
+
+def test_loop_program():
+    cpu = run_words(loop_program(100))
+    assert cpu.regs.read(3) == 5050
+
+def test_predecode_record():
+    d = predecode(addi(5, 6, -3))
+    assert (d.opcode, d.rd, d.rs1, d.imm) == (0x13, 5, 6, 0xFFFFFFFD)
+
+PATCH_PROGRAM = [
+    lui(5, 0x700),
+    addi(5, 5, 0x193),   # x5 = encoding of addi x3,x0,7
+    sw(5, 0, 16),        # patch the word at 0x10
+    rvasm.lw(6, 0, 16),
+    addi(3, 0, 1),       # replaced before it executes with unified memory
+    HALT,
+]
+
+def test_store_into_code_invalidates_predecode():
+    imem = InstrMemory(list(PATCH_PROGRAM))
+    for pc in range(0, 4 * len(PATCH_PROGRAM), 4):
+        imem.fetch_decoded(pc)   # warm every record first
+    cpu = CPU(imem, DataMemory(), unified_memory=True)
+    cpu.run()
+    assert cpu.regs.read(3) == 7 and cpu.regs.read(6) == addi(3, 0, 7)
+
+def test_separate_memories_by_default():
+    for blocks in (False, True):
+        cpu = CPU(InstrMemory(list(PATCH_PROGRAM)), DataMemory())
+        cpu.run(blocks=blocks)
+        assert cpu.regs.read(3) == 1 and cpu.regs.read(6) == addi(3, 0, 7)
+        assert cpu.imem.words == PATCH_PROGRAM
+    ref = CPU(InstrMemory(list(PATCH_PROGRAM)), DataMemory())
+    ref.run_reference()
+    assert ref.regs.read(3) == 1
+
+def test_srai_uses_funct7():
+    cpu = run_words(rvasm.li(1, 0x80000010) + [srai(2, 1, 4), HALT])
+    assert cpu.regs.read(2) == 0xF8000001
+
+def test_shift_decode_ignores_funct7_bit_25():
+    # bit 25 is shamt[5] on RV64; RV32 decodes srli/srai on funct7 & 0x7E
+    words = rvasm.li(1, 0x80000010) + [rvasm.srli(2, 1, 4) | 1 << 25,
+                                       srai(3, 1, 4) | 1 << 25, HALT]
+    for run in ('run', 'run_blocks', 'run_reference'):
+        cpu = CPU(InstrMemory(list(words)), DataMemory())
+        getattr(cpu, run)()
+        assert (cpu.regs.read(2), cpu.regs.read(3)) == (0x08000001, 0xF8000001), run
+
+def random_alu_program(rng, n):
+    ops = [rvasm.add, rvasm.sub, rvasm.and_, rvasm.or_, rvasm.xor,
+           rvasm.sll, rvasm.srl, rvasm.sra]
+    iops = [rvasm.addi, rvasm.andi, rvasm.ori, rvasm.xori]
+    shifts = [rvasm.slli, rvasm.srli, rvasm.srai]
+    words = []
+    for r in range(1, 8):
+        words += rvasm.li(r, rng.getrandbits(32))
+    for _ in range(n):
+        kind = rng.randrange(3)
+        rd, rs1, rs2 = rng.randrange(8), rng.randrange(8), rng.randrange(8)
+        if kind == 0:
+            words.append(rng.choice(ops)(rd, rs1, rs2))
+        elif kind == 1:
+            words.append(rng.choice(iops)(rd, rs1, rng.randrange(-2048, 2048)))
+        else:
+            words.append(rng.choice(shifts)(rd, rs1, rng.randrange(32)))
+    return words + [HALT]
+
+def test_table_dispatch_matches_reference():
+    rng = random.Random(1234)
+    for _ in range(20):
+        words = random_alu_program(rng, 60)
+        a = CPU(InstrMemory(list(words)), DataMemory())
+        b = CPU(InstrMemory(list(words)), DataMemory())
+        a.run()
+        b.run_reference()
+        assert a.regs.regs == b.regs.regs
+        assert (a.pc, a.step_count) == (b.pc, b.step_count)
+
+def random_branchy_program(rng, body_len, iters):
+    """Loop of random ALU/lw/sw ops with forward skips; x7 = data base, x8 = counter."""
+    words = []
+    for r in range(1, 7):
+        words += rvasm.li(r, rng.getrandbits(32))
+    words += rvasm.li(7, 0x1000) + rvasm.li(8, iters)
+    body = []
+    for i in range(body_len):
+        k = rng.randrange(6)
+        rd, rs1, rs2 = rng.randrange(1, 7), rng.randrange(8), rng.randrange(8)
+        if k == 0:
+            ld = rng.choice([rvasm.lb, rvasm.lh, rvasm.lw, rvasm.lbu, rvasm.lhu])
+            body.append(ld(rd, 7, rng.randrange(32)))
+        elif k == 1:
+            st = rng.choice([rvasm.sb, rvasm.sh, rvasm.sw])
+            body.append(st(rs2, 7, rng.randrange(32)))
+        elif k == 2 and i < body_len - 3:
+            br = rng.choice([rvasm.beq, rvasm.bne])
+            body.append(br(rs1, rs2, 4 * rng.randrange(1, 3)))
+        else:
+            body.extend(random_alu_program(rng, 1)[-2:-1])
+    body.append(rvasm.addi(8, 8, -1))
+    body.append(rvasm.bne(8, 0, -4 * len(body)))
+    return words + body + [HALT]
+
+def test_block_engine_matches_interpreter():
+    rng = random.Random(99)
+    for _ in range(15):
+        words = random_branchy_program(rng, 24, 20)
+        cpus = [CPU(InstrMemory(list(words)), DataMemory()) for _ in range(3)]
+        cpus[0].run()
+        cpus[1].run(blocks=True)
+        cpus[2].run_reference()
+        for c in cpus[1:]:
+            assert c.regs.regs == cpus[0].regs.regs
+            assert (c.pc, c.step_count) == (cpus[0].pc, cpus[0].step_count)
+            assert c.dmem.pages == cpus[0].dmem.pages
+
+def test_block_engine_honours_max_steps():
+    a = CPU(InstrMemory(loop_program(1000)), DataMemory())
+    b = CPU(InstrMemory(loop_program(1000)), DataMemory())
+    a.run(max_steps=777)
+    b.run(max_steps=777, blocks=True)
+    assert a.step_count == b.step_count == 777
+    assert (a.pc, a.regs.regs) == (b.pc, b.regs.regs)
+
+def test_block_engine_store_into_code():
+    # each pass rewrites the addi at 0x18 to add one more to x3
+    patched = rvasm.addi(3, 3, 2)
+    words = rvasm.li(5, patched) + [
+        addi(4, 0, 3),           # 0x08: x4 = 3 passes
+        addi(0, 0, 0),
+        addi(0, 0, 0),
+        addi(0, 0, 0),
+        addi(3, 3, 1),           # 0x18: replaced after the first pass
+        sw(5, 0, 0x18),
+        addi(4, 4, -1),
+        rvasm.bne(4, 0, -12),
+        HALT,
+    ]
+    a = run_words(words, unified_memory=True)
+    b = CPU(InstrMemory(list(words)), DataMemory(), unified_memory=True)
+    b.run(blocks=True)
+    c = CPU(InstrMemory(list(words)), DataMemory(), unified_memory=True)
+    c.run_reference()
+    assert a.regs.read(3) == b.regs.read(3) == c.regs.read(3) == 1 + 2 + 2
+    assert run_words(words).regs.read(3) == 3
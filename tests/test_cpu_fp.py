@@ -0,0 +1,128 @@
+# tests/test_cpu_fp.py
+import struct
+import pytest
+from cpu import CPU, InstrMemory, DataMemory, CANONICAL_NAN_S
+import rvasm
+from rvasm import (flw, fld, fsw, fsd, fadd_s, fadd_d, fsub_s, fmul_s, fmul_d, fdiv_s,
+                   fsqrt_s, fsqrt_d, fsgnjn_s, fmv_x_w, fmv_w_x, fmadd_s, fmadd_d, fnmsub_s,
+                   csrrw, csrrs, csrrwi, addi, HALT)
+
+BASE = 0x10000
+
+def f32(x): return struct.unpack('<I', struct.pack('<f', x))[0]
+def f64(x): return struct.unpack('<Q', struct.pack('<d', x))[0]
+def f32_round(x): return struct.unpack('<f', struct.pack('<f', x))[0]
+
+def run(words, data=(), backend=None, max_steps=1000):
+    dmem = DataMemory()
+    for i, w in enumerate(data):
+        dmem.store_word(BASE + 4 * i, w)
+    cpu = CPU(InstrMemory(rvasm.li(1, BASE) + list(words) + [HALT]), dmem, backend=backend)
+    cpu.run(max_steps)
+    return cpu
+
+@pytest.mark.parametrize('backend', [None, 'reference', 'fast'])
+def test_single_arith_and_store(backend):
+    cpu = run([flw(1, 1, 0), flw(2, 1, 4), fadd_s(3, 1, 2), fmul_s(4, 3, 2),
+               fsub_s(5, 4, 1), fsw(5, 1, 8), fmv_x_w(6, 3)],
+              [f32(0.1), f32(0.2)], backend)
+    assert cpu.regs.read(6) == 0x3E99999A
+    a, b = f32_round(0.1), f32_round(0.2)
+    expect = f32_round(f32_round(f32_round(a + b) * b) - a)
+    assert cpu.dmem.load_word(BASE + 8) == f32(expect)
+    assert cpu.fflags == 0x01          # NX only
+    assert cpu.fregs.regs[3] >> 32 == 0xFFFFFFFF
+
+def test_double_load_fma_store():
+    data = []
+    for v in (1.5, 2.25, -0.125):
+        b = f64(v)
+        data += [b & 0xFFFFFFFF, b >> 32]
+    cpu = run([fld(1, 1, 0), fld(2, 1, 8), fld(3, 1, 16), fmadd_d(4, 1, 2, 3),
+               fmul_d(5, 1, 2), fsqrt_d(6, 2), fsd(4, 1, 24)], data)
+    assert cpu.fregs.read_d(4) == f64(1.5 * 2.25 - 0.125)
+    assert cpu.fregs.read_d(5) == f64(1.5 * 2.25)
+    assert cpu.fregs.read_d(6) == f64(1.5)
+    lo, hi = cpu.dmem.load_word(BASE + 24), cpu.dmem.load_word(BASE + 28)
+    assert (hi << 32) | lo == f64(3.25)
+    assert cpu.fflags == 0
+
+def test_nan_boxing():
+    # a double in f1 is not a valid single: single ops see the canonical NaN
+    data = [0, 0x3FF00000, f32(1.0)]
+    cpu = run([fld(1, 1, 0), flw(2, 1, 8), fadd_s(3, 1, 2), fmv_x_w(4, 3)], data)
+    assert cpu.regs.read(4) == CANONICAL_NAN_S
+
+def test_rounding_mode_static_and_dynamic():
+    data = [f32(1.0), f32(3.0)]
+    rtz = run([flw(1, 1, 0), flw(2, 1, 4), fdiv_s(3, 1, 2, rm=1), fmv_x_w(5, 3)], data)
+    assert rtz.regs.read(5) == 0x3EAAAAAA
+    dyn = run([csrrwi(0, 0x002, 3), flw(1, 1, 0), flw(2, 1, 4), fdiv_s(3, 1, 2),
+               fmv_x_w(5, 3)], data)
+    assert dyn.regs.read(5) == 0x3EAAAAAB and dyn.frm == 3
+
+@pytest.mark.parametrize('backend', [None, 'reference', 'fast'])
+def test_rmm_rounds_ties_away_from_zero(backend):
+    # 1 + 1.5 * 2**-23 is a tie between 1 + ulp and 1 + 2 ulp: RNE picks the
+    # even 1 + 2 ulp as well, 1 + 2**-24 only rounds up under RMM
+    data = [f32(1.0), f32(1.5 * 2.0 ** -23), f32(-2.0 ** -24)]
+    cpu = run([flw(1, 1, 0), flw(2, 1, 4), flw(3, 1, 8), fadd_s(4, 1, 2, rm=4),
+               fsub_s(5, 1, 3, rm=4), fsub_s(6, 1, 3), fmv_x_w(7, 4), fmv_x_w(8, 5),
+               fmv_x_w(9, 6)], data, backend)
+    assert cpu.halt_reason == 'halt'
+    assert cpu.regs.read(7) == 0x3F800002
+    assert (cpu.regs.read(8), cpu.regs.read(9)) == (0x3F800001, 0x3F800000)
+
+def test_reserved_rounding_modes_are_illegal():
+    cpu = run([fadd_s(3, 1, 2, rm=5), addi(7, 0, 1)])
+    assert cpu.halt_reason == 'illegal' and cpu.regs.read(7) == 0
+    cpu = run([csrrwi(0, 0x002, 6), fadd_s(3, 1, 2), addi(7, 0, 1)])
+    assert cpu.halt_reason == 'illegal' and cpu.regs.read(7) == 0
+
+def test_fflags_accrue_and_csr_access():
+    data = [f32(-1.0), 0]
+    cpu = run([flw(1, 1, 0), flw(2, 1, 4), fsqrt_s(3, 1), fdiv_s(4, 1, 2),
+               csrrs(5, 0x003, 0), csrrw(6, 0x001, 0), csrrs(7, 0x001, 0)], data)
+    assert cpu.regs.read(5) == 0x10 | 0x08   # NV from sqrt(-1), DZ from -1/0
+    assert cpu.regs.read(6) == 0x18 and cpu.regs.read(7) == 0
+    assert cpu.fcsr == 0
+
+def test_sign_injection_and_moves():
+    cpu = run(rvasm.li(2, f32(2.5)) + [fmv_w_x(1, 2), fsgnjn_s(3, 1, 1), fnmsub_s(4, 1, 1, 1),
+                                       fmv_x_w(5, 3), fmv_x_w(6, 4)])
+    assert cpu.regs.read(5) == f32(-2.5)
+    assert cpu.regs.read(6) == f32(-(2.5 * 2.5) + 2.5)
+
+def test_unknown_csr_and_ecall_are_illegal():
+    assert run([csrrs(5, 0x300, 0)]).halt_reason == 'illegal'
+    assert run([0x00000073]).halt_reason == 'illegal'
+
+def test_unimplemented_fp_encodings_are_illegal():
+    fcvt_w_s = rvasm._r(0x53, 5, 7, 1, 0, 0x60)
+    cpu = run([fcvt_w_s, addi(7, 0, 1)])
+    assert cpu.halt_reason == 'illegal' and cpu.regs.read(7) == 0
+    for inst in (rvasm._r(0x53, 5, 2, 1, 2, 0x50),     # feq.s
+                 rvasm._r(0x53, 1, 0, 1, 2, 0x14),     # fmin.s
+                 rvasm._r(0x53, 5, 0, 1, 0, 0x71),     # fmv.x.d (RV64 only)
+                 rvasm._i(0x07, 1, 0, 1, 0),           # flw with funct3 0
+                 rvasm._s(0x27, 1, 1, 1, 0)):          # fsw with funct3 1
+        assert run([inst]).halt_reason == 'illegal', hex(inst)
+
+def test_fsqrt_requires_rs2_zero():
+    for op in (fsqrt_s, fsqrt_d):
+        cpu = run([op(3, 1) | 1 << 20, addi(7, 0, 1)])
+        assert cpu.halt_reason == 'illegal' and cpu.regs.read(7) == 0
+        assert run([op(3, 1), addi(7, 0, 1)]).regs.read(7) == 1
+
+def test_backends_agree_on_fma_program():
+    data = [f32(1.1), f32(-3.7), f32(1e-38)]
+    prog = [flw(1, 1, 0), flw(2, 1, 4), flw(3, 1, 8)]
+    for i in range(4, 16):
+        prog.append(fmadd_s(i, i - 3, i - 2, i - 1, rm=i & 3))
+    ref = run(prog, data, 'reference')
+    fast = run(prog, data, 'fast')
+    assert ref.fregs.regs == fast.fregs.regs and ref.fcsr == fast.fcsr
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        CPU(InstrMemory([]), DataMemory(), backend='gpu')
@@ -0,0 +1,71 @@
+# tests/test_cpu_m.py
+import random
+import pytest
+from cpu import CPU, InstrMemory, DataMemory, early_out_div_latency, early_out_mul_latency
+import rvasm
+from rvasm import mul, mulh, mulhsu, mulhu, div, divu, rem, remu, add, HALT
+
+M = 0xFFFFFFFF
+
+def s32(x): return x - (1 << 32) if x & 0x80000000 else x
+
+def expected(op, a, b):
+    sa, sb = s32(a), s32(b)
+    if op is mul: return (sa * sb) & M
+    if op is mulh: return ((sa * sb) >> 32) & M
+    if op is mulhsu: return ((sa * b) >> 32) & M
+    if op is mulhu: return (a * b) >> 32
+    if op in (div, rem):
+        if b == 0: return M if op is div else a
+        if a == 0x80000000 and b == M: return a if op is div else 0
+        q = abs(sa) // abs(sb) * (1 if (sa < 0) == (sb < 0) else -1)
+        return (q if op is div else sa - q * sb) & M
+    if b == 0: return M if op is divu else a
+    return a // b if op is divu else a % b
+
+OPS = [mul, mulh, mulhsu, mulhu, div, divu, rem, remu]
+EDGES = [0, 1, 2, 3, 7, M, M - 1, 0x80000000, 0x7FFFFFFF, 0x80000001, 0x10000]
+
+def run(words, **kw):
+    cpu = CPU(InstrMemory(list(words) + [HALT]), DataMemory(), **kw)
+    cpu.run()
+    return cpu
+
+@pytest.mark.parametrize('backend', ['reference', 'fast'])
+def test_m_ops_match_spec(backend):
+    rng = random.Random(19)
+    pairs = [(a, b) for a in EDGES for b in EDGES[:6]] + \
+            [(rng.getrandbits(32), rng.getrandbits(rng.choice((4, 16, 32)))) for _ in range(30)]
+    for a, b in pairs:
+        words = rvasm.li(1, a) + rvasm.li(2, b) + [op(10 + i, 1, 2) for i, op in enumerate(OPS)]
+        cpu = run(words, backend=backend)
+        got = [cpu.regs.read(10 + i) for i in range(8)]
+        assert got == [expected(op, a, b) for op in OPS], (hex(a), hex(b))
+
+def test_m_writes_to_x0_are_dropped():
+    cpu = run(rvasm.li(1, 6) + [mul(0, 1, 1), div(0, 1, 1)])
+    assert cpu.regs.read(0) == 0
+
+def test_fixed_latencies():
+    words = rvasm.li(1, 100) + rvasm.li(2, 7) + [mul(3, 1, 2), mulhu(4, 1, 2), div(5, 1, 2),
+                                                  add(6, 1, 2)]
+    cpu = run(words, mul_latency=4, div_latency=20)
+    assert cpu.regs.read(3) == 700 and cpu.regs.read(5) == 14
+    assert cpu.cycles == cpu.step_count + 2 * 3 + 19
+
+def test_value_dependent_latencies():
+    small = run(rvasm.li(1, 1000) + rvasm.li(2, 3) + [mul(3, 1, 2), divu(4, 1, 2)],
+                mul_latency=early_out_mul_latency, div_latency=early_out_div_latency)
+    big = run(rvasm.li(1, 0xFFFFFFF0) + rvasm.li(2, 0x12345) + [mul(3, 1, 2), divu(4, 2, 2)],
+              mul_latency=early_out_mul_latency, div_latency=early_out_div_latency)
+    assert small.extra_cycles == (early_out_mul_latency(0, 1000, 3) - 1) + \
+        (early_out_div_latency(5, 1000, 3) - 1)
+    assert early_out_mul_latency(0, 5, 3) < early_out_mul_latency(0, 5, 0x12345678)
+    assert early_out_mul_latency(0, 5, M) == early_out_mul_latency(0, 5, 1)   # -1 is short
+    assert early_out_div_latency(4, 0xFFFFFFF9, 3) == early_out_div_latency(4, 7, 3)
+    assert early_out_div_latency(5, 1, 0) == 2
+    assert big.cycles > big.step_count
+
+def test_integer_only_program_costs_one_cycle_per_instruction():
+    cpu = run(rvasm.loop_program(10))
+    assert cpu.cycles == cpu.step_count
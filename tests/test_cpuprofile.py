@@ -0,0 +1,73 @@
+# tests/test_cpuprofile.py
+import json
+import pytest
+from cpu import CPU, InstrMemory, DataMemory
+from cpuprofile import Profiler, mnemonic
+from rvasm import li, addi, lw, sw, bne, jal, jalr, fadd_d, fmadd_s, HALT
+
+def program():
+    """main calls f three times, f calls g; f spills ra to a stack at 0x20000."""
+    return li(2, 0x20000) + [
+        addi(10, 0, 3),                                         # 0x08
+        jal(1, 0x14), addi(10, 10, -1), bne(10, 0, -8), HALT,   # 0x0C..0x18
+        addi(0, 0, 0),                                          # 0x1C
+        addi(2, 2, -4), sw(1, 2, 0), jal(1, 0x10),              # 0x20 f
+        lw(1, 2, 0), addi(2, 2, 4), jalr(0, 1, 0),
+        lw(11, 0, 0x100), addi(11, 11, 1), sw(11, 0, 0x100),    # 0x38 g
+        jalr(0, 1, 0),
+    ]
+
+def profiled():
+    cpu = CPU(InstrMemory(program()), DataMemory())
+    prof = Profiler(cpu, symbols={0: 'main', 0x20: 'f', 0x38: 'g'})
+    cpu.run(profiler=prof)
+    return cpu, prof
+
+def test_counts_and_results_unchanged():
+    cpu, prof = profiled()
+    plain = CPU(InstrMemory(program()), DataMemory())
+    plain.run()
+    assert cpu.regs.regs == plain.regs.regs and cpu.step_count == plain.step_count == 43
+    assert prof.instructions == 43 and prof.outside == 0
+    assert prof.hot_pcs(3) == [(0x0C, 3), (0x10, 3), (0x14, 3)]
+    assert prof.branches() == [(0x14, 2, 1)]
+    assert prof.address_histogram() == {0: 3, 0x10000: 3}
+    assert prof.address_histogram(stores=True) == {0: 3, 0x10000: 3}
+
+def test_instruction_mix():
+    _, prof = profiled()
+    mix = prof.mix_counts()
+    assert mix == {'lui': 1, 'addi': 14, 'jal': 6, 'bne': 3, 'sw': 6, 'lw': 6, 'jalr': 6,
+                   'halt': 1}
+    assert prof.opcode_counts() == {'lui': 1, 'op-imm': 14, 'jal': 6, 'branch': 3,
+                                    'store': 6, 'load': 6, 'jalr': 6, 'halt': 1}
+    assert mnemonic(0x33, 3, 0x01) == 'mulhu'
+    assert mnemonic(0x53, 1, 0x11) == 'fsgnjn.d'
+    assert mnemonic(fadd_d(1, 2, 3) & 0x7F, 7, 0x01) == 'fadd.d'
+    assert mnemonic(0x43, 7, fmadd_s(1, 2, 3, 4) >> 25) == 'fmadd.s'
+    assert mnemonic(0x33, 2, 0x05) == 'op/2/0x05'
+    assert mnemonic(0x13, 5, 0x21) == 'srai'          # funct7 bit 25 is shamt[5]
+
+def test_folded_stacks(tmp_path):
+    _, prof = profiled()
+    assert prof.folded() == ['main 13', 'main;f 18', 'main;f;g 12']
+    p = tmp_path / 'out.folded'
+    prof.write_folded(str(p))
+    assert p.read_text().splitlines() == prof.folded()
+
+def test_json_export(tmp_path):
+    _, prof = profiled()
+    p = tmp_path / 'profile.json'
+    prof.write_json(str(p), top=2)
+    rep = json.loads(p.read_text())
+    assert rep['instructions'] == 43
+    assert rep['hot_pcs'] == [{'pc': 0x0C, 'count': 3}, {'pc': 0x10, 'count': 3}]
+    assert rep['branches'] == [{'pc': 0x14, 'taken': 2, 'not_taken': 1}]
+    assert rep['loads'] == {'0x00000000': 3, '0x00010000': 3}
+
+def test_reset_and_bad_shift():
+    cpu, prof = profiled()
+    prof.reset()
+    assert prof.instructions == 0 and prof.folded() == [] and not any(prof.pc_counts)
+    with pytest.raises(ValueError):
+        Profiler(cpu, addr_shift=4)
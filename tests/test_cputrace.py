@@ -0,0 +1,83 @@
+# tests/test_cputrace.py
+import pytest
+from cpu import CPU, InstrMemory, DataMemory
+from cputrace import (TraceWriter, read_trace, CLASSES, KIND_RETIRE, KIND_UNIT_STEP,
+                      HAS_RD, MEM_LOAD, MEM_STORE, RECORD, HEADER)
+import rvasm
+from rvasm import addi, lw, sw, sb, mul, divu, beq, HALT, loop_program
+
+def program():
+    return rvasm.li(2, 0x10000) + [
+        addi(1, 0, 0x7F), sb(1, 2, 3), sw(1, 2, 8), lw(3, 2, 8),   # 0x08..0x14
+        addi(4, 0, 6), mul(5, 3, 4), divu(6, 5, 4),                 # 0x18..0x20
+        beq(0, 0, 8), addi(7, 0, 1), HALT]                           # 0x24..0x2C
+
+def run_traced(path, **kw):
+    cpu = CPU(InstrMemory(program()), DataMemory())
+    with TraceWriter(str(path), **kw) as tw:
+        cpu.run(trace=tw)
+    return cpu, tw
+
+@pytest.mark.parametrize('compression', [None, 'gzip'])
+def test_round_trip(tmp_path, compression):
+    cpu, tw = run_traced(tmp_path / 't.bin', compression=compression, buffer_records=4)
+    recs = list(read_trace(str(tmp_path / 't.bin')))
+    assert len(recs) == tw.records == cpu.step_count
+    assert [r.pc for r in recs] == [0, 4, 8, 12, 16, 20, 24, 28, 32, 36, 44]
+    sb_, sw_, lw_ = recs[3], recs[4], recs[5]
+    assert sb_.flags == MEM_STORE and (sb_.addr, sb_.data) == (0x10003, 0x7F)
+    assert sw_.flags == MEM_STORE and (sw_.addr, sw_.data) == (0x10008, 0x7F)
+    assert lw_.flags == HAS_RD | MEM_LOAD and (lw_.rd, lw_.value, lw_.addr) == (3, 0x7F, 0x10008)
+    assert recs[7].value == 0x7F * 6 and CLASSES[recs[7].iclass] == 'mdu'
+    assert CLASSES[recs[9].iclass] == 'branch' and recs[9].flags == 0
+
+def test_filters(tmp_path):
+    p = str(tmp_path / 't.bin')
+    run_traced(p)
+    mem = list(read_trace(p, classes=('load', 'store')))
+    assert [r.pc for r in mem] == [12, 16, 20]
+    assert [r.pc for r in read_trace(p, pc_range=(0x18, 0x24))] == [24, 28, 32]
+    with pytest.raises(ValueError):
+        list(read_trace(p, classes=('vector',)))
+    p2 = str(tmp_path / 'w.bin')
+    run_traced(p2, classes=('mdu',))
+    assert [r.pc for r in read_trace(p2)] == [28, 32]
+
+def test_unit_steps(tmp_path):
+    p = str(tmp_path / 't.bin')
+    run_traced(p, units=True, classes=('mdu',))
+    recs = list(read_trace(p))
+    steps = [r for r in recs if r.kind == KIND_UNIT_STEP]
+    assert [r.kind for r in recs if r.kind == KIND_RETIRE] == [0, 0]
+    assert len(steps) == 32 + 32              # shift-add multiplier, restoring divider
+    mul_steps = [r for r in steps if r.pc == 28]
+    assert mul_steps[-1].value == 0x7F * 6    # accumulator after the last step
+    div_steps = [r for r in steps if r.pc == 32]
+    assert div_steps[-1].data == 0x7F         # quotient register
+    assert {r.flags for r in div_steps} == {1, 2}   # sub / restore actions
+
+def test_bounded_buffer_streams_to_disk(tmp_path):
+    p = tmp_path / 'loop.bin'
+    cpu = CPU(InstrMemory(loop_program(2000)), DataMemory())
+    tw = TraceWriter(str(p), buffer_records=64)
+    cpu.run(trace=tw)
+    assert len(tw._buf) == 64 * RECORD.size
+    # everything but the last partial buffer (and the file's own buffer) is on disk
+    assert p.stat().st_size >= cpu.step_count * RECORD.size - 64 * RECORD.size - 8192
+    tw.close()
+    assert p.stat().st_size == HEADER.size + cpu.step_count * RECORD.size
+    assert sum(1 for _ in read_trace(str(p), chunk_records=7)) == cpu.step_count
+
+def test_bad_inputs(tmp_path):
+    with pytest.raises(ValueError):
+        TraceWriter(str(tmp_path / 'x'), compression='lz4')
+    bogus = tmp_path / 'bogus'
+    bogus.write_bytes(b'hello world')
+    with pytest.raises(ValueError):
+        list(read_trace(str(bogus)))
+
+def test_zstd_round_trip(tmp_path):
+    pytest.importorskip('zstandard')
+    p = str(tmp_path / 't.zst')
+    cpu, _ = run_traced(p, compression='zstd')
+    assert sum(1 for _ in read_trace(p)) == cpu.step_count
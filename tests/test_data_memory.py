@@ -0,0 +1,55 @@
+# tests/test_data_memory.py
+from cpu import CPU, InstrMemory, DataMemory, PAGE_SIZE
+import rvasm
+from rvasm import HALT
+
+def test_little_endian_word_half_byte():
+    m = DataMemory()
+    m.store_word(0x100, 0x11223344)
+    assert m.load_byte(0x100) == 0x44 and m.load_byte(0x103) == 0x11
+    assert m.load_half(0x100) == 0x3344 and m.load_half(0x102) == 0x1122
+    m.store_half(0x102, 0xBEEF)
+    m.store_byte(0x100, 0xAA)
+    assert m.load_word(0x100) == 0xBEEF33AA
+
+def test_misaligned_access_across_page_boundary():
+    m = DataMemory()
+    addr = PAGE_SIZE - 2
+    m.store_word(addr, 0xCAFEF00D)
+    assert m.load_word(addr) == 0xCAFEF00D
+    assert m.load_half(addr + 1) == 0xFEF0
+    assert len(m.pages) == 2
+
+def test_reads_do_not_allocate_pages():
+    m = DataMemory()
+    assert m.load_word(0x80000000) == 0
+    assert m.read_region(0x7FFFFFF0, 64).tobytes() == bytes(64)
+    assert m.pages == {}
+
+def test_region_roundtrip_and_zero_copy_view():
+    m = DataMemory()
+    data = bytes(range(256)) * 40   # spans three pages
+    m.load_region(0x2F00, data)
+    assert m.read_region(0x2F00, len(data)).tobytes() == data
+    view = m.read_region(0x3000, 16)
+    m.store_byte(0x3000, 0x7F)
+    assert view[0] == 0x7F          # live view of the page
+
+def test_cpu_byte_and_half_loads_sign_extend():
+    words = rvasm.li(1, 0x2000) + rvasm.li(2, 0x80FF7F01) + [
+        rvasm.sw(2, 1, 0),
+        rvasm.lb(3, 1, 2),     # 0xFF -> -1
+        rvasm.lbu(4, 1, 2),
+        rvasm.lh(5, 1, 2),     # 0x80FF -> sign-extended
+        rvasm.lhu(6, 1, 2),
+        rvasm.sb(2, 1, 5),
+        rvasm.sh(2, 1, 7),     # misaligned halfword
+        rvasm.lw(7, 1, 4),
+        HALT,
+    ]
+    cpu = CPU(InstrMemory(words), DataMemory())
+    cpu.run()
+    r = cpu.regs.regs
+    assert r[3:7] == [0xFFFFFFFF, 0xFF, 0xFFFF80FF, 0x80FF]
+    assert r[7] == 0x01000100
+    assert cpu.dmem.load_byte(0x2008) == 0x7F
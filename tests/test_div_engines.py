@@ -0,0 +1,105 @@
+import random
+
+import pytest
+
+from src.numeric_core.bitvector import BitVector
+from src.numeric_core.mdu import (DIV_ENGINES, div_rem, div_signed, divu_unsigned,
+                                  rem_signed, remu_unsigned)
+
+ENGINES = sorted(DIV_ENGINES)
+
+
+def bits(x, n=32):
+    return [(x >> (n - 1 - i)) & 1 for i in range(n)]
+
+
+def val(b):
+    return int(''.join(map(str, b)), 2)
+
+
+def sval(b):
+    v = val(b)
+    return v - (1 << len(b)) if b[0] else v
+
+
+def operands(n, count, seed):
+    rnd = random.Random(seed)
+    edge = [0, 1, 2, 3, (1 << n) - 1, (1 << n) - 2, 1 << (n - 1), (1 << (n - 1)) - 1]
+    pairs = [(x, y) for x in edge for y in edge]
+    for _ in range(count):
+        pairs.append((rnd.getrandbits(n), rnd.getrandbits(rnd.randint(1, n))))
+    return pairs
+
+
+def ref_signed(x, y, n):
+    half = 1 << (n - 1)
+    sx = x - (1 << n) if x >= half else x
+    sy = y - (1 << n) if y >= half else y
+    if sy == 0:
+        return (1 << n) - 1, x
+    if sx == -half and sy == -1:
+        return x, 0
+    q = abs(sx) // abs(sy)
+    if (sx < 0) != (sy < 0):
+        q = -q
+    return q % (1 << n), (sx - q * sy) % (1 << n)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('n', [8, 32])
+def test_engines_match_python(engine, n):
+    for x, y in operands(n, 150, n):
+        q, r, flg, _ = div_rem(bits(x, n), bits(y, n), False, engine)
+        if y == 0:
+            assert (val(q), val(r), flg['div_by_zero']) == ((1 << n) - 1, x, 1)
+        else:
+            assert (val(q), val(r)) == (x // y, x % y), (engine, x, y)
+        q, r, flg, _ = div_rem(bits(x, n), bits(y, n), True, engine)
+        assert (val(q), val(r)) == ref_signed(x, y, n), (engine, x, y)
+
+
+@pytest.mark.parametrize('n', [4, 5, 64])
+def test_engines_agree_on_odd_widths(n):
+    for x, y in operands(n, 40, 7):
+        results = {div_rem(bits(x, n), bits(y, n), True, e)[:2].__repr__() for e in ENGINES}
+        assert len(results) == 1, (x, y)
+
+
+def test_overflow_and_wrappers():
+    int_min, neg1 = bits(0x80000000), bits(0xFFFFFFFF)
+    for e in ENGINES:
+        q, r, flg, _ = div_signed(int_min, neg1, engine=e)
+        assert (val(q), val(r), flg) == (0x80000000, 0, {'div_by_zero': 0, 'overflow': 1})
+        a, b = bits(0xFFFFFFF9), bits(2)           # -7, 2
+        assert sval(div_signed(a, b, engine=e)[0]) == -3
+        assert sval(rem_signed(a, b, engine=e)[0]) == -1
+        assert val(divu_unsigned(a, b, engine=e)[0]) == 0xFFFFFFF9 // 2
+        assert val(remu_unsigned(a, b, engine=e)[0]) == 1
+
+
+def test_bitvector_operands_and_traces():
+    a, b = BitVector(32, 1000003), BitVector(32, 977)
+    for e in ENGINES:
+        q, r, _, steps = div_rem(a, b, False, e, trace=True)
+        assert isinstance(q, BitVector)
+        assert (val(q), val(r)) == (1000003 // 977, 1000003 % 977)
+        assert steps and all('rem' in s for s in steps)
+    # SRT retires two quotient bits per step, so it needs far fewer steps
+    srt = div_rem(a, b, False, 'srt4', trace=True)[3]
+    assert len(srt) < len(div_rem(a, b, False, 'restoring', trace=True)[3]) // 2 + 2
+
+
+def test_restoring_divu_keeps_its_original_contract():
+    a, b = bits(13, 4), bits(3, 4)
+    assert divu_unsigned(a, b) == (bits(4, 4), bits(1, 4), {'overflow': 0}, [])
+    assert remu_unsigned(a, b) == (bits(1, 4), {'overflow': 0}, [])
+    steps = divu_unsigned(a, b, trace=True)[3]
+    assert [s['op'] for s in steps] == ['restore', 'sub', 'restore', 'restore']
+    assert steps[1] == {'step': 1, 'rem': [0, 0, 0, 0], 'q': [0, 1, 0, 0], 'op': 'sub'}
+    assert divu_unsigned(a, bits(0, 4)) == ([1] * 4, a, {'div_by_zero': 1}, [])
+    assert divu_unsigned(a, bits(0, 4), trace=True)[3] == \
+        [{'step': 0, 'rem': a, 'q': [1] * 4, 'op': '/0'}]
+    # the other engines report the shared div_rem format
+    for e in ENGINES:
+        if e != 'restoring':
+            assert divu_unsigned(a, b, engine=e)[2:] == ({'div_by_zero': 0, 'overflow': 0}, None)
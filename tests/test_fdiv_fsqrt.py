@@ -0,0 +1,126 @@
+import math
+import random
+import struct
+from fractions import Fraction
+
+import pytest
+
+from src.numeric_core import backend
+from src.numeric_core.fpu import fdiv_f32, fdiv_f64, fsqrt_f32, fsqrt_f64
+
+
+def bits(v, n):
+    return [(v >> (n - 1 - i)) & 1 for i in range(n)]
+
+
+def val(b):
+    v = 0
+    for x in b:
+        v = (v << 1) | x
+    return v
+
+
+def d2b(x):
+    return bits(struct.unpack('<Q', struct.pack('<d', x))[0], 64)
+
+
+def b2d(b):
+    return struct.unpack('<d', struct.pack('<Q', val(b)))[0]
+
+
+def f2b(x):
+    return bits(struct.unpack('<I', struct.pack('<f', x))[0], 32)
+
+
+def b2f(b):
+    return struct.unpack('<f', struct.pack('<I', val(b)))[0]
+
+
+def test_f64_rne_matches_host_for_every_engine():
+    rng = random.Random(23)
+    for _ in range(200):
+        x = rng.uniform(-1, 1) * 2.0 ** rng.randint(-40, 40)
+        y = rng.uniform(-1, 1) * 2.0 ** rng.randint(-40, 40)
+        for engine in ('srt4', 'restoring', 'nonrestoring'):
+            assert b2d(fdiv_f64(d2b(x), d2b(y), engine=engine)[0]) == x / y
+        assert b2d(fsqrt_f64(d2b(abs(x)))[0]) == math.sqrt(abs(x))
+
+
+def test_directed_rounding_brackets_the_exact_result():
+    rng = random.Random(8)
+    for _ in range(100):
+        x, y = rng.uniform(0.5, 100), rng.uniform(-100, -0.5)
+        exact = Fraction(x) / Fraction(y)
+        r = {rm: fdiv_f64(d2b(x), d2b(y), rm)[0] for rm in ('RNE', 'RTZ', 'RUP', 'RDN')}
+        lo, hi = Fraction(b2d(r['RDN'])), Fraction(b2d(r['RUP']))
+        assert lo <= exact <= hi and val(r['RDN']) - val(r['RUP']) in (0, 1)
+        assert r['RTZ'] == r['RUP']                     # negative quotient
+        s, flg = fsqrt_f64(d2b(x), 'RTZ')
+        assert Fraction(b2d(s)) ** 2 <= Fraction(x)
+        assert flg['inexact'] == (0 if Fraction(b2d(s)) ** 2 == Fraction(x) else 1)
+
+
+def test_special_values_and_flags():
+    inf, zero, one = f2b(float('inf')), f2b(0.0), f2b(1.0)
+    r, flg = fdiv_f32(one, zero)
+    assert b2f(r) == float('inf') and flg['div_by_zero'] == 1
+    r, flg = fdiv_f32(f2b(-1.0), zero)
+    assert b2f(r) == float('-inf')
+    for a, b in ((zero, zero), (inf, inf)):
+        r, flg = fdiv_f32(a, b)
+        assert val(r) == 0x7FC00000 and flg['invalid'] == 1
+    assert b2f(fdiv_f32(one, inf)[0]) == 0.0
+    r, flg = fsqrt_f32(f2b(-4.0))
+    assert val(r) == 0x7FC00000 and flg['invalid'] == 1
+    assert val(fsqrt_f32(f2b(-0.0))[0]) == 0x80000000
+    r, flg = fsqrt_f32(f2b(2.25))
+    assert b2f(r) == 1.5 and flg['inexact'] == 0
+    r, flg = fdiv_f32(one, f2b(3.0))
+    assert val(r) == 0x3EAAAAAB and flg['inexact'] == 1
+
+
+# overflow rounds to infinity or to the largest finite value per mode and sign
+OVERFLOW = {('RNE', 0): 0x7F800000, ('RTZ', 0): 0x7F7FFFFF, ('RDN', 0): 0x7F7FFFFF,
+            ('RUP', 0): 0x7F800000, ('RNE', 1): 0xFF800000, ('RTZ', 1): 0xFF7FFFFF,
+            ('RDN', 1): 0xFF800000, ('RUP', 1): 0xFF7FFFFF}
+
+
+@pytest.mark.parametrize('name', ['reference', 'fast'])
+def test_overflow_under_directed_rounding(name):
+    backend.set_backend(name)
+    try:
+        for (rm, s), want in OVERFLOW.items():
+            r, flg = fdiv_f32(bits(0x40342E42 | s << 31, 32), bits(0x00205EB5, 32), rm)
+            assert val(r) == want, (rm, s)
+            assert flg['overflow'] == flg['inexact'] == 1
+        r, _ = fdiv_f64(d2b(-1e300), d2b(1e-300), 'RUP')
+        assert b2d(r) == -1.7976931348623157e308
+    finally:
+        backend.set_backend('reference')
+
+
+def test_step_counter_and_fast_backend():
+    a, b = f2b(3.14159), f2b(2.71828)
+    counts = {}
+    for engine in ('srt4', 'restoring'):
+        st = {}
+        fdiv_f32(a, b, engine=engine, stats=st)
+        fdiv_f32(a, b, engine=engine, stats=st)
+        counts[engine] = st['steps']
+        assert st['ops'] == 2
+    assert counts['srt4'] < counts['restoring'] // 2
+    st = {}
+    fsqrt_f64(d2b(2.0), stats=st)
+    assert st == {'ops': 1, 'steps': 55}
+    rng = random.Random(2)
+    backend.set_backend('differential')
+    try:
+        for _ in range(200):
+            x, y = rng.getrandbits(32), rng.getrandbits(32)
+            rm = rng.choice(('RNE', 'RTZ', 'RUP', 'RDN', 'RMM'))
+            fdiv_f32(bits(x, 32), bits(y, 32), rm)
+            fsqrt_f32(bits(x, 32), rm)
+            fdiv_f64(bits(x << 32 | y, 64), bits(y << 32 | x, 64), rm)
+        assert backend.differential_report()['mismatches'] == []
+    finally:
+        backend.set_backend('reference')
@@ -1,6 +1,7 @@
 # tests/test_float32.py
 from adapters.floatpack import pack_f32_from_python, bits_to_hex32
 from src.numeric_core.fpu import fadd_f32, fsub_f32, fmul_f32
+from src.numeric_core import backend
 
 def test_f32_add_simple():
     a = pack_f32_from_python(1.5)
@@ -19,3 +20,17 @@ def test_f32_mul_simple():
     b = pack_f32_from_python(1.25)
     r, flg = fmul_f32(a,b)
     assert bits_to_hex32(r).endswith('40700000')
+
+def test_f32_mul_overflow_rounding():
+    big = pack_f32_from_python(3e38)
+    neg = pack_f32_from_python(-3e38)
+    for name in ('reference', 'fast'):
+        backend.set_backend(name)
+        try:
+            assert bits_to_hex32(fmul_f32(big, big, 'RNE')[0]).endswith('7F800000')
+            assert bits_to_hex32(fmul_f32(big, big, 'RTZ')[0]).endswith('7F7FFFFF')
+            assert bits_to_hex32(fmul_f32(big, neg, 'RUP')[0]).endswith('FF7FFFFF')
+            r, flg = fmul_f32(big, neg, 'RDN')
+            assert bits_to_hex32(r).endswith('FF800000') and flg['overflow'] == 1
+        finally:
+            backend.set_backend('reference')
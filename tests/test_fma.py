@@ -0,0 +1,125 @@
+import random
+import struct
+from fractions import Fraction
+
+from src.numeric_core import backend
+from src.numeric_core.bitvector import BitVector
+from src.numeric_core.fpu import (fmadd_f32, fmsub_f32, fnmadd_f32, fnmsub_f32,
+                                  fmadd_f64, fmsub_f64, fnmadd_f64, fnmsub_f64,
+                                  fmul_f64, fadd_f64)
+
+
+def bits(v, n):
+    return [(v >> (n - 1 - i)) & 1 for i in range(n)]
+
+
+def val(b):
+    v = 0
+    for x in b:
+        v = (v << 1) | x
+    return v
+
+
+def d2b(x):
+    return bits(struct.unpack('<Q', struct.pack('<d', x))[0], 64)
+
+
+def b2d(b):
+    return struct.unpack('<d', struct.pack('<Q', val(b)))[0]
+
+
+def f2b(x):
+    return bits(struct.unpack('<I', struct.pack('<f', x))[0], 32)
+
+
+def b2f(b):
+    return struct.unpack('<f', struct.pack('<I', val(b)))[0]
+
+
+def test_f64_single_rounding_matches_exact_result():
+    rng = random.Random(17)
+    for _ in range(300):
+        a = rng.uniform(-1, 1) * 2.0 ** rng.randint(-20, 20)
+        b = rng.uniform(-1, 1) * 2.0 ** rng.randint(-20, 20)
+        c = -a * b * (1 + rng.choice((0.0, 2 ** -52, 2 ** -30))) if rng.random() < 0.3 \
+            else rng.uniform(-1, 1) * 2.0 ** rng.randint(-45, 45)
+        exact = Fraction(a) * Fraction(b)
+        cases = ((fmadd_f64, exact + Fraction(c)), (fmsub_f64, exact - Fraction(c)),
+                 (fnmsub_f64, -exact + Fraction(c)), (fnmadd_f64, -exact - Fraction(c)))
+        for fn, want in cases:
+            r, flg = fn(d2b(a), d2b(b), d2b(c))
+            assert b2d(r) == float(want), (fn.__name__, a, b, c)
+            assert flg['inexact'] == (0 if Fraction(float(want)) == want else 1)
+
+
+def test_fused_differs_from_mul_then_add():
+    # a*b = 1 - 2^-60 exactly; rounding the product first loses it entirely
+    a, b, c = d2b(1 + 2 ** -30), d2b(1 - 2 ** -30), d2b(-1.0)
+    fused, _ = fmadd_f64(a, b, c)
+    p, _ = fmul_f64(a, b)
+    twice, _ = fadd_f64(p, c)
+    assert b2d(fused) == -2.0 ** -60 and b2d(twice) == 0.0
+
+
+def test_f32_and_special_values():
+    assert b2f(fmadd_f32(f2b(1.5), f2b(2.0), f2b(0.25))[0]) == 3.25
+    assert b2f(fmsub_f32(f2b(1.5), f2b(2.0), f2b(0.25))[0]) == 2.75
+    assert b2f(fnmadd_f32(f2b(1.5), f2b(2.0), f2b(0.25))[0]) == -3.25
+    assert b2f(fnmsub_f32(f2b(1.5), f2b(2.0), f2b(0.25))[0]) == -2.75
+    inf, zero = f2b(float('inf')), f2b(0.0)
+    r, flg = fmadd_f32(inf, zero, f2b(1.0))
+    assert flg['invalid'] == 1 and val(r) == 0x7FC00000
+    r, flg = fmsub_f32(inf, f2b(1.0), inf)
+    assert flg['invalid'] == 1
+    assert b2f(fmadd_f32(zero, f2b(3.0), f2b(-7.5))[0]) == -7.5
+    assert val(fmadd_f32(f2b(3.0), f2b(5.0), zero)[0]) == val(f2b(15.0))
+    r, _ = fmadd_f32(BitVector.from_list(f2b(2.0)), f2b(3.0), f2b(1.0))
+    assert isinstance(r, BitVector) and b2f(list(r)) == 7.0
+
+
+def test_fast_backend_is_bit_exact():
+    rng = random.Random(4)
+    backend.set_backend('differential')
+    try:
+        for _ in range(150):
+            x, y, z = (rng.getrandbits(32) for _ in range(3))
+            if rng.random() < 0.3:
+                z = val(fmadd_f32(bits(x, 32), bits(y, 32), bits(0, 32))[0]) ^ rng.getrandbits(3)
+            rm = rng.choice(('RNE', 'RTZ', 'RUP', 'RDN', 'RMM'))
+            for fn in (fmadd_f32, fmsub_f32, fnmadd_f32, fnmsub_f32):
+                fn(bits(x, 32), bits(y, 32), bits(z, 32), rm)
+            x, y, z = (rng.getrandbits(64) for _ in range(3))
+            fmadd_f64(bits(x, 64), bits(y, 64), bits(z, 64), rm)
+        assert backend.differential_report()['mismatches'] == []
+    finally:
+        backend.set_backend('reference')
+
+
+def test_overflow_under_directed_rounding():
+    big, one = d2b(1e300), d2b(1.0)
+    for name in ('reference', 'fast'):
+        backend.set_backend(name)
+        try:
+            for rm, want in (('RNE', float('inf')), ('RTZ', 1.7976931348623157e308),
+                             ('RDN', 1.7976931348623157e308), ('RUP', float('inf'))):
+                r, flg = fmadd_f64(big, big, one, rm)
+                assert b2d(r) == want and flg['overflow'] == 1, (name, rm)
+            r, _ = fnmadd_f32(f2b(3e38), f2b(3e38), f2b(1.0), 'RUP')   # -(a*b) - c
+            assert val(r) == 0xFF7FFFFF
+        finally:
+            backend.set_backend('reference')
+
+
+def test_signed_zero_sums_follow_rounding_mode():
+    for name in ('reference', 'fast'):
+        backend.set_backend(name)
+        try:
+            for rm, want in (('RNE', 0), ('RTZ', 0), ('RUP', 0), ('RDN', 0x80000000)):
+                r, _ = fmadd_f32(f2b(-0.0), f2b(3.0), f2b(0.0), rm)
+                assert val(r) == want, (name, rm)
+                r, _ = fadd_f64(d2b(0.0), d2b(-0.0), rm)
+                assert val(r) == want << 32, (name, rm)
+            r, _ = fmadd_f32(f2b(-0.0), f2b(3.0), f2b(-0.0), 'RUP')   # same signs keep theirs
+            assert val(r) == 0x80000000
+        finally:
+            backend.set_backend('reference')
@@ -0,0 +1,74 @@
+# tests/test_fpu_batch.py
+import random
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from src.numeric_core import backend
+from src.numeric_core.bitvector import BitVector
+from src.numeric_core.fpu import (fadd_f32, fsub_f32, fmul_f32, fadd_f64, fsub_f64,
+                                  fmul_f64, set_tininess)
+from src.numeric_core.fpu_batch import (fadd_f32_batch, fsub_f32_batch, fmul_f32_batch,
+                                        fadd_f64_batch, fsub_f64_batch, fmul_f64_batch)
+
+OPS = {
+    32: [(fadd_f32_batch, fadd_f32), (fsub_f32_batch, fsub_f32), (fmul_f32_batch, fmul_f32)],
+    64: [(fadd_f64_batch, fadd_f64), (fsub_f64_batch, fsub_f64), (fmul_f64_batch, fmul_f64)],
+}
+
+def _patterns(width, n, seed):
+    rng = random.Random(seed)
+    we = 8 if width == 32 else 11
+    wf = width - 1 - we
+    top = (1 << we) - 1
+    out = []
+    for _ in range(n):
+        e = rng.choice((0, 0, 1, 2, top, top - 1, top // 2, top // 2 + 1, rng.getrandbits(we)))
+        f = rng.choice((0, (1 << wf) - 1, rng.getrandbits(3), rng.getrandbits(wf)))
+        out.append((rng.getrandbits(1) << (width - 1)) | (e << wf) | f)
+    return out
+
+def _check(width, a, b, rm):
+    dtype = np.uint32 if width == 32 else np.uint64
+    for batch, scalar in OPS[width]:
+        res, flags, summary = batch(np.array(a, dtype=dtype), np.array(b, dtype=dtype), rm)
+        assert res.dtype == dtype
+        for i, (x, y) in enumerate(zip(a, b)):
+            r, f = scalar(BitVector(width, x), BitVector(width, y), rm)
+            assert int(res[i]) == r.value, (scalar.__name__, rm, hex(x), hex(y))
+            for k in f:
+                assert int(flags[k][i]) == f[k], (scalar.__name__, rm, hex(x), hex(y), k)
+        assert summary == {k: int(flags[k].any()) for k in flags}
+
+@pytest.mark.parametrize('width', [32, 64])
+@pytest.mark.parametrize('rm', ['RNE', 'RTZ', 'RUP', 'RDN', 'RMM'])
+def test_batch_matches_scalar(width, rm):
+    a = _patterns(width, 600, width)
+    b = _patterns(width, 600, width + 1)
+    # near cancellation for the add/sub paths
+    b[:100] = [x ^ (1 << (width - 1)) ^ (i & 3) for i, x in enumerate(a[:100])]
+    # signed zeros, whose sum's sign depends on the rounding mode
+    a[100:104] = [0, 0, 1 << (width - 1), 1 << (width - 1)]
+    b[100:104] = [0, 1 << (width - 1), 0, 1 << (width - 1)]
+    backend.set_backend('fast')          # scalar reference at native speed
+    try:
+        _check(width, a, b, rm)
+    finally:
+        backend.set_backend('reference')
+
+def test_batch_matches_bit_list_reference_and_tininess():
+    a = _patterns(32, 60, 3)
+    b = _patterns(32, 60, 4)
+    _check(32, a, b, 'RNE')
+    set_tininess('before')
+    try:
+        _check(32, [0x3F7FFFFE], [0x00800001], 'RNE')
+        _, flags, summary = fmul_f32_batch(np.array([0x3F7FFFFE], np.uint32),
+                                           np.array([0x00800001], np.uint32))
+        assert summary['underflow'] == 1
+    finally:
+        set_tininess('after')
+    _, flags, summary = fmul_f32_batch(np.array([0x3F7FFFFE, 0x3F800000], np.uint32),
+                                       np.array([0x00800001, 0x3F800000], np.uint32))
+    assert summary == {'invalid': 0, 'overflow': 0, 'underflow': 0, 'inexact': 1}
+    assert list(flags['inexact']) == [1, 0]
@@ -0,0 +1,84 @@
+# tests/test_loaders.py
+import struct
+from cpu import (CPU, InstrMemory, DataMemory, load_hex_file, load_bin_file,
+                 load_elf_file, load_program, PAGE_SIZE)
+import rvasm
+from rvasm import HALT
+
+def _le(words):
+    return b"".join(struct.pack("<I", w) for w in words)
+
+def test_hex_bulk_and_fallback_parse_agree(tmp_path):
+    clean = tmp_path / "clean.hex"
+    clean.write_text("00500093\n00A00113\n\n002081B3\n")
+    messy = tmp_path / "messy.hex"
+    messy.write_text("00500093\nnot-hex\n00A00113\n2081B3\n")
+    assert load_hex_file(str(clean)) == [0x00500093, 0x00A00113, 0x002081B3]
+    assert load_hex_file(str(messy)) == [0x00500093, 0x00A00113, 0x002081B3]
+
+def test_hex_comments_after_the_word(tmp_path):
+    path = tmp_path / "commented.hex"
+    path.write_text("// entry\n00500093 // addi x1, x0, 5\n00A00113\taddi\n"
+                    "002081B3 00000000\n   \n# done\n")
+    assert load_hex_file(str(path)) == [0x00500093, 0x00A00113, 0x002081B3]
+
+def test_bin_image_runs_and_backs_data(tmp_path):
+    words = rvasm.li(1, 0x10) + [rvasm.lw(2, 1, 0), HALT, 0xDEADBEEF]
+    path = tmp_path / "prog.bin"
+    path.write_bytes(_le(words))
+    imem, dmem, entry = load_bin_file(str(path))
+    cpu = CPU(imem, dmem)
+    cpu.pc = entry
+    cpu.run()
+    assert cpu.regs.read(2) == 0xDEADBEEF
+    cpu.dmem.store_word(0x10, 1)              # copy-on-write: file untouched
+    assert path.read_bytes() == _le(words)
+
+def _elf(entry, segments):
+    """Minimal ELF32 LE RISC-V executable; segments are (vaddr, flags, data, memsz)."""
+    phoff = 52
+    off = phoff + 32 * len(segments)
+    phdrs = b""
+    body = b""
+    for vaddr, flags, data, memsz in segments:
+        phdrs += struct.pack("<IIIIIIII", 1, off + len(body), vaddr, vaddr,
+                             len(data), memsz, flags, 4)
+        body += data
+    ident = b"\x7fELF" + bytes([1, 1, 1]) + bytes(9)
+    hdr = struct.pack("<16sHHIIIIIHHHHHH", ident, 2, 0xF3, 1, entry, phoff, 0, 0,
+                      52, 32, len(segments), 40, 0, 0)
+    return hdr + phdrs + body
+
+def test_elf_pt_load_segments(tmp_path):
+    text = rvasm.li(1, 0x20000) + [rvasm.lw(2, 1, 4), rvasm.lw(3, 1, 0x100), HALT]
+    data = _le([0x11111111, 0x22222222])
+    path = tmp_path / "prog.elf"
+    path.write_bytes(_elf(0x1000, [(0x1000, 5, _le(text), len(text) * 4),
+                                   (0x20000, 6, data, 0x200)]))
+    imem, dmem, entry = load_program(str(path))
+    assert entry == 0x1000 and imem.base == 0x1000
+    cpu = CPU(imem, dmem)
+    cpu.pc = entry
+    cpu.run()
+    assert cpu.regs.read(2) == 0x22222222
+    assert cpu.regs.read(3) == 0               # .bss past filesz
+    assert cpu.pc == 0x1000 + 4 * (len(text) - 1)
+
+def test_mapped_pages_materialise_on_touch():
+    m = DataMemory()
+    image = bytearray(PAGE_SIZE * 64)
+    image[5 * PAGE_SIZE + 8] = 0x5A
+    m.map_region(0x100000, image)
+    assert m.pages == {}
+    assert m.load_byte(0x100000 + 5 * PAGE_SIZE + 8) == 0x5A
+    assert len(m.pages) == 1
+
+def test_elf_rejects_other_files(tmp_path):
+    path = tmp_path / "x.elf"
+    path.write_bytes(b"\x7fELF" + bytes(60))
+    try:
+        load_elf_file(str(path))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
@@ -0,0 +1,83 @@
+import pytest
+
+from src.numeric_core import backend, memo
+from src.numeric_core.bits import from_hex_string
+from src.numeric_core.bitvector import BitVector
+from src.numeric_core.fpu import fmul_f32, fadd_f64
+from src.numeric_core.mdu import mul_low32, div_signed, div_rem
+
+
+@pytest.fixture
+def cache():
+    c = memo.enable_cache(capacity=4)
+    yield c
+    memo.disable_cache()
+
+
+def test_disabled_by_default():
+    assert memo.cache_stats() is None
+
+
+def test_hits_return_equal_independent_results(cache):
+    a, b = from_hex_string('0x00001234', 32), from_hex_string('0xFFFFFF10', 32)
+    first = mul_low32(a, b)
+    first[0][0] ^= 1                      # caller mutation must not leak into the cache
+    again = mul_low32(a, b)
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+    memo.disable_cache()
+    assert again == mul_low32(a, b) and again[0] != first[0]
+
+
+def test_key_includes_rounding_mode_and_operand_kind(cache):
+    x = from_hex_string('0x3DCCCCCD', 32)     # 0.1
+    y = from_hex_string('0x3E4CCCCD', 32)     # 0.2
+    rne = fmul_f32(x, y)
+    rtz = fmul_f32(x, y, 'RTZ')
+    assert rne == fmul_f32.uncached(x, y) and rtz == fmul_f32.uncached(x, y, 'RTZ')
+    bv = fmul_f32(BitVector.from_list(x), BitVector.from_list(y))
+    assert isinstance(bv[0], BitVector) and list(bv[0]) == rne[0]
+    assert cache.stats()['misses'] == 3 and cache.stats()['hits'] == 0
+
+
+def test_eviction_and_trace_bypass(cache):
+    one = from_hex_string('0x3FF0000000000000', 64)
+    for i in range(6):
+        fadd_f64(one, from_hex_string('0x%016X' % (0x4000000000000000 + i), 64))
+    s = cache.stats()
+    assert s['size'] == 4 and s['evictions'] == 2
+    a, b = from_hex_string('0x00000064', 32), from_hex_string('0x00000007', 32)
+    div_signed(a, b)
+    q, r, flg, steps = div_signed(a, b, trace=True)
+    assert steps and cache.stats()['hits'] == 0
+    # nested cached ops (div_signed -> div_rem) are not counted separately
+    assert cache.stats()['misses'] == 7
+
+
+def test_backend_is_part_of_the_key(cache):
+    x = from_hex_string('0x3DCCCCCD', 32)
+    y = from_hex_string('0x3E4CCCCD', 32)
+    fmul_f32(x, y)
+    backend.set_backend('fast')
+    try:
+        fmul_f32(x, y)
+        assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 0
+        backend.set_backend('differential')
+        for _ in range(3):
+            fmul_f32(x, y)
+        assert backend.differential_report()['checked'] == 3
+        assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 0
+    finally:
+        backend.set_backend('reference')
+    fmul_f32(x, y)
+    assert cache.stats()['hits'] == 1
+
+
+def test_keyword_operands_are_packed(cache):
+    a, b = from_hex_string('0x00000064', 32), from_hex_string('0x00000007', 32)
+    first = div_rem(rs1=a, rs2=b)
+    assert div_rem(rs1=BitVector.from_list(a), rs2=BitVector.from_list(b))[0] == \
+        BitVector.from_list(first[0])
+    assert div_rem(rs1=a, rs2=b, signed=False)[:2] == first[:2]
+    assert div_rem(rs1=a, rs2=b) == first
+    s = cache.stats()
+    assert s['misses'] == 3 and s['hits'] == 1
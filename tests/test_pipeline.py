@@ -0,0 +1,70 @@
+# tests/test_pipeline.py
+from cpu import CPU, InstrMemory, DataMemory
+from pipeline import PipelineModel
+import rvasm
+from rvasm import add, addi, lw, sw, mul, div, beq, bne, jal, HALT, loop_program
+
+def timed(words, **kw):
+    cpu = CPU(InstrMemory(list(words)), DataMemory())
+    model = PipelineModel(**kw)
+    cpu.run(pipeline=model)
+    return cpu, model
+
+def test_independent_instructions_fill_the_pipeline():
+    cpu, m = timed([addi(i, 0, i) for i in range(1, 9)] + [HALT])
+    assert m.instructions == cpu.step_count == 9
+    assert m.cycles == 9 + 4
+    assert sum(m.stalls.values()) == 0
+
+def test_forwarding_hides_alu_dependences():
+    words = [addi(1, 0, 1), add(2, 1, 1), add(3, 2, 2), add(4, 3, 3), HALT]
+    cpu, m = timed(words)
+    assert cpu.regs.read(4) == 8 and m.cycles == 5 + 4
+    _, slow = timed(words, forwarding=False)
+    assert slow.stalls['data'] == 3 * 2 and slow.cycles == 5 + 4 + 6
+
+def test_load_use_stall():
+    words = [addi(1, 0, 64), sw(1, 1, 0), lw(2, 1, 0), add(3, 2, 2), HALT]
+    cpu, m = timed(words)
+    assert cpu.regs.read(3) == 128
+    assert m.stalls['load_use'] == 1 and m.cycles == 5 + 4 + 1
+    assert m.hotspots(1) == [(12, 1, 1)]
+
+def test_taken_branches_flush():
+    cpu, m = timed(loop_program(10))
+    # bne taken 9 times, falls through once
+    assert m.flushes == 9 and m.stalls['branch'] == 9 * 2
+    assert m.cycles == cpu.step_count + 4 + 18
+    assert m.cpi() > 1.0
+
+def test_jal_costs_jump_penalty():
+    cpu, m = timed([jal(0, 8), addi(1, 0, 1), addi(2, 0, 2), HALT])
+    assert cpu.regs.read(1) == 0 and m.stalls['jump'] == 1
+
+def test_mdu_latency_and_dependence():
+    words = rvasm.li(1, 100) + [addi(2, 0, 7), mul(3, 1, 2), add(4, 3, 3),
+                                div(5, 1, 2), addi(6, 0, 1), HALT]
+    cpu = CPU(InstrMemory(words), DataMemory(), mul_latency=4, div_latency=10)
+    m = PipelineModel()
+    cpu.run(pipeline=m)
+    assert cpu.regs.read(4) == 1400 and cpu.regs.read(5) == 14
+    assert m.stalls['mdu'] == 3 + 9     # add waits for mul, addi for the busy divider
+    assert m.report()['stalls']['mdu'] == 12
+
+def test_fpu_latency():
+    f1 = 0x3F800000
+    words = rvasm.li(1, f1) + [rvasm.fmv_w_x(1, 1), rvasm.fadd_s(2, 1, 1),
+                               rvasm.fmul_s(3, 2, 2), rvasm.fdiv_s(4, 3, 2), HALT]
+    cpu, m = timed(words, fpu_latency=3, fdiv_latency=10)
+    # fmul and fdiv wait for their producers; the halt waits for the divider
+    assert m.stalls['fpu'] == 2 + 2 + 9
+    assert m.cycles == len(words) + 4 + 13
+
+def test_functional_results_match_untimed_run():
+    words = loop_program(50)
+    plain = CPU(InstrMemory(list(words)), DataMemory())
+    plain.run()
+    cpu, m = timed(words)
+    assert cpu.regs.regs == plain.regs.regs and cpu.step_count == plain.step_count
+    rep = m.report(top=3)
+    assert rep['instructions'] == cpu.step_count and len(rep['hotspots']) <= 3
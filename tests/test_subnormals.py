@@ -0,0 +1,105 @@
+import math
+import random
+import struct
+from fractions import Fraction
+
+import pytest
+
+from src.numeric_core import backend
+from src.numeric_core.fpu import (fadd_f32, fmul_f32, fdiv_f32, fadd_f64, fsub_f64,
+                                  fmul_f64, fdiv_f64, fsqrt_f64, fmadd_f64,
+                                  set_tininess, get_tininess)
+
+
+def bits(v, n):
+    return [(v >> (n - 1 - i)) & 1 for i in range(n)]
+
+
+def val(b):
+    v = 0
+    for x in b:
+        v = (v << 1) | x
+    return v
+
+
+def d2i(x):
+    return struct.unpack('<Q', struct.pack('<d', x))[0]
+
+
+def i2d(i):
+    return struct.unpack('<d', struct.pack('<Q', i))[0]
+
+
+def rand_f64(rng):
+    # bias the exponent toward the bottom of the range
+    e = rng.choice((0, 0, 1, 2, 3, 30, 500, 1000, 1023))
+    return i2d(rng.getrandbits(52) | (e << 52) | (rng.getrandbits(1) << 63))
+
+
+def test_gradual_underflow_matches_host_f64():
+    rng = random.Random(16)
+    for _ in range(600):
+        x, y = rand_f64(rng), rand_f64(rng)
+        a, b = bits(d2i(x), 64), bits(d2i(y), 64)
+        for fn, want in ((fadd_f64, x + y), (fsub_f64, x - y), (fmul_f64, x * y)):
+            if math.isfinite(want):
+                assert val(fn(a, b)[0]) == d2i(want), (fn.__name__, x, y)
+        if y != 0 and math.isfinite(x / y):
+            assert val(fdiv_f64(a, b)[0]) == d2i(x / y)
+        assert val(fsqrt_f64(bits(d2i(abs(x)), 64))[0]) == d2i(math.sqrt(abs(x)))
+        z = rand_f64(rng)
+        want = float(Fraction(x) * Fraction(y) + Fraction(z))
+        if math.isfinite(want):
+            assert val(fmadd_f64(a, b, bits(d2i(z), 64))[0]) == d2i(want)
+
+
+def test_f32_subnormal_results_and_flags():
+    tiny = bits(0x00000001, 32)                     # 2^-149
+    r, flg = fadd_f32(tiny, tiny)
+    assert val(r) == 0x00000002 and flg['underflow'] == 0 and flg['inexact'] == 0
+    r, flg = fmul_f32(bits(0x00800000, 32), bits(0x3F000000, 32))   # 2^-126 * 0.5
+    assert val(r) == 0x00400000 and flg['underflow'] == 0
+    r, flg = fmul_f32(tiny, bits(0x3F000000, 32))   # 2^-150 ties to even -> 0
+    assert val(r) == 0 and flg == {'invalid': 0, 'overflow': 0, 'underflow': 1, 'inexact': 1}
+    r, flg = fmul_f32(tiny, bits(0x3F400000, 32), 'RUP')
+    assert val(r) == 0x00000001 and flg['underflow'] == 1
+    r, _ = fdiv_f32(bits(0x00000003, 32), bits(0x40000000, 32))      # 3*2^-150
+    assert val(r) == 0x00000002
+
+
+def test_tininess_before_and_after_rounding():
+    # (1 - 2^-23) * 2^-126 (1 + 2^-23) = 2^-126 (1 - 2^-46): rounds up to 2^-126
+    a, b = bits(0x3F7FFFFE, 32), bits(0x00800001, 32)
+    assert get_tininess() == 'after'
+    try:
+        r, flg = fmul_f32(a, b)
+        assert val(r) == 0x00800000 and flg['underflow'] == 0 and flg['inexact'] == 1
+        set_tininess('before')
+        r, flg = fmul_f32(a, b)
+        assert val(r) == 0x00800000 and flg['underflow'] == 1
+        backend.set_backend('differential')
+        fmul_f32(a, b)
+        assert backend.differential_report()['mismatches'] == []
+    finally:
+        set_tininess('after')
+        backend.set_backend('reference')
+    with pytest.raises(ValueError):
+        set_tininess('never')
+
+
+def test_fast_backend_agrees_near_the_bottom():
+    rng = random.Random(61)
+    backend.set_backend('differential')
+    try:
+        for _ in range(300):
+            x = rng.getrandbits(23) | (rng.choice((0, 0, 1, 2, 104, 127)) << 23) | (rng.getrandbits(1) << 31)
+            y = rng.getrandbits(23) | (rng.choice((0, 1, 2, 104, 126, 127, 150)) << 23)
+            rm = rng.choice(('RNE', 'RTZ', 'RUP', 'RDN', 'RMM'))
+            fadd_f32(bits(x, 32), bits(y, 32), rm)
+            fmul_f32(bits(x, 32), bits(y, 32), rm)
+            fdiv_f32(bits(x, 32), bits(y, 32), rm)
+            fmadd_f64(bits(d2i(rand_f64(rng)), 64), bits(d2i(rand_f64(rng)), 64),
+                      bits(d2i(rand_f64(rng)), 64), rm)
+        assert backend.differential_report()['mismatches'] == []
+    finally:
+        backend.set_backend('reference')
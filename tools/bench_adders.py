@@ -0,0 +1,41 @@
+# tools/bench_adders.py - compare adder engines in numeric_core.adder.
+# Reports wall time per add and the structural gate count / depth
+# (gate levels on the critical path) for 32- and 64-bit operands.
+# Usage:
+#   python tools/bench_adders.py [--count N]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.numeric_core.adder import ADDER_ENGINES, add
+
+
+def bits(v, n):
+    return [(v >> (n - 1 - i)) & 1 for i in range(n)]
+
+
+def main():
+    args = sys.argv[1:]
+    count = 2000
+    if '--count' in args:
+        count = int(args[args.index('--count') + 1])
+    rng = random.Random(1)
+    print(f"{'width':>5}  {'engine':<14}{'us/add':>10}{'gates':>8}{'depth':>8}")
+    for n in (32, 64):
+        ops = [(bits(rng.getrandbits(n), n), bits(rng.getrandbits(n), n)) for _ in range(count)]
+        for name in ADDER_ENGINES:
+            stats = {}
+            add(ops[0][0], ops[0][1], engine=name, stats=stats)
+            t0 = time.perf_counter()
+            for a, b in ops:
+                add(a, b, engine=name)
+            us = (time.perf_counter() - t0) / count * 1e6
+            print(f"{n:>5}  {name:<14}{us:>10.1f}{stats['gates']:>8}{stats['depth']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# tools/bench_cpu.py - instructions-per-second microbenchmark for cpu.CPU.
+# Compares the decode-every-step if/elif interpreter (CPU.run_reference)
+# against predecoded table dispatch (CPU.run) and compiled basic blocks
+# (CPU.run(blocks=True)).
+# Usage:
+#   python tools/bench_cpu.py [--loop N] [--repeat R]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cpu import CPU, InstrMemory, DataMemory, load_hex_file
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loop_words(n):
+    """Countdown loop summing n..1 into x3 (3 instructions per iteration)."""
+    lo = n & 0xFFF
+    if lo & 0x800:
+        lo -= 0x1000
+    hi = ((n - lo) >> 12) & 0xFFFFF
+    return [
+        (hi << 12) | (1 << 7) | 0x37,                       # lui  x1, hi
+        ((lo & 0xFFF) << 20) | (1 << 15) | (1 << 7) | 0x13,  # addi x1, x1, lo
+        0x00000193,                                         # addi x3, x0, 0
+        0x001181B3,                                         # add  x3, x3, x1
+        0xFFF08093,                                         # addi x1, x1, -1
+        0xFE009CE3,                                         # bne  x1, x0, -8
+        0x0000006F,                                         # halt
+    ]
+
+
+def measure(words, mode, repeat):
+    total = 0
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        cpu = CPU(InstrMemory(list(words)), DataMemory())
+        if mode == 'reference':
+            cpu.run_reference(max_steps=1 << 30)
+        elif mode == 'block':
+            cpu.run(max_steps=1 << 30, blocks=True)
+        else:
+            cpu.run(max_steps=1 << 30)
+        total += cpu.step_count
+    dt = time.perf_counter() - t0
+    return total, dt
+
+
+def main():
+    args = sys.argv[1:]
+    n = 100000
+    repeat = 2000
+    if '--loop' in args:
+        n = int(args[args.index('--loop') + 1])
+    if '--repeat' in args:
+        repeat = int(args[args.index('--repeat') + 1])
+
+    programs = [
+        ('test_base.hex', load_hex_file(os.path.join(ROOT, 'test_base.hex')), repeat),
+        ('loop(%d)' % n, loop_words(n), 1),
+    ]
+    print(f"{'program':<16}{'mode':<12}{'instrs':>10}{'seconds':>10}{'IPS':>14}")
+    for name, words, reps in programs:
+        base = None
+        for mode in ('reference', 'table', 'block'):
+            count, dt = measure(words, mode, reps)
+            ips = count / dt if dt > 0 else float('inf')
+            print(f"{name:<16}{mode:<12}{count:>10}{dt:>10.3f}{ips:>14,.0f}")
+            if base is None:
+                base = ips
+            else:
+                print(f"{'':<16}{'speedup':<12}{ips / base:>44.2f}x")
+
+
+if __name__ == '__main__':
+    main()